@@ -0,0 +1,87 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""
+Compares request throughput with and without connection pooling.
+
+Run from the repository root with:
+
+    python -m MaterialWS.Benchmarks.BenchPool [requests] [threads]
+"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from MaterialWS.Benchmarks.StandInServer import StandInServer, sampleUUIDs
+from MaterialWS.WS.Session import WSSession
+
+def unpooledGet(url):
+    response = requests.get(url)
+    response.raise_for_status()
+    return response.content
+
+def run(get, urls, threads):
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(get, urls))
+    else:
+        for url in urls:
+            get(url)
+    return len(urls) / (time.perf_counter() - start)
+
+def benchmark(count=2000, threads=1):
+    server = StandInServer().start()
+    try:
+        urls = [server.url + "model/{}/".format(uuid) for uuid in sampleUUIDs(count)]
+
+        session = WSSession(poolSize=max(threads, 1))
+        def pooledGet(url):
+            response = session.get(url)
+            response.raise_for_status()
+            return response.content
+
+        # Warm up both paths before timing
+        run(unpooledGet, urls[:10], 1)
+        run(pooledGet, urls[:10], 1)
+
+        unpooled = run(unpooledGet, urls, threads)
+        pooled = run(pooledGet, urls, threads)
+        session.close()
+    finally:
+        server.stop()
+
+    print("{} requests, {} thread(s)".format(count, threads))
+    print("  unpooled: {:10.1f} requests/s".format(unpooled))
+    print("  pooled:   {:10.1f} requests/s".format(pooled))
+    print("  speedup:  {:10.2f}x".format(pooled / unpooled))
+    return unpooled, pooled
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    benchmark(count, threads)
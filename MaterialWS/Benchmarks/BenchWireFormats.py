@@ -0,0 +1,152 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""
+Compares bytes on the wire and decode time for the supported response formats.
+
+Run from the repository root with:
+
+    python -m MaterialWS.Benchmarks.BenchWireFormats [materials]
+"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import base64
+import gzip
+import json
+import random
+import sys
+import time
+import uuid
+
+from MaterialWS.WS import Codec
+from MaterialWS.WS.ArrayCodec import pack2D, unpack2D
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def sampleMaterial(index):
+    """A material dominated by tabular properties and an embedded image, as in practice"""
+    cells = []
+    for row in range(200):
+        temperature = 20.0 + row * 5.0
+        cells.append({"row": row, "column": 0, "value": "{} °C".format(temperature)})
+        cells.append({"row": row, "column": 1, "value": "{:.4f} GPa".format(210.0 - row * 0.05)})
+        cells.append({"row": row, "column": 2, "value": "{:.6f}".format(0.3 + row * 0.0001)})
+
+    # A smooth gradient with some noise, so each image is distinct but compressible
+    rng = random.Random(index)
+    image = bytes((x // 64 + rng.randrange(8)) % 256 for x in range(48 * 1024))
+
+    return {
+        "material_id": str(uuid.uuid4()),
+        "library": "System",
+        "folder": "Standard/Metal/Steel",
+        "material_name": "Steel {}".format(index),
+        "material_author": "",
+        "material_license": "CC-BY-3.0",
+        "material_parent_uuid": None,
+        "material_description": "A generic steel",
+        "material_url": "",
+        "material_reference": "",
+        "tags": ["metal", "steel"],
+        "physical_models": ["7b561d1d-fb9b-44f6-9da9-56a4f74d7536"],
+        "appearance_models": ["f006c7e4-35b7-43d5-bbf9-c5d572309e6e"],
+        "properties": [
+            {"material_property_name": "Density",
+             "material_property_type": "Quantity",
+             "material_property_value": "7900 kg/m^3"},
+            {"material_property_name": "YoungsModulusCurve",
+             "material_property_type": "2DArray",
+             "material_property_value": {"rows": 200, "columns": 3, "values": cells}},
+            {"material_property_name": "TextureImage",
+             "material_property_type": "Image",
+             "material_property_value": base64.b64encode(image).decode("ascii")},
+        ]
+    }
+
+def columnar(material):
+    """The same material with its arrays in the packed columnar encoding"""
+    material = dict(material)
+    properties = []
+    for property in material["properties"]:
+        if property["material_property_type"] == "2DArray":
+            value = property["material_property_value"]
+            rows = [[None] * value["columns"] for _ in range(value["rows"])]
+            for cell in value["values"]:
+                rows[cell["row"]][cell["column"]] = cell["value"]
+            property = dict(property, material_property_value=pack2D(rows, value["columns"]))
+        properties.append(property)
+    material["properties"] = properties
+    return material
+
+def unpackArrays(body):
+    for material in body:
+        for property in material["properties"]:
+            if property["material_property_type"] == "2DArray":
+                unpack2D(property["material_property_value"])
+    return body
+
+def timeDecode(decode, data, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode(data)
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+def benchmark(count=50, repeat=5):
+    body = [sampleMaterial(index) for index in range(count)]
+
+    plainJSON = json.dumps(body).encode("utf-8")
+    candidates = [("json", plainJSON, lambda data: json.loads(data))]
+    columnarJSON = json.dumps([columnar(material) for material in body]).encode("utf-8")
+    candidates.append(("json (columnar)", columnarJSON, lambda data: unpackArrays(json.loads(data))))
+    if Codec.orjson is not None:
+        candidates.append(("json (orjson)", plainJSON, Codec.orjson.loads))
+    if Codec.hasMsgpack():
+        packed, _ = Codec.encodeBody(body, Codec.FORMAT_MSGPACK)
+        candidates.append(("msgpack", packed, lambda data: Codec.msgpack.unpackb(data, raw=False)))
+
+    rows = []
+    for name, data, decode in candidates:
+        rows.append((name, "identity", len(data), timeDecode(decode, data, repeat)))
+
+        compressed = gzip.compress(data, compresslevel=6)
+        rows.append((name, "gzip", len(compressed),
+                     timeDecode(lambda c: decode(gzip.decompress(c)), compressed, repeat)))
+
+        if zstandard is not None:
+            compressed = zstandard.ZstdCompressor(level=3).compress(data)
+            decompressor = zstandard.ZstdDecompressor()
+            rows.append((name, "zstd", len(compressed),
+                         timeDecode(lambda c: decode(decompressor.decompress(c)), compressed, repeat)))
+
+    print("{} materials".format(count))
+    print("  {:16} {:10} {:>12} {:>8} {:>12}".format("format", "encoding", "bytes", "ratio", "decode ms"))
+    for name, encoding, size, elapsed in rows:
+        print("  {:16} {:10} {:>12} {:>8.2f} {:>12.2f}".format(name, encoding, size,
+                                                                 len(plainJSON) / size, elapsed))
+    return rows
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    benchmark(count)
@@ -0,0 +1,123 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""A minimal local web service used by the benchmarks"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import json
+import threading
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def sampleLibraries(count=5):
+    libraries = []
+    for index in range(count):
+        libraries.append({
+            "library_name": "Library {}".format(index),
+            "library_icon": "",
+            "library_read_only": False
+        })
+    return libraries
+
+def sampleModel(uuid):
+    return {
+        "model_id": uuid,
+        "library": "System",
+        "folder": "Mechanical",
+        "model_type": "Physical",
+        "model_name": "Density",
+        "model_url": "https://en.wikipedia.org/wiki/Density",
+        "model_description": "Density",
+        "model_doi": "",
+        "inherits": [],
+        "properties": [{
+            "model_property_name": "Density",
+            "model_property_display_name": "Density",
+            "model_property_type": "Quantity",
+            "model_property_units": "kg/m^3",
+            "model_property_url": "https://en.wikipedia.org/wiki/Density",
+            "model_property_description": "Density",
+            "columns": []
+        }]
+    }
+
+def sampleUUIDs(count):
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    # Required for keep-alive connections
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are written separately, which stalls on delayed ACKs otherwise
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep the benchmark output clean
+        pass
+
+    def do_GET(self):
+        status, body = self.server.route(self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Serves canned responses for the web service endpoints on a local port. A port of 0
+    selects a free port, available afterwards from the url property.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, libraries=None):
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        if libraries is None:
+            libraries = sampleLibraries()
+        self._libraries = json.dumps(libraries).encode("utf-8")
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/materialws/".format(self.server_address[1])
+
+    def route(self, path):
+        parts = [part for part in path.split("/") if part]
+        if len(parts) < 2 or parts[0] != "materialws":
+            return 404, b"{}"
+        if parts[1] == "library" and len(parts) == 2:
+            return 200, self._libraries
+        if parts[1] == "model" and len(parts) == 3:
+            return 200, json.dumps(sampleModel(parts[2])).encode("utf-8")
+        return 404, b"{}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
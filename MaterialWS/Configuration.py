@@ -22,12 +22,92 @@
 __author__ = "David Carter"
 __url__ = "https://www.davesrocketshop.com"
 
+import os
+
 import FreeCAD
 
+BACKEND_WS = "WS"
+BACKEND_DATABASE = "Database"
+
 def getPreferencesLocation():
     # Set parameter location
     return "User parameter:BaseApp/Preferences/Mod/MaterialWS"
 
+def getBackend():
+    """Whether the manager uses the web service or connects to the database directly"""
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetString("Backend", BACKEND_WS)
+
 def getDatabaseName():
     prefs = getPreferencesLocation()
     return FreeCAD.ParamGet(prefs).GetString("Database", "material")
+
+def getPoolSize():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("PoolSize", 10)
+
+def getKeepAlive():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetBool("KeepAlive", True)
+
+def getIdleTimeout():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("IdleTimeout", 60)
+
+def getBatchSize():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("BatchSize", 100)
+
+def getCachePath():
+    return os.path.join(FreeCAD.getUserAppDataDir(), "MaterialWS", "cache.sqlite")
+
+def getCacheEnabled():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetBool("CacheEnabled", True)
+
+def getCacheSize():
+    """Cache budget in megabytes"""
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("CacheSize", 64)
+
+def getCacheTTL():
+    """Cache entry lifetime in seconds"""
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("CacheTTL", 3600)
+
+def getOfflineMode():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetBool("OfflineMode", True)
+
+def getWireFormat():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetString("WireFormat", "json")
+
+def getIconCachePath():
+    return os.path.join(FreeCAD.getUserAppDataDir(), "MaterialWS", "icons")
+
+def getReplicaPath():
+    return os.path.join(FreeCAD.getUserAppDataDir(), "MaterialWS", "replicas")
+
+def getObjectCacheEntries():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("ObjectCacheEntries", 2048)
+
+def getObjectCacheSize():
+    """Object cache budget in megabytes"""
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("ObjectCacheSize", 32)
+
+def getChangeEvents():
+    """Follow the server's change events to invalidate cached data"""
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetBool("ChangeEvents", False)
+
+def getInstrumentation():
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetBool("Instrumentation", False)
+
+def getUploadChunkSize():
+    """Upload chunk size in kilobytes"""
+    prefs = getPreferencesLocation()
+    return FreeCAD.ParamGet(prefs).GetInt("UploadChunkSize", 256)
@@ -27,6 +27,7 @@ from functools import cache
 import Materials
 from MaterialAPI.MaterialManagerExternal import MaterialLibraryType, MaterialLibraryObjectType
 from MaterialWS.Database.Database import Database
+from MaterialWS.Database.FolderTree import FolderTree
 from MaterialWS.Database.Exceptions import DatabaseLibraryCreationError, \
     DatabaseIconError, DatabaseLibraryNotFound, \
     DatabaseModelCreationError, DatabaseMaterialCreationError, \
@@ -35,13 +36,46 @@ from MaterialWS.Database.Exceptions import DatabaseLibraryCreationError, \
     DatabaseModelNotFound, DatabaseMaterialNotFound, \
     DatabaseRenameError, DatabaseDeleteError
 
+# The most values bound in a single IN list
+IN_LIST_SIZE = 500
+
+def _iconBytes(icon) -> bytes:
+    """The library icon as stored. Icons may be binary images, so they aren't decoded"""
+    if icon is None:
+        return b""
+    if isinstance(icon, str):
+        return icon.encode("utf-8")
+    return bytes(icon)
+
 class DatabaseMySQL(Database):
 
     def __init__(self):
         super().__init__()
 
+        # Folder trees by library_id, see _folderTree()
+        self._folderTrees = {}
+
     def _updateTimestamp(self, cursor, libraryIndex):
-        cursor.execute("UPDATE library SET library_modified = NOW() WHERE library_id = ?", libraryIndex)
+        # The version moves on every change, even within the resolution of the timestamp
+        cursor.execute("UPDATE library SET library_modified = NOW(), library_version = library_version + 1"
+                       " WHERE library_id = ?", libraryIndex)
+
+        # A cached folder tree that was current stays current through our own change, so
+        # it isn't read again on the next write. The updated row is locked until the
+        # commit, so the version read is the one this change set.
+        tree = self._folderTrees.get(libraryIndex)
+        if tree is not None:
+            cursor.execute("SELECT library_version FROM library WHERE library_id = ?", libraryIndex)
+            row = cursor.fetchone()
+            if row and tree.version == row.library_version - 1:
+                tree.version = row.library_version
+            else:
+                self._folderTrees.pop(libraryIndex, None)
+
+    def _logChange(self, cursor, libraryIndex, objectId, objectType, changeType):
+        """Records a change for clients synchronizing the library. See getChanges()"""
+        cursor.execute("INSERT INTO change_log (library_id, object_id, object_type, change_type) "
+                       "VALUES (?, ?, ?, ?)", libraryIndex, objectId, objectType, changeType)
 
     def _findLibrary(self, name):
         cursor = self._cursor()
@@ -68,12 +102,10 @@ class DatabaseMySQL(Database):
                 self._connection.commit()
             else:
                 # Check that everthing matches
-                if icon is None:
-                    if readOnly == row.library_read_only and len(row.library_icon) == 0:
-                        return
-                else:
-                    if readOnly == row.library_read_only and icon == row.library_icon.decode('UTF-8'):
-                        return
+                if isinstance(icon, str):
+                    icon = icon.encode("utf-8")
+                if readOnly == row.library_read_only and (icon or b"") == _iconBytes(row.library_icon):
+                    return
                 raise DatabaseLibraryCreationError("Library already exists")
         except Exception as ex:
             print("Unable to create library:", ex)
@@ -88,8 +120,9 @@ class DatabaseMySQL(Database):
             if row:
                 raise DatabaseRenameError(msg="Destination library name already exists")
 
-            cursor.execute("UPDATE library SET library_name = ? "
-                                "WHERE library_name = ?", newName, oldName)
+            cursor.execute("UPDATE library SET library_name = ?, library_modified = NOW(),"
+                           " library_version = library_version + 1 WHERE library_name = ?",
+                           newName, oldName)
 
             self._connection.commit()
         except Exception as ex:
@@ -100,8 +133,9 @@ class DatabaseMySQL(Database):
         try:
             cursor = self._cursor()
 
-            cursor.execute("UPDATE library SET library_icon = ? "
-                                "WHERE library_name = ?", icon, name)
+            cursor.execute("UPDATE library SET library_icon = ?, library_modified = NOW(),"
+                           " library_version = library_version + 1 WHERE library_name = ?",
+                           icon, name)
 
             self._connection.commit()
         except Exception as ex:
@@ -119,98 +153,216 @@ class DatabaseMySQL(Database):
             print("Unable to remove library:", ex)
             raise DatabaseDeleteError(ex)
 
-    def libraryModels(self, library):
+    def _page(self, idColumn, limit, after):
+        """
+        Returns the SQL and parameters restricting a listing to one page. Pages are
+        ordered by uuid and the cursor is the last uuid of the previous page.
+        """
+        sql = ""
+        params = []
+        if after:
+            sql += " AND {} > ?".format(idColumn)
+            params.append(after)
+        if limit is not None:
+            sql += " ORDER BY {} LIMIT ?".format(idColumn)
+            params.append(limit)
+        return sql, params
+
+    def libraryModels(self, library, limit=None, after=None):
         try:
             models = []
             cursor = self._cursor()
 
-            cursor.execute("SELECT library_id FROM library WHERE library_name = ?", library)
+            cursor.execute("SELECT library_id, library_version FROM library WHERE library_name = ?", library)
             row = cursor.fetchone()
             if not row:
                 raise DatabaseLibraryNotFound()
+            libraryIndex = row.library_id
+            version = row.library_version
 
-            cursor.execute("SELECT m.model_id, m.folder_id, m.model_name"
-                           " FROM model m, library l"
-                           " WHERE m.library_id = l.library_id AND l.library_name = ?", library)
+            pageSQL, pageParams = self._page("m.model_id", limit, after)
+            cursor.execute("SELECT m.model_id, m.folder_id, m.model_name FROM model m"
+                           " WHERE m.library_id = ?" + pageSQL,
+                           libraryIndex, *pageParams)
             rows = cursor.fetchall()
+            tree = self._folderTree(libraryIndex, version, [row.folder_id for row in rows])
             for row in rows:
-                models.append((row.model_id, row.folder_id, row.model_name))
+                models.append(MaterialLibraryObjectType(row.model_id, tree.path(row.folder_id) or "",
+                                                        row.model_name))
 
-            pathModels = []
-            for model in models:
-                # Convert the folder_id to a path
-                pathModels.append(MaterialLibraryObjectType(model[0], self._getPath(model[1]), model[2]))
-
-            return pathModels
+            return models
         except Exception as ex:
             print("Unable to get library models:", ex)
             raise DatabaseModelNotFound(ex)
 
+    def _materialFilter(self, requiredModels, requiredCompleteModels, includeLegacy):
+        """
+        Returns the SQL and parameters restricting a listing to the materials that pass
+        a filter. Materials must have every required model, and every property of the
+        complete models. Legacy materials are those without any models.
+        """
+        sql = ""
+        params = []
+        required = list(dict.fromkeys((requiredModels or []) + (requiredCompleteModels or [])))
+        if required:
+            sql += (" AND m.material_id IN (SELECT material_id FROM material_models"
+                    " WHERE model_id IN ({}) GROUP BY material_id"
+                    " HAVING COUNT(DISTINCT model_id) = ?)").format(", ".join(["?"] * len(required)))
+            params.extend(required)
+            params.append(len(required))
+        if requiredCompleteModels:
+            sql += (" AND NOT EXISTS (SELECT 1 FROM model_property p"
+                    " WHERE p.model_id IN ({}) AND NOT EXISTS (SELECT 1 FROM material_property_value v"
+                    " WHERE v.material_id = m.material_id"
+                    " AND v.material_property_name = p.model_property_name))").format(
+                        ", ".join(["?"] * len(requiredCompleteModels)))
+            params.extend(requiredCompleteModels)
+        if not includeLegacy:
+            sql += " AND EXISTS (SELECT 1 FROM material_models mm WHERE mm.material_id = m.material_id)"
+        return sql, params
+
     # @cache
-    def libraryMaterials(self, library):
+    def libraryMaterials(self, library, limit=None, after=None,
+                         requiredModels=None, requiredCompleteModels=None, includeLegacy=True):
         try:
             materials = []
             cursor = self._cursor()
 
-            cursor.execute("SELECT library_id FROM library WHERE library_name = ?", library)
+            cursor.execute("SELECT library_id, library_version FROM library WHERE library_name = ?", library)
             row = cursor.fetchone()
             if not row:
                 raise DatabaseLibraryNotFound()
-
-            cursor.execute("SELECT m.material_id, GetFolder(m.folder_id) as folder_name, m.material_name"
-                           " FROM material m, library l"
-                           " WHERE m.library_id = l.library_id AND l.library_name = ?", library)
+            libraryIndex = row.library_id
+            version = row.library_version
+
+            filterSQL, filterParams = self._materialFilter(requiredModels, requiredCompleteModels,
+                                                           includeLegacy)
+            pageSQL, pageParams = self._page("m.material_id", limit, after)
+            cursor.execute("SELECT m.material_id, m.folder_id, m.material_name FROM material m"
+                           " WHERE m.library_id = ?" + filterSQL + pageSQL,
+                           libraryIndex, *filterParams, *pageParams)
             rows = cursor.fetchall()
+            tree = self._folderTree(libraryIndex, version, [row.folder_id for row in rows])
             for row in rows:
-                materials.append(MaterialLibraryObjectType(row.material_id, row.folder_name, row.material_name))
+                materials.append(MaterialLibraryObjectType(row.material_id, tree.path(row.folder_id),
+                                                           row.material_name))
 
             return materials
         except Exception as ex:
             print("Unable to get library materials:", ex)
             raise DatabaseMaterialNotFound(ex)
 
-    def _createPathRecursive(self, libraryIndex, parentIndex, pathIndex, pathList):
-        newId = 0
+    def _folderTree(self, libraryIndex, version=None, folderIds=()):
+        """
+        Returns the folder tree of the library, reading the folder table again when
+        library_version shows the library has changed since the cached tree was read.
+        The tree is also read again if it is missing any of folderIds, which covers
+        folders committed by another client after version was read.
+        """
         cursor = self._cursor()
-
-        if parentIndex == 0:
-            # No parent. This is a root folder
-            # First see if the folder exists
-            cursor.execute("SELECT folder_id FROM folder WHERE folder_name = ? AND library_id = ?"
-                " AND parent_id IS NULL", pathList[pathIndex], libraryIndex)
+        if version is None:
+            cursor.execute("SELECT library_version FROM library WHERE library_id = ?", libraryIndex)
             row = cursor.fetchone()
             if row:
-                newId = row.folder_id
-            else:
-                cursor.execute("INSERT INTO folder (folder_name, library_id) "
-                                            "VALUES (?, ?)", pathList[pathIndex], libraryIndex)
-                newId = self._lastId(cursor)
-                self._updateTimestamp(cursor, libraryIndex)
-        else:
-            # First see if the folder exists
-            cursor.execute("SELECT folder_id FROM folder WHERE folder_name = ? AND library_id = ?"
-                " AND parent_id = ?", pathList[pathIndex], libraryIndex, parentIndex)
-            row = cursor.fetchone()
-            if row:
-                newId = row.folder_id
-            else:
-                cursor.execute("INSERT INTO folder (folder_name, library_id, parent_id) "
-                                            "VALUES (?, ?, ?)", pathList[pathIndex], libraryIndex, parentIndex)
-                newId = self._lastId(cursor)
-                self._updateTimestamp(cursor, libraryIndex)
+                version = row.library_version
 
-        self._connection.commit()
-        index = pathIndex + 1
-        if index >= len(pathList):
-            return newId
-        return self._createPathRecursive(libraryIndex, newId, index, pathList)
+        tree = self._folderTrees.get(libraryIndex)
+        if tree is None or tree.version != version or \
+                any(folderId is not None and tree.path(folderId) is None for folderId in folderIds):
+            cursor.execute("SELECT folder_id, folder_path FROM folder WHERE library_id = ?",
+                           libraryIndex)
+            tree = FolderTree(version, cursor.fetchall())
+            self._folderTrees[libraryIndex] = tree
+        return tree
 
     def _createPath(self, libraryIndex, path):
-        newId = 0
+        """Returns the folder_id for the path, creating the folders on it as needed"""
+        tree = self._folderTree(libraryIndex)
+        cursor = self._cursor()
+        created = False
+        parentIndex = None
         pathList = path.split('/')
-        if len(pathList) > 0:
-            return self._createPathRecursive(libraryIndex, 0, 0, pathList)
-        return newId
+        for pathIndex, name in enumerate(pathList):
+            folderPath = "/".join(pathList[:pathIndex + 1])
+            folderIndex = tree.folderId(folderPath)
+            if folderIndex == 0:
+                # Check the table before creating, in case the folder is newer than the tree
+                folderIndex = self._findFolder(libraryIndex, folderPath)
+                if folderIndex == 0:
+                    cursor.execute("INSERT INTO folder (folder_name, library_id, parent_id, folder_path) "
+                                   "VALUES (?, ?, ?, ?)", name, libraryIndex, parentIndex, folderPath)
+                    folderIndex = self._lastId(cursor)
+                    created = True
+                tree.add(folderIndex, folderPath)
+            parentIndex = folderIndex
+
+        if created:
+            self._updateTimestamp(cursor, libraryIndex)
+            self._connection.commit()
+        return parentIndex
+
+    def _findFolder(self, libraryIndex, path):
+        cursor = self._cursor()
+        cursor.execute("SELECT folder_id FROM folder WHERE library_id = ? AND folder_path = ?",
+                       libraryIndex, path)
+        row = cursor.fetchone()
+        if row:
+            return row.folder_id
+        return 0
+
+    def renameFolder(self, libraryName, oldPath, newPath):
+        """
+        Renames or moves a folder, and everything in it, to newPath. The folders on
+        newPath are created as needed, and the materialized paths of the folder and
+        its descendants are rewritten.
+        """
+        try:
+            libraryIndex = self._findLibrary(libraryName)
+            if libraryIndex == 0:
+                raise DatabaseLibraryNotFound()
+            folderIndex = self._findFolder(libraryIndex, oldPath)
+            if folderIndex == 0:
+                raise DatabaseRenameError(msg="Folder not found")
+            if self._findFolder(libraryIndex, newPath) != 0:
+                raise DatabaseRenameError(msg="Destination folder already exists")
+            if newPath.startswith(oldPath + "/"):
+                raise DatabaseRenameError(msg="A folder can't be moved inside itself")
+
+            pathList = newPath.split('/')
+            parentIndex = None
+            if len(pathList) > 1:
+                parentIndex = self._createPath(libraryIndex, "/".join(pathList[:-1]))
+
+            cursor = self._cursor()
+            cursor.execute("UPDATE folder SET folder_name = ?, parent_id = ? WHERE folder_id = ?",
+                           pathList[-1], parentIndex, folderIndex)
+
+            cursor.execute("SELECT folder_id, folder_path FROM folder WHERE library_id = ?", libraryIndex)
+            moved = []
+            for row in cursor.fetchall():
+                if row.folder_path == oldPath or row.folder_path.startswith(oldPath + "/"):
+                    moved.append((row.folder_id, newPath + row.folder_path[len(oldPath):]))
+            for folderId, path in moved:
+                cursor.execute("UPDATE folder SET folder_path = ? WHERE folder_id = ?", path, folderId)
+
+            # The objects in the folders have new paths
+            for folderIds, inList in self._inLists([folderId for folderId, _ in moved]):
+                for table, idColumn, objectType in [("model", "model_id", "Model"),
+                                                    ("material", "material_id", "Material")]:
+                    cursor.execute("SELECT {0} FROM {1} WHERE folder_id IN {2}".format(
+                                       idColumn, table, inList), *folderIds)
+                    for row in cursor.fetchall():
+                        self._logChange(cursor, libraryIndex, getattr(row, idColumn), objectType, "Updated")
+
+            self._updateTimestamp(cursor, libraryIndex)
+            self._connection.commit()
+            self._folderTrees.pop(libraryIndex, None)
+        except (DatabaseLibraryNotFound, DatabaseRenameError) as error:
+            # Rethrow
+            raise error
+        except Exception as ex:
+            print("Unable to rename folder:", ex)
+            raise DatabaseRenameError(error=ex)
 
     def _foreignKeysIgnore(self, cursor):
         cursor.execute("SET FOREIGN_KEY_CHECKS=0")
@@ -336,6 +488,7 @@ class DatabaseMySQL(Database):
 
             for property in model.Properties.values():
                 self._createModelProperty(model.UUID, property, libraryIndex)
+            self._logChange(cursor, libraryIndex, model.UUID, "Model", "Created")
             self._updateTimestamp(cursor, libraryIndex)
         self._connection.commit()
 
@@ -394,6 +547,7 @@ class DatabaseMySQL(Database):
 
             for property in model.Properties.values():
                 self._updateModelProperty(model.UUID, property, libraryIndex)
+            self._logChange(cursor, libraryIndex, model.UUID, "Model", "Updated")
             self._updateTimestamp(cursor, libraryIndex)
         self._connection.commit()
 
@@ -634,6 +788,7 @@ class DatabaseMySQL(Database):
             # print("{} Properties".format(len(material.PropertyObjects)))
             for property in material.PropertyObjects.values():
                 self._createMaterialProperty(material.UUID, material, property, libraryIndex)
+            self._logChange(cursor, libraryIndex, material.UUID, "Material", "Created")
             self._updateTimestamp(cursor, libraryIndex)
 
         self._connection.commit()
@@ -657,7 +812,7 @@ class DatabaseMySQL(Database):
                                     "library")
         rows = cursor.fetchall()
         for row in rows:
-            libraries.append(MaterialLibraryType(row.library_name, row.library_icon.decode('UTF-8'), row.library_read_only,
+            libraries.append(MaterialLibraryType(row.library_name, _iconBytes(row.library_icon), row.library_read_only,
                               row.library_modified))
 
         return libraries
@@ -669,7 +824,7 @@ class DatabaseMySQL(Database):
                        " FROM library l, model m WHERE l.library_id = m.library_id")
         rows = cursor.fetchall()
         for row in rows:
-            libraries.append(MaterialLibraryType(row.library_name, row.library_icon.decode('UTF-8'), row.library_read_only,
+            libraries.append(MaterialLibraryType(row.library_name, _iconBytes(row.library_icon), row.library_read_only,
                               row.library_modified))
 
         return libraries
@@ -681,7 +836,7 @@ class DatabaseMySQL(Database):
                        " FROM library l, material m WHERE l.library_id = m.library_id")
         rows = cursor.fetchall()
         for row in rows:
-            libraries.append(MaterialLibraryType(row.library_name, row.library_icon.decode('UTF-8'), row.library_read_only,
+            libraries.append(MaterialLibraryType(row.library_name, _iconBytes(row.library_icon), row.library_read_only,
                               row.library_modified))
 
         return libraries
@@ -694,163 +849,164 @@ class DatabaseMySQL(Database):
 
         row = cursor.fetchone()
         if row:
-            return (row.library_name, row.library_icon.decode('UTF-8'), row.library_read_only,
+            return (row.library_name, _iconBytes(row.library_icon), row.library_read_only,
                               row.library_modified)
         return None
 
-    def _getLibrary(self, libraryId):
+    def getLibraryModified(self, name):
+        """Returns the library_modified timestamp used to validate cached listings"""
         cursor = self._cursor()
-        cursor.execute("SELECT library_name, library_icon, library_read_only FROM "
-                                    "library WHERE library_id = ?",
-                       libraryId)
+        cursor.execute("SELECT library_modified FROM library WHERE library_name = ?", name)
+
         row = cursor.fetchone()
         if row:
-            return (row.library_name, row.library_icon.decode('UTF-8'), row.library_read_only)
+            return row.library_modified
         return None
 
-    def _getPath(self, folderId):
-        path = ""
-        cursor = self._cursor()
-        cursor.execute("""WITH RECURSIVE subordinate AS (
-                        SELECT
-                            folder_id,
-                            folder_name,
-                            parent_id
-                        FROM folder
-                        WHERE folder_id = ?
-
-                        UNION ALL
-
-                        SELECT
-                            e.folder_id,
-                            e.folder_name,
-                            e.parent_id
-                        FROM folder e
-                        JOIN subordinate s
-                        ON e.folder_id = s.parent_id
-                        )
-                        SELECT
-                            folder_name
-                        FROM subordinate
-                        ORDER BY folder_id ASC;""",
-                       folderId)
-        rows = cursor.fetchall()
-        first = True
-        for row in rows:
-            if first:
-                path = row.folder_name
-                first = False
-            else:
-                path += "/" + row.folder_name
-        return path
-
-    def _getInherits(self, uuid):
-        inherits = []
+    def getLibraryVersion(self, name):
+        """
+        Returns the library_version and library_modified of the library, or None when it
+        doesn't exist. The version moves on every change, however close together.
+        """
         cursor = self._cursor()
-        cursor.execute("SELECT inherits_id FROM model_inheritance "
-                                    "WHERE model_id = ?",
-                       uuid)
-        rows = cursor.fetchall()
-        for row in rows:
-            inherits.append(row.inherits_id)
+        cursor.execute("SELECT library_version, library_modified FROM library WHERE library_name = ?",
+                       name)
 
-        return inherits
-
-    def _getModelColumns(self, uuid, propertyName):
-        columns = []
-        cursor = self._cursor()
-        cursor.execute("SELECT model_property_id FROM model_property "
-                                    "WHERE model_id = ? AND model_property_name = ?",
-                       uuid, propertyName)
-        propertyId = 0
         row = cursor.fetchone()
         if row:
-            propertyId = row.model_property_id
-            cursor.execute("SELECT model_property_name, "
-                                    "model_property_display_name, model_property_type, "
-                                    "model_property_units, model_property_url, "
-                                    "model_property_description FROM model_property_column "
-                                    "WHERE model_property_id = ?",
-                        propertyId)
-
-            rows = cursor.fetchall()
-            for row in rows:
-                prop = Materials.ModelProperty()
-                prop.Name = row.model_property_name
-                prop.DisplayName = row.model_property_display_name
-                prop.Type = row.model_property_type
-                prop.Units = row.model_property_units
-                prop.URL = row.model_property_url
-                prop.Description = row.model_property_description
-
-                columns.append(prop)
-
-        return columns
+            return (row.library_version, row.library_modified)
+        return None
 
-    def _getModelProperties(self, uuid):
-        properties = []
+    def getLibrariesVersion(self):
+        """
+        Returns the number of libraries, the highest library_id, the sum of the
+        library_version values and the latest library_modified timestamp. The count
+        catches libraries that have been removed and the library_id those added.
+        """
         cursor = self._cursor()
-        cursor.execute("SELECT model_property_name, "
-                                    "model_property_display_name, model_property_type, "
-                                    "model_property_units, model_property_url, "
-                                    "model_property_description FROM model_property "
-                                    "WHERE model_id = ?",
-                       uuid)
+        cursor.execute("SELECT COUNT(*) AS library_count, MAX(library_id) AS library_id,"
+                       " SUM(library_version) AS library_version,"
+                       " MAX(library_modified) AS library_modified FROM library")
 
-        rows = cursor.fetchall()
-        for row in rows:
-            prop = Materials.ModelProperty()
-            prop.Name = row.model_property_name
-            prop.DisplayName = row.model_property_display_name
-            prop.Type = row.model_property_type
-            prop.Units = row.model_property_units
-            prop.URL = row.model_property_url
-            prop.Description = row.model_property_description
+        row = cursor.fetchone()
+        return (row.library_count, row.library_id, row.library_version, row.library_modified)
 
-            properties.append(prop)
+    def getChangeToken(self, library):
+        """Returns the token identifying the latest change to the library"""
+        cursor = self._cursor()
+        cursor.execute("SELECT MAX(c.change_id) AS change_id FROM change_log c, library l"
+                       " WHERE c.library_id = l.library_id AND l.library_name = ?", library)
 
-        # This has to happen after the properties are retrieved to prevent nested queries
-        for property in properties:
-            columns = self._getModelColumns(uuid, property.Name)
-            for column in columns:
-                property.addColumn(column)
+        row = cursor.fetchone()
+        if row and row.change_id is not None:
+            return row.change_id
+        return 0
 
-        return properties
+    def _inLists(self, values):
+        """Splits values into chunks, returning each with its IN list placeholders"""
+        for start in range(0, len(values), IN_LIST_SIZE):
+            chunk = values[start:start + IN_LIST_SIZE]
+            yield chunk, "({})".format(", ".join(["?"] * len(chunk)))
 
-    def getModel(self, uuid):
+    def _listObjects(self, table, idColumn, nameColumn, uuids):
+        """Returns a dictionary of uuid to MaterialLibraryObjectType for the objects found"""
+        objects = {}
+        cursor = self._cursor()
+        for chunk, inList in self._inLists(uuids):
+            cursor.execute("SELECT o.{0}, COALESCE(f.folder_path, '') AS folder_path, o.{1}"
+                           " FROM {2} o LEFT JOIN folder f ON f.folder_id = o.folder_id"
+                           " WHERE o.{0} IN {3}".format(idColumn, nameColumn, table, inList),
+                           *chunk)
+            rows = cursor.fetchall()
+            for row in rows:
+                uuid = getattr(row, idColumn)
+                objects[uuid] = MaterialLibraryObjectType(uuid, row.folder_path, getattr(row, nameColumn))
+        return objects
+
+    def _changes(self, latest, objects):
+        changes = []
+        for uuid, change in latest.items():
+            object = objects.get(uuid)
+            if object is None:
+                # Removed without the deletion being logged
+                change = "deleted"
+            changes.append((uuid, change, object))
+        return changes
+
+    def getChanges(self, library, since):
+        """
+        Returns the changes to the models and materials of a library after since, which is
+        either a token returned by an earlier call or a timestamp. Only the latest change
+        to each object is returned.
+
+        Returns the token for the next call and lists of (uuid, change, object) for the
+        models and the materials. change is 'created', 'updated' or 'deleted', and object
+        is the MaterialLibraryObjectType, or None once the object is deleted.
+        """
         try:
             cursor = self._cursor()
-            cursor.execute("SELECT library_id, folder_id, model_type, "
-                "model_name, model_url, model_description, model_doi FROM model WHERE model_id = ?",
-                        uuid)
 
+            cursor.execute("SELECT library_id FROM library WHERE library_name = ?", library)
             row = cursor.fetchone()
             if not row:
-                raise DatabaseModelNotFound()
+                raise DatabaseLibraryNotFound()
+            libraryIndex = row.library_id
 
-            model = Materials.Model()
-            # model.UUID = uuid
-            model.Type = row.model_type
-            model.Name = row.model_name
-            model.URL = row.model_url
-            model.Description = row.model_description
-            model.DOI = row.model_doi
+            # Read first, so that changes made meanwhile are left for the next call
+            token = self.getChangeToken(library)
 
-            # model.Library = self._getLibrary(row.library_id)
-            library = self._getLibrary(row.library_id)
+            if isinstance(since, str) and not since.isdigit():
+                sinceSQL = "change_time > ?"
+            else:
+                sinceSQL = "change_id > ?"
+                since = int(since)
+            cursor.execute("SELECT object_id, object_type, change_type FROM change_log"
+                           " WHERE library_id = ? AND " + sinceSQL + " AND change_id <= ?"
+                           " ORDER BY change_id", libraryIndex, since, token)
+            latest = {"Model": {}, "Material": {}}
+            rows = cursor.fetchall()
+            for row in rows:
+                latest[row.object_type][row.object_id] = row.change_type.lower()
+
+            models = self._listObjects("model", "model_id", "model_name", list(latest["Model"]))
+            materials = self._listObjects("material", "material_id", "material_name",
+                                          list(latest["Material"]))
+            return (token, self._changes(latest["Model"], models),
+                    self._changes(latest["Material"], materials))
+        except DatabaseLibraryNotFound as notFound:
+            # Rethrow
+            raise notFound
+        except Exception as ex:
+            print("Unable to get library changes:", ex)
+            raise DatabaseLibraryNotFound(ex)
 
-            path = self._getPath(row.folder_id) #+ "/" + row.model_name
-            model.Directory = path
+    def _getLibrary(self, libraryId):
+        cursor = self._cursor()
+        cursor.execute("SELECT library_name, library_icon, library_read_only FROM "
+                                    "library WHERE library_id = ?",
+                       libraryId)
+        row = cursor.fetchone()
+        if row:
+            return (row.library_name, _iconBytes(row.library_icon), row.library_read_only)
+        return None
 
-            inherits = self._getInherits(uuid)
-            for inherit in inherits:
-                model.addInheritance(inherit)
+    def _getPath(self, folderId, libraryIndex=None):
+        if libraryIndex is not None:
+            return self._folderTree(libraryIndex, folderIds=[folderId]).path(folderId) or ""
 
-            properties = self._getModelProperties(uuid)
-            for property in properties:
-                model.addProperty(property)
+        cursor = self._cursor()
+        cursor.execute("SELECT folder_path FROM folder WHERE folder_id = ?", folderId)
+        row = cursor.fetchone()
+        if row and row.folder_path is not None:
+            return row.folder_path
+        return ""
 
-            return (uuid, library, model)
+    def getModel(self, uuid):
+        try:
+            models = self._loadModels([uuid])
+            if uuid not in models:
+                raise DatabaseModelNotFound()
+            return models[uuid]
 
         except DatabaseModelNotFound as notFound:
             # Rethrow
@@ -859,204 +1015,287 @@ class DatabaseMySQL(Database):
             print("Unable to get model:", ex)
             raise DatabaseModelNotFound(ex)
 
-    def _getTags(self, uuid):
-        tags = []
-        cursor = self._cursor()
-        cursor.execute("SELECT t.material_tag_name FROM material_tag t, material_tag_mapping m "
-                          "WHERE m.material_id = ? AND m.material_tag_id = t.material_tag_id",
-                       uuid)
-
-        rows = cursor.fetchall()
-        for row in rows:
-            tags.append(row.material_tag_name)
-
-        return tags
-
-    def _getMaterialModels(self, uuid, isPhysical):
-        models = []
-        cursor = self._cursor()
-        cursor.execute("SELECT m1.model_id FROM material_models m1, model m2 "
-            "WHERE m1.material_id = ? AND m1.model_id = m2.model_id AND m2.model_type = ?",
-                       uuid,
-                       ("Physical" if isPhysical else "Appearance"))
+    def getModels(self, uuids):
+        """
+        Loads many models in the same number of queries as a single model, per chunk
+        of uuids.
 
-        rows = cursor.fetchall()
-        for row in rows:
-            models.append(row.model_id)
+        Returns a dictionary keyed by uuid in the order requested. Each value is either
+        the (uuid, library, model) tuple or a DatabaseModelNotFound.
+        """
+        try:
+            found = self._loadModels(list(dict.fromkeys(uuids)))
+        except Exception as ex:
+            print("Unable to get models:", ex)
+            raise DatabaseModelNotFound(ex)
 
+        models = {}
+        for uuid in uuids:
+            models[uuid] = found.get(uuid, DatabaseModelNotFound())
         return models
 
-    def _getMaterialPropertyStringValue(self, materialPropertyValueId):
-        cursor = self._cursor()
-        cursor.execute("SELECT material_property_value "
-                        "FROM material_property_string_value "
-                        "WHERE material_property_value_id = ?",
-                       materialPropertyValueId)
-        row = cursor.fetchone()
-        if not row:
-            return None
-
-        return row.material_property_value
-
-    def _getMaterialPropertyLongStringValue(self, materialPropertyValueId):
-        cursor = self._cursor()
-        cursor.execute("SELECT material_property_value "
-                        "FROM material_property_long_string_value "
-                        "WHERE material_property_value_id = ?",
-                       materialPropertyValueId)
-        row = cursor.fetchone()
-        if not row:
-            return None
-
-        return row.material_property_value
-
-    def _getMaterialPropertyListValue(self, materialPropertyValueId):
+    def _getInheritanceClosure(self, uuid):
+        """
+        Returns the model_inheritance rows reachable from the model, following the
+        inheritance to any depth in a single recursive query.
+        """
         cursor = self._cursor()
-        cursor.execute("SELECT material_property_value "
-                        "FROM material_property_string_value "
-                        "WHERE material_property_value_id = ? "
-                        "ORDER BY material_property_value_id ASC",
-                       materialPropertyValueId)
-        rows = cursor.fetchall()
-        list = []
-        for row in rows:
-            list.append(row.material_property_value)
+        cursor.execute("""WITH RECURSIVE closure AS (
+                        SELECT
+                            model_inheritance_id,
+                            model_id,
+                            inherits_id
+                        FROM model_inheritance
+                        WHERE model_id = ?
 
-        return list
+                        UNION
 
-    def _getMaterialPropertyLongListValue(self, materialPropertyValueId):
-        cursor = self._cursor()
-        cursor.execute("SELECT material_property_value "
-                        "FROM material_property_long_string_value "
-                        "WHERE material_property_value_id = ? "
-                        "ORDER BY material_property_value_id ASC",
-                       materialPropertyValueId)
-        rows = cursor.fetchall()
-        list = []
-        for row in rows:
-            list.append(row.material_property_value)
+                        SELECT
+                            i.model_inheritance_id,
+                            i.model_id,
+                            i.inherits_id
+                        FROM model_inheritance i
+                        JOIN closure c
+                        ON i.model_id = c.inherits_id
+                        )
+                        SELECT
+                            model_inheritance_id,
+                            model_id,
+                            inherits_id
+                        FROM closure
+                        ORDER BY model_inheritance_id ASC;""",
+                       uuid)
+        return cursor.fetchall()
 
-        return list
+    def _loadModels(self, uuids, inheritRows=None):
+        """
+        Loads the models using a fixed number of set based queries rather than several
+        per model and property. inheritRows are the model_inheritance rows when they
+        have already been read.
 
-    def _getMaterialPropertyArray2D(self, materialPropertyValueId):
+        Returns a dictionary of uuid to (uuid, library, model) for the models found.
+        """
         cursor = self._cursor()
-        array=Materials.Array2D()
-
-        cursor.execute("SELECT material_property_array_rows, material_property_array_columns "
-                        "FROM material_property_array_description "
-                        "WHERE material_property_value_id = ?",
-                       materialPropertyValueId)
-        row = cursor.fetchone()
-        if not row:
-            return None
-        # Columns must be set first so rows can be created
-        # print("rows {}, columns {}".format(row.material_property_array_rows, row.material_property_array_columns))
-        array.Columns = row.material_property_array_columns
-        array.Rows = row.material_property_array_rows
-
-        cursor.execute("SELECT material_property_value_row, material_property_value_column,"
-                        " material_property_value_depth, material_property_value "
-                        "FROM material_property_array_value "
-                        "WHERE material_property_value_id = ? "
-                        "ORDER BY material_property_value_id ASC",
-                       materialPropertyValueId)
-        rows = cursor.fetchall()
-        for row in rows:
-            array.setValue(row.material_property_value_row,
-                            row.material_property_value_column,
-                            row.material_property_value)
+        modelRows = []
+        propertyRows = []
+        readInherits = inheritRows is None
+        if readInherits:
+            inheritRows = []
+        for chunk, inList in self._inLists(uuids):
+            cursor.execute("SELECT m.model_id, COALESCE(f.folder_path, '') AS folder_path,"
+                           " m.model_type, m.model_name, m.model_url, m.model_description, m.model_doi,"
+                           " l.library_name, l.library_icon, l.library_read_only"
+                           " FROM model m JOIN library l ON m.library_id = l.library_id"
+                           " LEFT JOIN folder f ON f.folder_id = m.folder_id"
+                           " WHERE m.model_id IN " + inList,
+                           *chunk)
+            modelRows.extend(cursor.fetchall())
+
+            if readInherits:
+                cursor.execute("SELECT model_inheritance_id, model_id, inherits_id FROM model_inheritance"
+                               " WHERE model_id IN " + inList + " ORDER BY model_inheritance_id", *chunk)
+                inheritRows.extend(cursor.fetchall())
+
+            cursor.execute("SELECT p.model_id, p.model_property_id, p.model_property_name,"
+                           " p.model_property_display_name, p.model_property_type,"
+                           " p.model_property_units, p.model_property_url,"
+                           " p.model_property_description, c.model_property_column_id,"
+                           " c.model_property_name AS column_name,"
+                           " c.model_property_display_name AS column_display_name,"
+                           " c.model_property_type AS column_type,"
+                           " c.model_property_units AS column_units,"
+                           " c.model_property_url AS column_url,"
+                           " c.model_property_description AS column_description"
+                           " FROM model_property p LEFT JOIN model_property_column c"
+                           " ON c.model_property_id = p.model_property_id"
+                           " WHERE p.model_id IN " + inList +
+                           " ORDER BY p.model_property_id, c.model_property_column_id", *chunk)
+            propertyRows.extend(cursor.fetchall())
+
+        return self._assembleModels(modelRows, inheritRows, propertyRows)
+
+    def _assembleModels(self, modelRows, inheritRows, propertyRows):
+        inherits = {}
+        for row in inheritRows:
+            inherits.setdefault(row.model_id, []).append(row.inherits_id)
 
-        return array
-
-    def _getMaterialPropertyArray3D(self, materialPropertyValueId):
-        cursor = self._cursor()
-        array=Materials.Array3D()
+        properties = {}
+        propertyIds = {}
+        for row in propertyRows:
+            prop = propertyIds.get(row.model_property_id)
+            if prop is None:
+                prop = Materials.ModelProperty()
+                prop.Name = row.model_property_name
+                prop.DisplayName = row.model_property_display_name
+                prop.Type = row.model_property_type
+                prop.Units = row.model_property_units
+                prop.URL = row.model_property_url
+                prop.Description = row.model_property_description
+                propertyIds[row.model_property_id] = prop
+                properties.setdefault(row.model_id, []).append(prop)
+            if row.model_property_column_id is not None:
+                column = Materials.ModelProperty()
+                column.Name = row.column_name
+                column.DisplayName = row.column_display_name
+                column.Type = row.column_type
+                column.Units = row.column_units
+                column.URL = row.column_url
+                column.Description = row.column_description
+                prop.addColumn(column)
+
+        models = {}
+        for row in modelRows:
+            model = Materials.Model()
+            model.Type = row.model_type
+            model.Name = row.model_name
+            model.URL = row.model_url
+            model.Description = row.model_description
+            model.DOI = row.model_doi
+            model.Directory = row.folder_path
 
-        cursor.execute("SELECT material_property_array_depth, material_property_array_columns "
-                        "FROM material_property_array_description "
-                        "WHERE material_property_value_id = ?",
-                       materialPropertyValueId)
-        row = cursor.fetchone()
-        if not row:
-            return None
-        # Columns must be set first so depth can be created
-        array.Columns = row.material_property_array_columns
-        array.Depth = row.material_property_array_depth
-
-        cursor.execute("SELECT material_property_value "
-                        "FROM material_property_string_value "
-                        "WHERE material_property_value_id = ?",
-                       materialPropertyValueId)
-        rows = cursor.fetchall()
-        for depth, row in enumerate(rows):
-            array.setDepthValue(depth, row.material_property_value)
-
-        cursor.execute("SELECT material_property_value_row, material_property_value_column,"
-                        " material_property_value_depth, material_property_value_depth_rows,"
-                        " material_property_value "
-                        "FROM material_property_array_value "
-                        "WHERE material_property_value_id = ? "
-                        "ORDER BY material_property_value_id ASC",
-                       materialPropertyValueId)
-        rows = cursor.fetchall()
+            for inherit in inherits.get(row.model_id, []):
+                model.addInheritance(inherit)
+            for property in properties.get(row.model_id, []):
+                model.addProperty(property)
 
-        for row in rows:
-            array.setRows(row.material_property_value_depth, row.material_property_value_depth_rows)
-            array.setValue(row.material_property_value_depth,
-                            row.material_property_value_row,
-                            row.material_property_value_column,
-                            row.material_property_value)
+            library = (row.library_name, _iconBytes(row.library_icon), row.library_read_only)
+            models[row.model_id] = (row.model_id, library, model)
 
-        return array
+        return models
 
-    def _getMaterialPropertyValue(self, materialPropertyValueId, type):
-        if type == "2DArray":
-            return self._getMaterialPropertyArray2D(materialPropertyValueId)
-        elif type == "3DArray":
-            return self._getMaterialPropertyArray3D(materialPropertyValueId)
-        elif type == "SVG" or \
-           type == "Image":
-            return self._getMaterialPropertyLongStringValue(materialPropertyValueId)
-        elif type == "List" or \
-           type == "FileList":
-            return self._getMaterialPropertyListValue(materialPropertyValueId)
-        elif type == "ImageList":
-            return self._getMaterialPropertyLongListValue(materialPropertyValueId)
+    def getModelClosure(self, uuid):
+        """
+        Returns the model followed by every model it inherits from, directly or
+        indirectly, nearest first. Each entry is a (uuid, library, model) tuple as
+        returned by getModel().
+        """
+        try:
+            inheritRows = self._getInheritanceClosure(uuid)
+            parents = {}
+            for row in inheritRows:
+                parents.setdefault(row.model_id, []).append(row.inherits_id)
+
+            # Breadth first, so each model precedes the models it inherits from
+            order = [uuid]
+            for current in order:
+                for parent in parents.get(current, []):
+                    if parent not in order:
+                        order.append(parent)
+
+            models = self._loadModels(order, inheritRows)
+            if uuid not in models:
+                raise DatabaseModelNotFound()
+            return [models[current] for current in order if current in models]
 
-        return self._getMaterialPropertyStringValue(materialPropertyValueId)
+        except DatabaseModelNotFound as notFound:
+            # Rethrow
+            raise notFound
+        except Exception as ex:
+            print("Unable to get model:", ex)
+            raise DatabaseModelNotFound(ex)
 
-    def _getMaterialProperties(self, uuid):
+    def getMaterials(self, uuids, chunkSize=IN_LIST_SIZE):
+        """
+        Loads many materials, a chunk of uuids at a time, using a fixed number of
+        queries per chunk. This is a generator so that very large sets of materials
+        needn't be held in memory together.
+
+        Yields (uuid, result) pairs in the order requested, where the result is either
+        the (uuid, library, material) tuple or a DatabaseMaterialNotFound.
+        """
+        uuids = list(uuids)
+        chunkSize = max(1, min(chunkSize, IN_LIST_SIZE))
+        for start in range(0, len(uuids), chunkSize):
+            chunk = uuids[start:start + chunkSize]
+            try:
+                found = self._loadMaterials(list(dict.fromkeys(chunk)))
+            except Exception as ex:
+                print("Unable to get materials:", ex)
+                raise DatabaseMaterialNotFound(ex)
+            for uuid in chunk:
+                yield uuid, found.get(uuid, DatabaseMaterialNotFound())
+
+    def _valueRows(self, cursor, table, orderColumn, columns, inList, chunk):
+        """Reads the rows of a property value table for the materials in the IN list"""
+        cursor.execute("SELECT t.material_property_value_id, " + columns +
+                       " FROM material_property_value v, " + table + " t"
+                       " WHERE t.material_property_value_id = v.material_property_value_id"
+                       " AND v.material_id IN " + inList +
+                       " ORDER BY t." + orderColumn, *chunk)
+        values = {}
+        for row in cursor.fetchall():
+            values.setdefault(row.material_property_value_id, []).append(row)
+        return values
+
+    def _loadMaterials(self, uuids):
+        """
+        Loads the materials using a fixed number of set based queries, however many
+        properties they have, and assembles them in Python.
+
+        Returns a dictionary of uuid to (uuid, library, material) for the materials found.
+        """
         cursor = self._cursor()
-        cursor.execute("SELECT material_property_value_id, material_property_name, material_property_type "
-                        "FROM material_property_value "
-                        "WHERE material_id = ?",
-                       uuid)
-
-        propertyKeys = {}
-        rows = cursor.fetchall()
-        for row in rows:
-            propertyKeys[row.material_property_name] = (row.material_property_value_id, row.material_property_type)
-
+        materialRows = []
+        tags = {}
+        models = {}
         properties = {}
-        for key, value in propertyKeys.items():
-            properties[key] = self._getMaterialPropertyValue(value[0], value[1])
-
-        return properties
-
-    def getMaterial(self, uuid):
-        try:
-            cursor = self._cursor()
-            cursor.execute("SELECT library_id, folder_id, material_name, "
-                                "material_author, material_license, material_parent_uuid, "
-                                "material_description, material_url, material_reference FROM "
-                                "material WHERE material_id = ?",
-                        uuid)
-
-            row = cursor.fetchone()
-            if not row:
-                raise DatabaseMaterialNotFound()
+        strings = {}
+        longStrings = {}
+        descriptions = {}
+        cells = {}
+        for chunk, inList in self._inLists(uuids):
+            cursor.execute("SELECT m.material_id, COALESCE(f.folder_path, '') AS folder_path,"
+                           " m.material_name, m.material_author, m.material_license,"
+                           " m.material_parent_uuid, m.material_description, m.material_url,"
+                           " m.material_reference, l.library_name, l.library_icon, l.library_read_only"
+                           " FROM material m JOIN library l ON m.library_id = l.library_id"
+                           " LEFT JOIN folder f ON f.folder_id = m.folder_id"
+                           " WHERE m.material_id IN " + inList,
+                           *chunk)
+            materialRows.extend(cursor.fetchall())
+
+            cursor.execute("SELECT m.material_id, t.material_tag_name"
+                           " FROM material_tag t, material_tag_mapping m"
+                           " WHERE m.material_tag_id = t.material_tag_id AND m.material_id IN " + inList,
+                           *chunk)
+            for row in cursor.fetchall():
+                tags.setdefault(row.material_id, []).append(row.material_tag_name)
+
+            cursor.execute("SELECT m1.material_id, m1.model_id, m2.model_type"
+                           " FROM material_models m1, model m2"
+                           " WHERE m1.model_id = m2.model_id AND m1.material_id IN " + inList,
+                           *chunk)
+            for row in cursor.fetchall():
+                models.setdefault(row.material_id, []).append((row.model_id, row.model_type))
+
+            cursor.execute("SELECT material_id, material_property_value_id, material_property_name,"
+                           " material_property_type FROM material_property_value"
+                           " WHERE material_id IN " + inList, *chunk)
+            for row in cursor.fetchall():
+                properties.setdefault(row.material_id, []).append(row)
+
+            strings.update(self._valueRows(cursor, "material_property_string_value",
+                                           "material_property_string_value_id",
+                                           "t.material_property_value", inList, chunk))
+            longStrings.update(self._valueRows(cursor, "material_property_long_string_value",
+                                               "material_property_long_string_value_id",
+                                               "t.material_property_value", inList, chunk))
+            descriptions.update(self._valueRows(cursor, "material_property_array_description",
+                                                "material_property_array_description_id",
+                                                "t.material_property_array_rows,"
+                                                " t.material_property_array_columns,"
+                                                " t.material_property_array_depth", inList, chunk))
+            cells.update(self._valueRows(cursor, "material_property_array_value",
+                                         "material_property_array_value_id",
+                                         "t.material_property_value_row,"
+                                         " t.material_property_value_column,"
+                                         " t.material_property_value_depth,"
+                                         " t.material_property_value_depth_rows,"
+                                         " t.material_property_value", inList, chunk))
+
+        materials = {}
+        for row in materialRows:
             material = Materials.Material()
-            # material.UUID = uuid
             material.Name = row.material_name
             material.Author = row.material_author
             material.License = row.material_license
@@ -1064,30 +1303,78 @@ class DatabaseMySQL(Database):
             material.Description = row.material_description
             material.URL = row.material_url
             material.Reference = row.material_reference
+            material.Directory = row.folder_path
 
-            library = self._getLibrary(row.library_id)
+            for tag in tags.get(row.material_id, []):
+                material.addTag(tag)
 
-            path = self._getPath(row.folder_id) #+ "/" + row.material_name
-            material.Directory = path
+            for model, modelType in models.get(row.material_id, []):
+                if modelType == "Physical":
+                    material.addPhysicalModel(model)
+            for model, modelType in models.get(row.material_id, []):
+                if modelType == "Appearance":
+                    material.addAppearanceModel(model)
 
-            tags = self._getTags(uuid)
-            for tag in tags:
-                material.addTag(tag)
+            # The actual properties are set by the model. We just need to load the values
+            for property in properties.get(row.material_id, []):
+                valueId = property.material_property_value_id
+                value = self._assembleValue(property.material_property_type,
+                                            strings.get(valueId, []), longStrings.get(valueId, []),
+                                            descriptions.get(valueId), cells.get(valueId, []))
+                material.setValue(property.material_property_name, value)
 
-            for model in self._getMaterialModels(uuid, True):
-                material.addPhysicalModel(model)
+            library = (row.library_name, _iconBytes(row.library_icon), row.library_read_only)
+            materials[row.material_id] = (row.material_id, library, material)
 
-            for model in self._getMaterialModels(uuid, False):
-                material.addAppearanceModel(model)
+        return materials
 
-            # self.addModelProperties(material)
+    def _assembleValue(self, type, strings, longStrings, descriptions, cells):
+        """Builds a property value from the rows of the value tables belonging to it"""
+        if type == "2DArray":
+            if not descriptions:
+                return None
+            array = Materials.Array2D()
+            # Columns must be set first so rows can be created
+            array.Columns = descriptions[0].material_property_array_columns
+            array.Rows = descriptions[0].material_property_array_rows
+            for cell in cells:
+                array.setValue(cell.material_property_value_row,
+                               cell.material_property_value_column,
+                               cell.material_property_value)
+            return array
+        elif type == "3DArray":
+            if not descriptions:
+                return None
+            array = Materials.Array3D()
+            # Columns must be set first so depth can be created
+            array.Columns = descriptions[0].material_property_array_columns
+            array.Depth = descriptions[0].material_property_array_depth
+            for depth, row in enumerate(strings):
+                array.setDepthValue(depth, row.material_property_value)
+            for cell in cells:
+                array.setRows(cell.material_property_value_depth, cell.material_property_value_depth_rows)
+                array.setValue(cell.material_property_value_depth,
+                               cell.material_property_value_row,
+                               cell.material_property_value_column,
+                               cell.material_property_value)
+            return array
+        elif type == "SVG" or \
+           type == "Image":
+            return longStrings[0].material_property_value if longStrings else None
+        elif type == "List" or \
+           type == "FileList":
+            return [row.material_property_value for row in strings]
+        elif type == "ImageList":
+            return [row.material_property_value for row in longStrings]
 
-            # The actual properties are set by the model. We just need to load the values
-            properties = self._getMaterialProperties(uuid)
-            for name, value in properties.items():
-                material.setValue(name, value)
+        return strings[0].material_property_value if strings else None
 
-            return (uuid, library, material)
+    def getMaterial(self, uuid):
+        try:
+            materials = self._loadMaterials([uuid])
+            if uuid not in materials:
+                raise DatabaseMaterialNotFound()
+            return materials[uuid]
 
         except DatabaseMaterialNotFound as notFound:
             # Rethrow
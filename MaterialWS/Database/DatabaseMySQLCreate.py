@@ -23,6 +23,7 @@ __author__ = "David Carter"
 __url__ = "https://www.davesrocketshop.com"
 
 from MaterialWS.Database.DatabaseMySQL import DatabaseMySQL
+from MaterialWS.Database.FolderTree import FolderTree
 from MaterialWS.Configuration import getDatabaseName
 from MaterialWS.Database.Exceptions import DatabaseCreationError, DatabaseTableCreationError
 
@@ -38,13 +39,15 @@ class DatabaseMySQLCreate(DatabaseMySQL):
                             library_name VARCHAR(512) NOT NULL UNIQUE,
                             library_icon BLOB,
                             library_read_only TINYINT(1) NOT NULL DEFAULT 0,
-	                        library_modified DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+	                        library_modified DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                            library_version INTEGER NOT NULL DEFAULT 0
                         )""",
             "folder" :  """CREATE TABLE folder (
                             folder_id INTEGER AUTO_INCREMENT NOT NULL PRIMARY KEY,
                             folder_name VARCHAR(512) NOT NULL,
                             library_id INTEGER NOT NULL,
                             parent_id INTEGER,
+                            folder_path VARCHAR(1024),
                             FOREIGN KEY (library_id)
                                 REFERENCES library(library_id)
                                 ON DELETE CASCADE,
@@ -195,35 +198,33 @@ class DatabaseMySQLCreate(DatabaseMySQL):
                         FOREIGN KEY (material_property_value_id)
                             REFERENCES material_property_value(material_property_value_id)
                             ON DELETE CASCADE
+                    )""",
+            "change_log" : """CREATE TABLE change_log (
+                        change_id INTEGER AUTO_INCREMENT NOT NULL PRIMARY KEY,
+                        library_id INTEGER NOT NULL,
+                        object_id CHAR(36) NOT NULL,
+                        object_type ENUM('Model', 'Material') NOT NULL,
+                        change_type ENUM('Created', 'Updated', 'Deleted') NOT NULL,
+                        change_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (library_id)
+                            REFERENCES library(library_id)
+                            ON DELETE CASCADE
                     )"""
         }
+        # Indexes created along with the tables. Folders are looked up by path, which is
+        # too long to index in full
+        self._indexes = {
+            "folder_library_path" : "CREATE INDEX folder_library_path ON folder (library_id, folder_path(255))"
+        }
         self._functions = {
             "GetFolder" : """CREATE FUNCTION GetFolder(id INTEGER)
                         RETURNS VARCHAR(1024) DETERMINISTIC
                     BEGIN
                         DECLARE folderName VARCHAR(1024);
-                        WITH RECURSIVE subordinate AS (
                         SELECT
-                            folder_id,
-                            folder_name,
-                            parent_id
+                            folder_path
                         FROM folder
                         WHERE folder_id = id
-
-                        UNION ALL
-
-                        SELECT
-                            e.folder_id,
-                            e.folder_name,
-                            e.parent_id
-                        FROM folder e
-                        JOIN subordinate s
-                        ON e.folder_id = s.parent_id
-                        )
-                        SELECT
-                            group_concat(folder_name SEPARATOR '/')
-                        FROM subordinate
-                        ORDER BY folder_id ASC
                         INTO folderName;
                         RETURN folderName;
                     END"""
@@ -262,10 +263,72 @@ class DatabaseMySQLCreate(DatabaseMySQL):
 
             for table in self._tables:
                 cursor.execute(self._tables[table])
+            for index in self._indexes:
+                cursor.execute(self._indexes[index])
+            cursor.commit()
+        except Exception as err:
+            raise DatabaseTableCreationError(err)
+
+    def _hasColumn(self, table, column):
+        cursor = self._cursor()
+        try:
+            cursor.execute("SELECT {} FROM {} WHERE 1 = 0".format(column, table))
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _hasIndex(self, index):
+        cursor = self._cursor()
+        cursor.execute("SELECT index_name FROM information_schema.statistics"
+                       " WHERE table_schema = DATABASE() AND index_name = ?", index)
+        return cursor.fetchone() is not None
+
+    def migrateTables(self):
+        """
+        Brings the tables of an existing database up to date. See also the migrate_*.sql
+        scripts in Resources/db
+        """
+        try:
+            # Tables added since the database was created, such as change_log
+            cursor = self._cursor()
+            for table in self._tables:
+                cursor.execute(self._tables[table].replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
             cursor.commit()
+
+            if not self._hasColumn("library", "library_version"):
+                cursor = self._cursor()
+                cursor.execute("ALTER TABLE library ADD COLUMN library_version INTEGER NOT NULL DEFAULT 0")
+                cursor.commit()
+
+            if not self._hasColumn("folder", "folder_path"):
+                cursor = self._cursor()
+                cursor.execute("ALTER TABLE folder ADD COLUMN folder_path VARCHAR(1024)")
+                cursor.commit()
+                self._fillFolderPaths()
+
+                # GetFolder() reads the new column
+                self.dropFunctions()
+                self.createFunctions()
+
+            for index, sql in self._indexes.items():
+                if not self._hasIndex(index):
+                    cursor = self._cursor()
+                    cursor.execute(sql)
+                    cursor.commit()
         except Exception as err:
             raise DatabaseTableCreationError(err)
 
+    def _fillFolderPaths(self):
+        """Sets the materialized path of every folder from the folder hierarchy"""
+        cursor = self._cursor()
+        cursor.execute("SELECT folder_id, folder_name, parent_id FROM folder")
+        tree = FolderTree.fromHierarchy(None, cursor.fetchall())
+
+        for folderId, path in tree.paths().items():
+            cursor.execute("UPDATE folder SET folder_path = ? WHERE folder_id = ?", path, folderId)
+        cursor.commit()
+
     def dropFunctions(self):
         try:
             cursor = self._cursor()
@@ -0,0 +1,180 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Embedded SQLite database, used to run the reference server on a single machine"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import datetime
+import os
+import re
+import sqlite3
+
+from MaterialWS.Database.DatabaseMySQLCreate import DatabaseMySQLCreate
+from MaterialWS.Database.Exceptions import DatabaseConnectionError
+
+def _toDatetime(value: bytes):
+    return datetime.datetime.fromisoformat(value.decode("utf-8"))
+
+# Return library_modified as a datetime, as pyodbc does
+sqlite3.register_converter("DATETIME", _toDatetime)
+
+# The MySQL table definitions are translated rather than kept twice
+_translations = [
+    (re.compile(r"INTEGER AUTO_INCREMENT NOT NULL PRIMARY KEY"), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"ENUM\([^)]*\)"), "TEXT"),
+    (re.compile(r"UNIQUE KEY"), "UNIQUE"),
+    (re.compile(r"\s+ON UPDATE CURRENT_TIMESTAMP"), ""),
+    (re.compile(r"DEFAULT CURRENT_TIMESTAMP"), "DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))"),
+]
+
+def sqliteDDL(sql: str) -> str:
+    """Translates a MySQL CREATE TABLE statement to SQLite"""
+    for pattern, replacement in _translations:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+def sqliteIndex(sql: str) -> str:
+    """Translates a MySQL CREATE INDEX statement to SQLite, which indexes whole columns"""
+    return re.sub(r"\(\d+\)", "", sql)
+
+def _now() -> str:
+    # Sub-second resolution, so that every change moves library_modified
+    return datetime.datetime.now().isoformat(sep=" ", timespec="microseconds")
+
+class _Row(dict):
+    """A result row with attribute access to its columns, like a pyodbc row"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+def _rowFactory(cursor, row):
+    return _Row(zip([column[0] for column in cursor.description], row))
+
+class SQLiteCursor:
+    """A sqlite3 cursor with the pyodbc calling convention used by the Database classes"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection.cursor()
+
+    def execute(self, sql, *params):
+        self._cursor.execute(sql, params)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def commit(self):
+        self._connection.commit()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+class DatabaseSQLite(DatabaseMySQLCreate):
+    """
+    The MySQL database implementation running on an SQLite file. Foreign keys are not
+    enforced, matching the way mass updates disable them on MySQL.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+
+        self._path = path
+        self._tables = {name: sqliteDDL(sql) for name, sql in self._tables.items()}
+        self._indexes = {name: sqliteIndex(sql) for name, sql in self._indexes.items()}
+
+        # GetFolder() and NOW() are provided as Python functions on connection
+        self._functions = {}
+
+    def _connect(self, noDatabase=False):
+        if self._connection is None:
+            try:
+                directory = os.path.dirname(self._path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                # Pooled connections are handed between server threads
+                connection = sqlite3.connect(self._path, timeout=30, check_same_thread=False,
+                                             detect_types=sqlite3.PARSE_DECLTYPES)
+                connection.row_factory = _rowFactory
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.create_function("NOW", 0, _now)
+                connection.create_function("GetFolder", 1, self._getFolder)
+                self._connection = connection
+            except sqlite3.Error as ex:
+                print("Unable to create connection:", ex)
+                self._connection = None
+                raise DatabaseConnectionError(ex)
+
+    def _disconnect(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+
+    def _cursor(self, noDatabase=False):
+        self._connect(noDatabase)
+        return SQLiteCursor(self._connection)
+
+    def _lastId(self, cursor):
+        return cursor.lastrowid
+
+    def _foreignKeysIgnore(self, cursor):
+        pass
+
+    def _foreignKeysRestore(self, cursor):
+        pass
+
+    def _getFolder(self, folderId):
+        if folderId is None:
+            return None
+        return self._getPath(folderId)
+
+    def checkIfExists(self):
+        cursor = self._cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'library'")
+        return cursor.fetchone() is not None
+
+    def _hasIndex(self, index):
+        cursor = self._cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = ?", index)
+        return cursor.fetchone() is not None
+
+    def dropTables(self):
+        try:
+            cursor = self._cursor()
+
+            for table in self._tables:
+                cursor.execute("DROP TABLE IF EXISTS {}".format(table))
+            cursor.commit()
+        except Exception as err:
+            print(err)
+
+    def createDatabase(self, dbName):
+        """The database is the file given on construction, created on first connection"""
+        self._connect()
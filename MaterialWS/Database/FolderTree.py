@@ -0,0 +1,75 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for the in memory folder hierarchy of a library"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+class FolderTree:
+    """
+    The folders of one library as a folder_id to path map, built from a single read of
+    the folder_path column, so listings give the same paths as the object loaders.
+    version is the library_version counter the tree was read at; a library with a
+    different version may have changed folders.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self._paths = {}
+        self._ids = {}
+        for row in rows:
+            if row.folder_path is not None:
+                self.add(row.folder_id, row.folder_path)
+
+    @classmethod
+    def fromHierarchy(cls, version, rows):
+        """The tree built from the folder_name and parent_id columns instead"""
+        tree = cls(version, [])
+        folders = {row.folder_id: (row.folder_name, row.parent_id) for row in rows}
+        for folderId in folders:
+            tree._resolve(folders, folderId)
+        return tree
+
+    def _resolve(self, folders, folderId) -> str:
+        path = self._paths.get(folderId)
+        if path is None:
+            name, parentId = folders[folderId]
+            if parentId is None or parentId not in folders:
+                path = name
+            else:
+                path = self._resolve(folders, parentId) + "/" + name
+            self.add(folderId, path)
+        return path
+
+    def add(self, folderId: int, path: str) -> None:
+        self._paths[folderId] = path
+        self._ids[path] = folderId
+
+    def path(self, folderId: int) -> str:
+        """The path of the folder, or None for objects not in a folder"""
+        return self._paths.get(folderId)
+
+    def folderId(self, path: str) -> int:
+        """The folder_id for the path, or 0 when there is no such folder"""
+        return self._ids.get(path, 0)
+
+    def paths(self) -> dict:
+        return dict(self._paths)
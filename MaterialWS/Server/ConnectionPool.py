@@ -0,0 +1,83 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for sharing database connections between server threads"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import queue
+import threading
+
+from contextlib import contextmanager
+
+class ConnectionPool:
+    """
+    Hands out at most size Database objects at a time, each holding its own connection.
+    Connections are created on first use and reused afterwards, so request threads beyond
+    the pool size wait for a connection rather than opening another one.
+    """
+
+    def __init__(self, factory, size: int = 8):
+        self._factory = factory
+        self._size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self._size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._waits = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._waits += 1
+            self._slots.acquire()
+        try:
+            try:
+                database = self._idle.get_nowait()
+            except queue.Empty:
+                database = self._factory()
+                with self._lock:
+                    self._created += 1
+            try:
+                yield database
+            finally:
+                # Database errors don't invalidate the connection, which reconnects itself
+                self._idle.put(database)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self._size, "created": self._created, "waits": self._waits,
+                    "idle": self._idle.qsize()}
+
+    def close(self) -> None:
+        while True:
+            try:
+                database = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            database._disconnect()
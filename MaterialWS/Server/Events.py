@@ -0,0 +1,217 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Server-sent change events for client cache invalidation"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import json
+import queue
+import threading
+import uuid
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Sent when no event has been published for this many seconds, so clients can tell a
+# quiet stream from a dead connection
+HEARTBEAT = 15.0
+
+class EventHub:
+    """
+    Passes published change events to every subscriber. Recent events are kept so that
+    a client reconnecting with Last-Event-ID receives the ones it missed. When those are
+    no longer available the client is told to reset its caches instead.
+
+    Event ids are prefixed with an epoch chosen when the hub is created. Ids from before
+    a restart never match, so those clients reset rather than replaying the wrong events.
+    """
+
+    def __init__(self, history: int = 1024, epoch: str = None):
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self._subscribers = []
+        self._epoch = epoch or uuid.uuid4().hex[:12]
+        self._lastId = 0
+        self._closed = False
+
+    @property
+    def epoch(self) -> str:
+        return self._epoch
+
+    def eventId(self, number: int) -> str:
+        """The Last-Event-ID sent for the event with the given number"""
+        return "{}-{}".format(self._epoch, number)
+
+    @property
+    def lastEventId(self) -> str:
+        with self._lock:
+            return self.eventId(self._lastId)
+
+    def publish(self, data: dict) -> str:
+        with self._lock:
+            self._lastId += 1
+            event = (self._lastId, data)
+            self._history.append(event)
+            for subscriber in self._subscribers:
+                subscriber.put(event)
+            return self.eventId(self._lastId)
+
+    def subscribe(self, lastEventId: str = None):
+        """
+        Returns the subscriber queue, the events to replay first and the id of the last
+        event published before subscribing. The replay is None when the client must
+        reset because events were lost.
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._closed:
+                subscriber.put(None)
+            return subscriber, self._replay(lastEventId), self.eventId(self._lastId)
+
+    def _replay(self, lastEventId: str):
+        if not lastEventId:
+            return []
+        epoch, _, number = lastEventId.rpartition("-")
+        if epoch != self._epoch:
+            # From before a restart
+            return None
+        try:
+            lastId = int(number)
+        except ValueError:
+            return None
+        if lastId == self._lastId:
+            return []
+        if lastId > self._lastId or not self._history or self._history[0][0] > lastId + 1:
+            # Unknown, or too long ago
+            return None
+        return [event for event in self._history if event[0] > lastId]
+
+    def unsubscribe(self, subscriber) -> None:
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def close(self) -> None:
+        """Ends the streams of all subscribers"""
+        with self._lock:
+            self._closed = True
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+
+def _writeChunk(handler, text: str) -> None:
+    data = text.encode("utf-8")
+    handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+    handler.wfile.flush()
+
+def _formatEvent(hub: EventHub, event) -> str:
+    number, data = event
+    return "id: {}\nevent: change\ndata: {}\n\n".format(hub.eventId(number), json.dumps(data))
+
+def streamEvents(handler: BaseHTTPRequestHandler, hub: EventHub, heartbeat: float = HEARTBEAT) -> None:
+    """
+    Writes the event stream to a request handler until the client disconnects. Each
+    event is sent as its own chunk so clients receive it without waiting for more data.
+    """
+    subscriber, replay, eventId = hub.subscribe(handler.headers.get("Last-Event-ID"))
+    try:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        if replay is None:
+            # The id lets the client resume from here after the reset
+            _writeChunk(handler, "id: {}\nevent: reset\ndata: {{}}\n\n".format(eventId))
+        elif replay:
+            for event in replay:
+                _writeChunk(handler, _formatEvent(hub, event))
+        else:
+            # Sent straight away, so a client reconnecting before any event arrives
+            # still resumes from here rather than missing what it was away for
+            _writeChunk(handler, "id: {}\n\n".format(eventId))
+
+        while True:
+            try:
+                event = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                _writeChunk(handler, ":\n\n")
+                continue
+            if event is None:
+                break
+            _writeChunk(handler, _formatEvent(hub, event))
+
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        hub.unsubscribe(subscriber)
+        handler.close_connection = True
+
+class _PublisherHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/events"):
+            streamEvents(self, self.server.hub, self.server.heartbeat)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+class StandInPublisher(ThreadingHTTPServer):
+    """
+    Serves only the change event stream, with events published by the caller. Used by
+    the tests in place of the reference server.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, heartbeat: float = HEARTBEAT):
+        super().__init__(("127.0.0.1", port), _PublisherHandler)
+        self.hub = EventHub()
+        self.heartbeat = heartbeat
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}/materialws/".format(self.server_address[1])
+
+    def publish(self, data: dict) -> str:
+        return self.hub.publish(data)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.hub.close()
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,163 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Objects built from request bodies for the Database create methods"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+from MaterialWS.WS.ArrayCodec import unpack2D, unpack3D, ENCODING_COLUMNAR
+
+# The Database classes are written against the FreeCAD Materials objects. These records
+# provide the same attributes, so bodies received by the server can be stored without
+# a model or material manager to construct the real objects.
+
+class UserString:
+    """A quantity or array cell held as its text"""
+
+    __slots__ = ("UserString",)
+
+    def __init__(self, text: str):
+        self.UserString = text
+
+class PropertyRecord:
+
+    def __init__(self, entry: dict, columns: list = None):
+        self.Name = entry["model_property_name"]
+        self.DisplayName = entry["model_property_display_name"]
+        self.Type = entry["model_property_type"]
+        self.Units = entry["model_property_units"]
+        self.URL = entry["model_property_url"]
+        self.Description = entry["model_property_description"]
+        self.Inherited = False
+        self.Columns = columns or []
+
+class ModelRecord:
+
+    def __init__(self, body: dict):
+        self.UUID = body["model_id"]
+        self.Type = body["model_type"]
+        self.Name = body["model_name"]
+        self.URL = body["model_url"]
+        self.Description = body["model_description"]
+        self.DOI = body["model_doi"]
+        self.Inherited = list(body["inherits"])
+        self.Properties = {}
+        for entry in body["properties"]:
+            columns = [PropertyRecord(column) for column in entry.get("columns", [])]
+            property = PropertyRecord(entry, columns)
+            self.Properties[property.Name] = property
+
+class Array2DRecord:
+
+    Dimensions = 2
+
+    def __init__(self, value: dict):
+        self.Rows = value["rows"]
+        self.Columns = value["columns"]
+        if value.get("encoding") == ENCODING_COLUMNAR:
+            self.Array = unpack2D(value)
+        else:
+            self.Array = [[""] * self.Columns for _ in range(self.Rows)]
+            for cell in value["values"]:
+                self.Array[cell["row"]][cell["column"]] = cell["value"]
+
+class Array3DRecord:
+
+    Dimensions = 3
+
+    def __init__(self, value: dict):
+        self.Columns = value["columns"]
+        self.Depth = value["depth"]
+        self._depthValues = [UserString(text) for text in value["depth_values"]]
+        if value.get("encoding") == ENCODING_COLUMNAR:
+            depths = unpack3D(value)
+        else:
+            depths = [[] for _ in range(self.Depth)]
+            for cell in value["values"]:
+                rows = depths[cell["depth"]]
+                while len(rows) < cell["depth_rows"]:
+                    rows.append([""] * self.Columns)
+                rows[cell["row"]][cell["column"]] = cell["value"]
+        self.Array = [[[UserString(text) for text in row] for row in rows] for rows in depths]
+
+    def getRows(self, depth: int) -> int:
+        return len(self.Array[depth])
+
+    def getDepthValue(self, depth: int) -> UserString:
+        return self._depthValues[depth]
+
+class MaterialPropertyRecord:
+
+    def __init__(self, name: str, type: str, value):
+        self.Name = name
+        self.Type = type
+        self.Value = value
+        self.Empty = value is None
+
+class MaterialRecord:
+
+    def __init__(self, body: dict, resolveUpload=None):
+        self.UUID = body["material_id"]
+        self.Name = body["material_name"]
+        self.Author = body["material_author"]
+        self.License = body["material_license"]
+        self.Parent = body["material_parent_uuid"]
+        self.Description = body["material_description"]
+        self.URL = body["material_url"]
+        self.Reference = body["material_reference"]
+        self.Tags = list(body["tags"])
+        self.PhysicalModels = list(body["physical_models"])
+        self.AppearanceModels = list(body["appearance_models"])
+        self.PropertyObjects = {}
+        self._arrays = {}
+        for entry in body["properties"]:
+            name = entry["material_property_name"]
+            type = entry["material_property_type"]
+            value = entry["material_property_value"]
+            if type == "2DArray":
+                self._arrays[name] = Array2DRecord(value)
+            elif type == "3DArray":
+                self._arrays[name] = Array3DRecord(value)
+            elif type == "Quantity":
+                value = UserString(value)
+            elif type == "SVG" or type == "Image":
+                value = self._resolve(value, resolveUpload)
+            elif type == "ImageList":
+                value = [self._resolve(image, resolveUpload) for image in value]
+            self.PropertyObjects[name] = MaterialPropertyRecord(name, type, value)
+
+    def _resolve(self, value, resolveUpload):
+        """Replaces a reference to a chunked upload with the uploaded value"""
+        if isinstance(value, dict) and "upload" in value:
+            if resolveUpload is None:
+                raise ValueError("Uploads are not supported")
+            return resolveUpload(value["upload"])
+        return value
+
+    def hasPhysicalProperty(self, name: str) -> bool:
+        # Both kinds of property are stored the same way
+        return name in self._arrays
+
+    def getPhysicalValue(self, name: str):
+        return self._arrays[name]
+
+    def getAppearanceValue(self, name: str):
+        return self._arrays[name]
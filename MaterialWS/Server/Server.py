@@ -0,0 +1,609 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Reference implementation of the MaterialWS web service
+
+Serves the endpoints used by MaterialWS/WS/WS.py from any of the Database classes. To
+run it against an embedded database, from a FreeCAD Python console or FreeCADCmd:
+
+    from MaterialWS.Server.Server import main
+    main(["--sqlite", "/tmp/material.sqlite"])
+
+Without --sqlite the MySQL database configured in the preferences is used.
+"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import argparse
+import base64
+import datetime
+import gzip
+import threading
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from MaterialWS.WS.Codec import encodeBody, decodeBody, hasMsgpack, \
+    FORMAT_JSON, FORMAT_MSGPACK, MIME_JSON, MIME_MSGPACK
+from MaterialWS.WS.ConditionalCache import makeETag, makeLastModified
+from MaterialWS.WS.IconCache import iconHash
+from MaterialWS.WS.ArrayCodec import ENCODING_COLUMNAR
+from MaterialWS.WS.Serialize import fromModel, fromMaterial
+from MaterialWS.WS.Filter import fromQuery
+from MaterialWS.WS.Replica import CHANGE_CREATED
+from MaterialWS.Server.ConnectionPool import ConnectionPool
+from MaterialWS.Server.ResponseCache import ResponseCache, CachedResponse
+from MaterialWS.Server.Records import ModelRecord, MaterialRecord
+from MaterialWS.Server.Events import EventHub, streamEvents
+from MaterialWS.Database.Exceptions import DatabaseLibraryCreationError, \
+    DatabaseModelNotFound, DatabaseMaterialNotFound, \
+    DatabaseModelExistsError, DatabaseMaterialExistsError
+
+PREFIX = "materialws"
+
+# Smaller bodies aren't worth compressing
+COMPRESS_MINIMUM = 1024
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class UploadStore:
+    """Values uploaded in chunks, held until the object referring to them is created"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uploads = {}
+
+    def begin(self, size: int) -> str:
+        uploadId = str(uuid.uuid4())
+        with self._lock:
+            self._uploads[uploadId] = (size, bytearray())
+        return uploadId
+
+    def append(self, uploadId: str, offset: int, data: bytes) -> int:
+        with self._lock:
+            if uploadId not in self._uploads:
+                raise HTTPError(404, "Unknown upload")
+            size, buffer = self._uploads[uploadId]
+            if offset != len(buffer) or offset + len(data) > size:
+                raise HTTPError(409, "Upload chunk out of sequence")
+            buffer.extend(data)
+            return len(buffer)
+
+    def take(self, uploadId: str) -> str:
+        with self._lock:
+            upload = self._uploads.pop(uploadId, None)
+        if upload is None:
+            raise ValueError("Unknown upload {}".format(uploadId))
+        size, buffer = upload
+        if len(buffer) != size:
+            raise ValueError("Upload {} is incomplete".format(uploadId))
+        return buffer.decode("utf-8")
+
+def _timestamp(value):
+    """library_modified as a datetime, whichever form the database returned it in"""
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+class MaterialWSApplication:
+    """
+    Answers web service requests independently of the HTTP server. GET responses are
+    cached encoded, and are valid while the library_version counters they depend on
+    are unchanged. Checking that costs one small query, which also answers conditional
+    requests without loading anything.
+    """
+
+    def __init__(self, pool: ConnectionPool, cache: ResponseCache = None):
+        self._pool = pool
+        if cache is None:
+            cache = ResponseCache()
+        self._cache = cache
+        self._uploads = UploadStore()
+        self._events = EventHub()
+        self._iconLock = threading.Lock()
+        self._icons = {}
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return self._pool
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache
+
+    @property
+    def events(self) -> EventHub:
+        return self._events
+
+    def isEventStream(self, path: str) -> bool:
+        parts = [part for part in urlsplit(path).path.split("/") if part]
+        return parts == [PREFIX, "events"]
+
+    def handle(self, method: str, path: str, headers, body: bytes):
+        """Returns the status, the response headers and the encoded response body"""
+        try:
+            url = urlsplit(path)
+            parts = [unquote(part) for part in url.path.split("/") if part]
+            if not parts or parts[0] != PREFIX:
+                raise HTTPError(404, "Not found")
+            parts = parts[1:]
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if method == "GET":
+                return self._get(parts, url.query, query, headers)
+            if method == "POST":
+                return self._post(parts, headers, body)
+            raise HTTPError(405, "Method not allowed")
+        except HTTPError as ex:
+            return self._error(ex.status, ex.message, headers)
+        except Exception as ex:
+            print("Unable to handle request:", ex)
+            return self._error(500, str(ex), headers)
+
+    def _variant(self, headers):
+        accept = headers.get("Accept", "") or ""
+        if MIME_MSGPACK in accept and hasMsgpack():
+            format = FORMAT_MSGPACK
+        else:
+            format = FORMAT_JSON
+        columnar = headers.get("X-Array-Encoding", "") == ENCODING_COLUMNAR
+        compress = "gzip" in (headers.get("Accept-Encoding", "") or "")
+        return (format, columnar, compress)
+
+    def _encode(self, body, variant, etag: str = None, lastModified: str = None) -> CachedResponse:
+        format, _, compress = variant
+        content, contentType = encodeBody(body, format)
+        contentEncoding = None
+        if compress and len(content) >= COMPRESS_MINIMUM:
+            content = gzip.compress(content, compresslevel=6)
+            contentEncoding = "gzip"
+        return CachedResponse(content, contentType, contentEncoding, etag, lastModified)
+
+    def _respond(self, status: int, response: CachedResponse):
+        headers = {"Content-Type": response.contentType}
+        if response.contentEncoding:
+            headers["Content-Encoding"] = response.contentEncoding
+        if response.etag:
+            headers["ETag"] = response.etag
+        if response.lastModified:
+            headers["Last-Modified"] = response.lastModified
+        return status, headers, response.body
+
+    def _error(self, status: int, message: str, headers):
+        variant = (self._variant(headers)[0], False, False)
+        return self._respond(status, self._encode({"error": message}, variant))
+
+    #
+    # GET
+    #
+
+    def _get(self, parts, queryString: str, query: dict, headers):
+        if len(parts) == 2 and parts[0] == "icon":
+            return self._getIcon(parts[1])
+        if len(parts) == 1 and parts[0] == "stats":
+            return self._respond(200, self._encode(self.stats(), (FORMAT_JSON, False, False)))
+
+        variant = self._variant(headers)
+        loader, library = self._route(parts, query, variant[1])
+        key = ("/".join(parts), queryString, variant)
+
+        with self._pool.connection() as database:
+            # Read before loading, so a change made while loading invalidates the entry
+            validator, modified = self._validator(database, library)
+            etag = makeETag(*key, *validator)
+            if etag in [tag.strip() for tag in (headers.get("If-None-Match", "") or "").split(",")]:
+                return 304, {"ETag": etag}, b""
+
+            response = self._cache.get(key, validator)
+            if response is not None:
+                return self._respond(200, response)
+
+            body = loader(database)
+
+        lastModified = makeLastModified(modified) if modified is not None else None
+        response = self._encode(body, variant, etag, lastModified)
+        self._cache.put(key, validator, response)
+        return self._respond(200, response)
+
+    def _validator(self, database, library: str):
+        """
+        Returns the values a response depends on and its modification time. Library
+        scoped responses depend on that library, everything else on all of them. The
+        library_version counters change with every write, so two writes within the
+        resolution of library_modified still give a new validator.
+        """
+        if library is not None:
+            version = database.getLibraryVersion(library)
+            if version is None:
+                raise HTTPError(404, "Library not found")
+            return (library, version[0]), _timestamp(version[1])
+
+        count, libraryId, version, modified = database.getLibrariesVersion()
+        return (count, libraryId, version), _timestamp(modified)
+
+    def _route(self, parts, query: dict, columnar: bool):
+        """Returns the loader for a GET request and the library it is scoped to"""
+        hashIcons = query.get("icons") == "hash"
+        if len(parts) == 1:
+            if parts[0] == "library":
+                return (lambda database: self._libraries(database.getLibraries(), hashIcons)), None
+            if parts[0] == "modellibrary":
+                return (lambda database: self._libraries(database.getModelLibraries(), hashIcons)), None
+            if parts[0] == "materiallibrary":
+                return (lambda database: self._libraries(database.getMaterialLibraries(), hashIcons)), None
+        elif len(parts) == 2:
+            name = parts[1]
+            if parts[0] == "library":
+                return (lambda database: self._library(database, name, hashIcons)), name
+            if parts[0] == "libraryModels":
+                return (lambda database: self._listing(database.libraryModels, name, query,
+                                                       "model_id", "model_name")), name
+            if parts[0] == "libraryMaterials":
+                return (lambda database: self._listing(database.libraryMaterials, name, query,
+                                                       "material_id", "material_name",
+                                                       **fromQuery(query))), name
+            if parts[0] == "sync":
+                return (lambda database: self._sync(database, name, query.get("since"))), name
+            if parts[0] == "model":
+                return (lambda database: self._model(database, name)), None
+            if parts[0] == "modelClosure":
+                return (lambda database: self._modelClosure(database, name)), None
+            if parts[0] == "material":
+                return (lambda database: self._material(database, name, columnar)), None
+        raise HTTPError(404, "Not found")
+
+    def _libraryEntry(self, library, hashIcons: bool) -> dict:
+        icon = library[1]
+        if isinstance(icon, str):
+            icon = icon.encode("utf-8")
+        icon = icon or b""
+        entry = {"library_name": library[0], "library_read_only": bool(library[2])}
+        if hashIcons:
+            hash = ""
+            if icon:
+                hash = iconHash(icon)
+                with self._iconLock:
+                    self._icons[hash] = icon
+            entry["library_icon_hash"] = hash
+        else:
+            entry["library_icon"] = base64.b64encode(icon).decode("ascii")
+        return entry
+
+    def _libraries(self, libraries, hashIcons: bool) -> list:
+        return [self._libraryEntry(library, hashIcons) for library in libraries]
+
+    def _library(self, database, name: str, hashIcons: bool) -> dict:
+        library = database.getLibrary(name)
+        if library is None:
+            raise HTTPError(404, "Library not found")
+        return self._libraryEntry(library, hashIcons)
+
+    def _getIcon(self, hash: str):
+        with self._iconLock:
+            icon = self._icons.get(hash)
+        if icon is None:
+            # Icons are learnt from listings. Look again in case this one is new
+            with self._pool.connection() as database:
+                self._libraries(database.getLibraries(), True)
+            with self._iconLock:
+                icon = self._icons.get(hash)
+        if icon is None:
+            raise HTTPError(404, "Icon not found")
+
+        # The hash is the content address, so the icon never changes
+        return 200, {"Content-Type": "application/octet-stream",
+                     "Cache-Control": "max-age=31536000, immutable"}, icon
+
+    def _listing(self, load, library: str, query: dict, idField: str, nameField: str, **arguments):
+        """A whole listing, or one page of it when a limit is given. arguments filter the listing"""
+        limit = query.get("limit")
+        if limit is not None:
+            try:
+                limit = max(1, int(limit))
+            except ValueError:
+                raise HTTPError(400, "Invalid limit")
+        objects = load(library, limit, query.get("after"), **arguments)
+        items = [{idField: object[0], "library": library, "folder": object[1], nameField: object[2]}
+                 for object in objects]
+        if limit is None:
+            return items
+
+        cursor = None
+        if len(items) == limit:
+            cursor = items[-1][idField]
+        return {"items": items, "next": cursor}
+
+    def _changeEntries(self, changes, idField: str, nameField: str) -> list:
+        entries = []
+        for uuid, change, object in changes:
+            entry = {idField: uuid, "change": change}
+            if object is not None:
+                entry["folder"] = object[1]
+                entry[nameField] = object[2]
+            entries.append(entry)
+        return entries
+
+    def _sync(self, database, library: str, since: str) -> dict:
+        """
+        The changes to a library since a token or timestamp. Without one the whole
+        listing is sent, with the token to continue from.
+        """
+        full = not since
+        if full:
+            # Read first, so that changes made meanwhile are sent again next time
+            token = database.getChangeToken(library)
+            models = [(object[0], CHANGE_CREATED, object) for object in database.libraryModels(library)]
+            materials = [(object[0], CHANGE_CREATED, object)
+                         for object in database.libraryMaterials(library)]
+        else:
+            token, models, materials = database.getChanges(library, since)
+        return {
+            "library": library,
+            "token": str(token),
+            "full": full,
+            "models": self._changeEntries(models, "model_id", "model_name"),
+            "materials": self._changeEntries(materials, "material_id", "material_name")
+        }
+
+    def _model(self, database, uuid: str) -> dict:
+        try:
+            _, library, model = database.getModel(uuid)
+        except DatabaseModelNotFound:
+            raise HTTPError(404, "Model not found")
+        return fromModel(library[0], model.Directory, model, uuid=uuid)
+
+    def _modelClosure(self, database, uuid: str) -> dict:
+        try:
+            closure = database.getModelClosure(uuid)
+        except DatabaseModelNotFound:
+            raise HTTPError(404, "Model not found")
+        return {"models": [fromModel(library[0], model.Directory, model, uuid=modelUUID)
+                           for modelUUID, library, model in closure]}
+
+    def _material(self, database, uuid: str, columnar: bool = True) -> dict:
+        try:
+            _, library, material = database.getMaterial(uuid)
+        except DatabaseMaterialNotFound:
+            raise HTTPError(404, "Material not found")
+        return fromMaterial(library[0], material.Directory, material, columnar=columnar, uuid=uuid)
+
+    #
+    # POST
+    #
+
+    def _post(self, parts, headers, body: bytes):
+        variant = self._variant(headers)
+        if len(parts) == 2 and parts[0] == "upload":
+            try:
+                offset = int(headers.get("X-Upload-Offset", "0"))
+            except ValueError:
+                raise HTTPError(400, "Invalid upload offset")
+            received = self._uploads.append(parts[1], offset, body)
+            return self._respond(200, self._encode({"received": received}, variant))
+
+        try:
+            request = decodeBody(body, headers.get("Content-Type", MIME_JSON))
+        except Exception as ex:
+            raise HTTPError(400, "Invalid request body: {}".format(ex))
+
+        route = "/".join(parts)
+        if route == "library":
+            return self._respond(201, self._encode(self._createLibrary(request), variant))
+        if route == "upload":
+            uploadId = self._uploads.begin(int(request["upload_size"]))
+            return self._respond(201, self._encode({"upload_id": uploadId}, variant))
+        if route == "models":
+            models = self._models(request["uuids"])
+            return self._respond(200, self._encode({"models": models}, variant))
+        if route == "materials":
+            columnar = variant[1]
+            materials = self._materials(request["uuids"], columnar)
+            return self._respond(200, self._encode({"materials": materials}, variant))
+        if route == "models/create":
+            results = self._create(request["models"], "model_id", "model", self._createModel)
+            return self._respond(200, self._encode({"results": results}, variant))
+        if route == "materials/create":
+            results = self._create(request["materials"], "material_id", "material",
+                                   self._createMaterial)
+            return self._respond(200, self._encode({"results": results}, variant))
+        raise HTTPError(404, "Not found")
+
+    def _createLibrary(self, request: dict) -> dict:
+        icon = base64.b64decode(request.get("library_icon") or "")
+        with self._pool.connection() as database:
+            try:
+                database.createLibrary(request["library_name"], icon,
+                                       bool(request.get("library_read_only", False)))
+            except DatabaseLibraryCreationError as ex:
+                raise HTTPError(409, str(ex))
+        self._events.publish({"object_type": "library", "uuid": None,
+                              "library": request["library_name"], "change": CHANGE_CREATED})
+        return {}
+
+    def _models(self, uuids: list) -> list:
+        """The models found among uuids, loaded together. Missing models are left out"""
+        with self._pool.connection() as database:
+            models = database.getModels(uuids)
+        return [fromModel(model[1][0], model[2].Directory, model[2], uuid=uuid)
+                for uuid, model in models.items() if not isinstance(model, Exception)]
+
+    def _materials(self, uuids: list, columnar: bool) -> list:
+        """The materials found among uuids, loaded together. Missing materials are left out"""
+        materials = []
+        with self._pool.connection() as database:
+            for uuid, material in database.getMaterials(uuids):
+                if not isinstance(material, Exception):
+                    materials.append(fromMaterial(material[1][0], material[2].Directory, material[2],
+                                                  columnar=columnar, uuid=uuid))
+        return materials
+
+    def _create(self, bodies: list, idField: str, objectType: str, create) -> list:
+        results = []
+        with self._pool.connection() as database:
+            for body in bodies:
+                uuid = body.get(idField)
+                try:
+                    if database.getLibraryModified(body["library"]) is None:
+                        raise ValueError("Library '{}' not found".format(body["library"]))
+                    create(database, body)
+                    results.append({"uuid": uuid, "status": "created"})
+                    self._events.publish({"object_type": objectType, "uuid": uuid,
+                                          "library": body["library"], "change": CHANGE_CREATED})
+                except (DatabaseModelExistsError, DatabaseMaterialExistsError):
+                    results.append({"uuid": uuid, "status": "exists"})
+                except Exception as ex:
+                    results.append({"uuid": uuid, "status": "error", "message": str(ex)})
+        return results
+
+    def _createModel(self, database, body: dict) -> None:
+        database.createModel(body["library"], body["folder"], ModelRecord(body))
+
+    def _createMaterial(self, database, body: dict) -> None:
+        database.createMaterial(body["library"], body["folder"],
+                                MaterialRecord(body, self._uploads.take))
+
+    def stats(self) -> dict:
+        return {"pool": self._pool.stats(), "cache": self._cache.stats()}
+
+class MaterialWSHandler(BaseHTTPRequestHandler):
+
+    # Required for keep-alive connections
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are written separately, which stalls on delayed ACKs otherwise
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        application = self.server.application
+        if method == "GET" and application.isEventStream(self.path):
+            streamEvents(self, application.events)
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length > 0 else b""
+        status, headers, content = application.handle(method, self.path, self.headers, body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if content:
+            self.wfile.write(content)
+
+class MaterialWSServer(ThreadingHTTPServer):
+    """
+    Serves the web service with a thread per connection. Database work is limited to
+    the connections in the pool, which threads share.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, databaseFactory, host: str = "127.0.0.1", port: int = 8000,
+                 poolSize: int = 8, cacheSize: int = 64 * 1024 * 1024, verbose: bool = False):
+        super().__init__((host, port), MaterialWSHandler)
+        self.application = MaterialWSApplication(ConnectionPool(databaseFactory, poolSize),
+                                                 ResponseCache(cacheSize))
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return "http://{}:{}/{}/".format(self.server_address[0], self.server_address[1], PREFIX)
+
+    def start(self):
+        """Serves in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.application.events.close()
+        self.shutdown()
+        self.server_close()
+        self.application.pool.close()
+
+def sqliteFactory(path: str):
+    """Returns a factory for embedded database connections, creating the tables if needed"""
+    from MaterialWS.Database.DatabaseSQLite import DatabaseSQLite
+
+    database = DatabaseSQLite(path)
+    if not database.checkIfExists():
+        database.createTables()
+    else:
+        database.migrateTables()
+    database._disconnect()
+    return lambda: DatabaseSQLite(path)
+
+def mysqlFactory():
+    from MaterialWS.Database.DatabaseMySQL import DatabaseMySQL
+
+    return DatabaseMySQL
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MaterialWS reference web service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--pool", type=int, default=8, help="database connections")
+    parser.add_argument("--cache", type=int, default=64, help="response cache in megabytes")
+    parser.add_argument("--sqlite", metavar="PATH", help="use an embedded database file")
+    parser.add_argument("--migrate", action="store_true",
+                        help="update the tables of an existing MySQL database first")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        factory = sqliteFactory(args.sqlite)
+    else:
+        if args.migrate:
+            from MaterialWS.Database.DatabaseMySQLCreate import DatabaseMySQLCreate
+
+            DatabaseMySQLCreate().migrateTables()
+        factory = mysqlFactory()
+
+    server = MaterialWSServer(factory, args.host, args.port, args.pool,
+                              args.cache * 1024 * 1024, args.verbose)
+    print("Serving {}".format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.application.pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from MaterialWS.Database.DatabaseSQLite import DatabaseSQLite
+from MaterialWS.manager.DatabaseBackend import DatabaseBackend
+from MaterialWS.Database.Exceptions import DatabaseModelNotFound, DatabaseMaterialExistsError
+from MaterialWS.WS.Exceptions import WSModelNotFound, WSMaterialExistsError, WSLibraryNotFound
+from MaterialWS.WS.Replica import CHANGE_CREATED
+
+class _Object:
+
+    def __init__(self, uuid):
+        self.UUID = uuid
+
+class _Database:
+    """Stands in for DatabaseMySQL, returning its tuples"""
+
+    def getLibraries(self):
+        return [("System", "icon", 1, None)]
+
+    def getLibrary(self, name):
+        return None
+
+    def getModel(self, uuid):
+        if uuid != "known":
+            raise DatabaseModelNotFound()
+        return (uuid, ("System", "icon", 1), _Object(uuid))
+
+    def getModels(self, uuids):
+        models = {}
+        for uuid in uuids:
+            try:
+                models[uuid] = self.getModel(uuid)
+            except DatabaseModelNotFound as ex:
+                models[uuid] = ex
+        return models
+
+    def createMaterial(self, libraryName, path, material):
+        if material.UUID == "exists":
+            raise DatabaseMaterialExistsError()
+
+class DatabaseBackendTests(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = DatabaseBackend(_Database(), batchSize=10)
+
+    def testLibraries(self):
+        library = self.backend.getLibraries()[0]
+        self.assertEqual(library[0], "System")
+        self.assertEqual(library[1], b"icon")
+        self.assertTrue(library[2])
+        with self.assertRaises(WSLibraryNotFound):
+            self.backend.getLibrary("Missing")
+
+    def testGetModels(self):
+        self.assertEqual(self.backend.getModel("known")[0], "System")
+        models = self.backend.getModels(["known", "missing"])
+        self.assertEqual(list(models.keys()), ["known", "missing"])
+        self.assertIsInstance(models["missing"], WSModelNotFound)
+
+    def testCreateMaterials(self):
+        events = []
+        self.backend.addChangeListener(events.append)
+        results = self.backend.createMaterials([("System", "", _Object("new")),
+                                                ("System", "", _Object("exists"))])
+        self.assertIsNone(results["new"])
+        self.assertIsInstance(results["exists"], WSMaterialExistsError)
+        self.assertEqual([event["uuid"] for event in events], ["new"])
+        self.assertEqual(events[0]["change"], CHANGE_CREATED)
+
+    def testBinaryIcon(self):
+        directory = tempfile.mkdtemp()
+        try:
+            database = DatabaseSQLite(os.path.join(directory, "material.sqlite"))
+            database.createTables()
+            backend = DatabaseBackend(database, batchSize=10)
+            icon = b"\x89PNG\r\n\x1a\n\xff\x00"
+            backend.createLibrary("User", icon, False)
+            backend.createLibrary("Plain", None, False)
+
+            # Creating the same library again is allowed
+            backend.createLibrary("User", icon, False)
+
+            self.assertEqual(backend.getLibrary("User")[1], icon)
+            self.assertEqual(backend.getLibrary("Plain")[1], b"")
+            self.assertEqual({library[0]: library[1] for library in backend.getLibraries()},
+                             {"User": icon, "Plain": b""})
+            backend.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
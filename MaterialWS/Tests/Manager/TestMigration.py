@@ -0,0 +1,81 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import unittest
+
+from MaterialWS.manager.MaterialWSManager import MaterialWSManager
+from MaterialWS.manager.DatabaseBackend import DatabaseBackend
+from MaterialWS.manager.Exceptions import ManagerMigrationError
+from MaterialWS.Database.Exceptions import DatabaseModelCreationError
+
+class _Model:
+
+    def __init__(self, uuid, name):
+        self.UUID = uuid
+        self.Type = "Physical"
+        self.Name = name
+        self.URL = ""
+        self.Description = ""
+        self.DOI = ""
+        self.Inherited = []
+        self.Properties = {}
+
+class _Database:
+    """Records the models created, failing for those named Bad"""
+
+    def __init__(self):
+        self.created = {}
+
+    def createModel(self, libraryName, path, model):
+        if model.Name == "Bad":
+            raise DatabaseModelCreationError("Invalid model")
+        self.created[model.UUID] = model.Name
+
+class MigrationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.database = _Database()
+        self.manager = MaterialWSManager(DatabaseBackend(self.database, batchSize=2))
+
+    def testBatchedMigration(self):
+        model = _Model("m1", "Density")
+        with self.assertRaises(ManagerMigrationError) as context:
+            with self.manager.migration():
+                self.manager.migrateModel("System", "", model)
+
+                # Changes made after migrating aren't sent
+                model.Name = "Changed"
+                for uuid in ["m2", "m3", "m4"]:
+                    self.manager.migrateModel("System", "", _Model(uuid, "Bad"))
+                self.assertEqual(self.database.created, {"m1": "Density"})
+
+        # Every failure is reported once the block exits, not just the first
+        self.assertEqual(sorted(context.exception.errors.keys()), ["m2", "m3", "m4"])
+        self.assertEqual(self.database.created, {"m1": "Density"})
+
+    def testUnbatchedMigration(self):
+        self.manager.migrateModel("System", "", _Model("m1", "Density"))
+        self.assertEqual(self.database.created, {"m1": "Density"})
+        with self.assertRaises(ManagerMigrationError):
+            self.manager.migrateModel("System", "", _Model("m2", "Bad"))
@@ -0,0 +1,90 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import unittest
+
+from collections import namedtuple
+
+from MaterialWS.manager.ObjectCache import ObjectCache
+
+Entry = namedtuple("Entry", "libraryName size")
+
+def entrySize(value):
+    return value.size
+
+class ObjectCacheTests(unittest.TestCase):
+
+    def testHitsAndMisses(self):
+        cache = ObjectCache(sizeOf=entrySize)
+        self.assertIsNone(cache.get(("model", "a")))
+        cache.put(("model", "a"), Entry("System", 10))
+        self.assertEqual(cache.get(("model", "a")), Entry("System", 10))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual((stats["entries"], stats["bytes"]), (1, 10))
+
+    def testEvictsLeastRecentlyUsed(self):
+        cache = ObjectCache(maxEntries=2, sizeOf=entrySize)
+        cache.put("a", Entry("System", 1))
+        cache.put("b", Entry("System", 1))
+        cache.get("a")
+        cache.put("c", Entry("System", 1))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def testMemoryBudget(self):
+        cache = ObjectCache(maxBytes=100, sizeOf=entrySize)
+        cache.put("a", Entry("System", 60))
+        cache.put("b", Entry("System", 60))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["bytes"], 60)
+
+        # Anything larger than the whole budget is never cached
+        cache.put("c", Entry("System", 200))
+        self.assertIsNone(cache.get("c"))
+        self.assertIsNotNone(cache.get("b"))
+
+    def testInvalidate(self):
+        cache = ObjectCache(sizeOf=entrySize)
+        cache.put("a", Entry("System", 1))
+        cache.put("b", Entry("User", 1))
+        cache.put("c", Entry("User", 1))
+        cache.invalidate("a")
+        self.assertIsNone(cache.get("a"))
+        cache.invalidateWhere(lambda value: value.libraryName == "User")
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def testStaleLoadDropped(self):
+        cache = ObjectCache(sizeOf=entrySize)
+        generation = cache.generation
+
+        # Invalidated while the value was loading, so it isn't kept
+        cache.invalidate("a")
+        cache.put("a", Entry("System", 1), generation)
+        self.assertIsNone(cache.get("a"))
+
+        cache.put("a", Entry("System", 1), cache.generation)
+        self.assertIsNotNone(cache.get("a"))
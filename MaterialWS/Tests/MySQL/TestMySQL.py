@@ -25,8 +25,23 @@ __url__ = "https://www.davesrocketshop.com"
 import unittest
 
 from MaterialWS.Database.DatabaseMySQLTest import DatabaseMySQLTest
+from MaterialWS.Database.Exceptions import DatabaseModelNotFound, DatabaseMaterialNotFound
 from MaterialWS.util.UIPath import getUIPath
 
+class _CountingCursor:
+    """Records the statements executed on a cursor"""
+
+    def __init__(self, cursor, statements):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, sql, *params):
+        self._statements.append(sql)
+        return self._cursor.execute(sql, *params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
 class MySQLTests(unittest.TestCase):
 
     def setUp(self):
@@ -40,3 +55,242 @@ class MySQLTests(unittest.TestCase):
         # self.assertIsNone(self._db._connection)
         self._db._connect()
         self.assertIsNotNone(self._db._connection)
+
+    def _insertModel(self, libraryIndex, uuid, name, inherits=[]):
+        cursor = self._db._cursor()
+        cursor.execute("INSERT INTO model (model_id, library_id, model_type, model_name) "
+                       "VALUES (?, ?, 'Physical', ?)", uuid, libraryIndex, name)
+        for inherit in inherits:
+            cursor.execute("INSERT INTO model_inheritance (model_id, inherits_id) VALUES (?, ?)",
+                           uuid, inherit)
+        self._db._connection.commit()
+
+    def testModelClosure(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        density = "00000000-0000-0000-0000-000000000001"
+        elastic = "00000000-0000-0000-0000-000000000002"
+        linear = "00000000-0000-0000-0000-000000000003"
+        self._insertModel(libraryIndex, density, "Density")
+        self._insertModel(libraryIndex, elastic, "LinearElastic", [density])
+        self._insertModel(libraryIndex, linear, "Linear", [elastic, density])
+
+        closure = self._db.getModelClosure(linear)
+        self.assertEqual([uuid for uuid, _, _ in closure], [linear, elastic, density])
+        self.assertEqual(closure[1][1][0], "System")
+        self.assertEqual(closure[1][2].Name, "LinearElastic")
+
+    def _insertMaterial(self, libraryIndex, uuid, name, models=[], properties=[]):
+        cursor = self._db._cursor()
+        cursor.execute("INSERT INTO material (material_id, library_id, material_name) "
+                       "VALUES (?, ?, ?)", uuid, libraryIndex, name)
+        for model in models:
+            cursor.execute("INSERT INTO material_models (material_id, model_id) VALUES (?, ?)",
+                           uuid, model)
+        for property in properties:
+            cursor.execute("INSERT INTO material_property_value (material_id, material_property_name, "
+                           "material_property_type) VALUES (?, ?, 'Quantity')", uuid, property)
+        self._db._connection.commit()
+
+    def testMaterialFilter(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        density = "00000000-0000-0000-0000-000000000001"
+        self._insertModel(libraryIndex, density, "Density")
+        self._db._cursor().execute("INSERT INTO model_property (model_id, model_property_name, "
+                                   "model_property_display_name, model_property_type, "
+                                   "model_property_units, model_property_url) "
+                                   "VALUES (?, 'Density', 'Density', 'Quantity', 'kg/m^3', '')",
+                                   density)
+        self._insertMaterial(libraryIndex, "10000000-0000-0000-0000-000000000001", "Complete",
+                             [density], ["Density"])
+        self._insertMaterial(libraryIndex, "10000000-0000-0000-0000-000000000002", "Incomplete",
+                             [density])
+        self._insertMaterial(libraryIndex, "10000000-0000-0000-0000-000000000003", "Legacy")
+
+        def names(**arguments):
+            return sorted(material[2] for material in self._db.libraryMaterials("System", **arguments))
+
+        self.assertEqual(names(), ["Complete", "Incomplete", "Legacy"])
+        self.assertEqual(names(requiredModels=[density]), ["Complete", "Incomplete"])
+        self.assertEqual(names(requiredCompleteModels=[density]), ["Complete"])
+        self.assertEqual(names(includeLegacy=False), ["Complete", "Incomplete"])
+
+    def _countQueries(self, function, *args):
+        statements = []
+        cursor = self._db._cursor
+        self._db._cursor = lambda *cursorArgs: _CountingCursor(cursor(*cursorArgs), statements)
+        try:
+            function(*args)
+        finally:
+            del self._db._cursor
+        return len(statements)
+
+    def _insertStringProperties(self, uuid, count):
+        cursor = self._db._cursor()
+        for index in range(count):
+            cursor.execute("INSERT INTO material_property_value (material_id, material_property_name, "
+                           "material_property_type) VALUES (?, ?, 'Quantity')", uuid, "Property{}".format(index))
+            valueId = self._db._lastId(cursor)
+            cursor.execute("INSERT INTO material_property_string_value (material_property_value_id, "
+                           "material_property_value) VALUES (?, ?)", valueId, "{} mm".format(index))
+        self._db._connection.commit()
+
+    def testMaterialQueryCount(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        small = "10000000-0000-0000-0000-000000000001"
+        large = "10000000-0000-0000-0000-000000000002"
+        self._insertMaterial(libraryIndex, small, "Small")
+        self._insertMaterial(libraryIndex, large, "Large")
+        self._insertStringProperties(small, 1)
+        self._insertStringProperties(large, 40)
+
+        self.assertEqual(self._countQueries(self._db.getMaterial, small),
+                         self._countQueries(self._db.getMaterial, large))
+
+    def _insertModelProperties(self, uuid, count):
+        cursor = self._db._cursor()
+        for index in range(count):
+            cursor.execute("INSERT INTO model_property (model_id, model_property_name, "
+                           "model_property_display_name, model_property_type, "
+                           "model_property_units, model_property_url) "
+                           "VALUES (?, ?, ?, '2DArray', '', '')",
+                           uuid, "Property{}".format(index), "Property {}".format(index))
+            propertyId = self._db._lastId(cursor)
+            cursor.execute("INSERT INTO model_property_column (model_property_id, model_property_name, "
+                           "model_property_display_name, model_property_type, "
+                           "model_property_units, model_property_url) "
+                           "VALUES (?, 'Temperature', 'Temperature', 'Quantity', 'C', '')", propertyId)
+        self._db._connection.commit()
+
+    def testModelQueryCount(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        uuids = ["00000000-0000-0000-0000-00000000000{}".format(index) for index in range(1, 6)]
+        for index, uuid in enumerate(uuids):
+            self._insertModel(libraryIndex, uuid, "Model{}".format(index), uuids[:index][-1:])
+            self._insertModelProperties(uuid, index * 10)
+
+        models = self._db.getModels(uuids + ["00000000-0000-0000-0000-000000000009"])
+        self.assertEqual(len(models[uuids[4]][2].Properties), 40)
+        self.assertIsInstance(models["00000000-0000-0000-0000-000000000009"], DatabaseModelNotFound)
+        # The models share a folder
+        self.assertEqual(self._countQueries(self._db.getModel, uuids[0]),
+                         self._countQueries(self._db.getModels, uuids))
+
+    def testGetMaterials(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        uuids = ["10000000-0000-0000-0000-00000000000{}".format(index) for index in range(1, 6)]
+        for index, uuid in enumerate(uuids):
+            self._insertMaterial(libraryIndex, uuid, "Material{}".format(index))
+            self._insertStringProperties(uuid, index)
+        missing = "10000000-0000-0000-0000-000000000009"
+
+        requested = [uuids[3], missing] + uuids[:3] + [uuids[4]]
+        results = list(self._db.getMaterials(requested, chunkSize=2))
+        self.assertEqual([uuid for uuid, _ in results], requested)
+        self.assertIsInstance(results[1][1], DatabaseMaterialNotFound)
+        self.assertEqual(results[0][1][2].Name, "Material3")
+
+    def testRenameFolder(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        folderIndex = self._db._createPath(libraryIndex, "Metal/Steel/Alloy")
+        uuid = "10000000-0000-0000-0000-000000000001"
+        self._insertMaterial(libraryIndex, uuid, "Steel")
+        cursor = self._db._cursor()
+        cursor.execute("UPDATE material SET folder_id = ? WHERE material_id = ?", folderIndex, uuid)
+        self._db._connection.commit()
+        self.assertEqual(self._db.libraryMaterials("System")[0][1], "Metal/Steel/Alloy")
+
+        self._db.renameFolder("System", "Metal/Steel", "Ferrous/Steels")
+        self.assertEqual(self._db.libraryMaterials("System")[0][1], "Ferrous/Steels/Alloy")
+        self.assertEqual(self._db.getMaterial(uuid)[2].Directory, "Ferrous/Steels/Alloy")
+
+        # Migrating an existing database rebuilds the paths from the hierarchy
+        cursor.execute("UPDATE folder SET folder_path = NULL")
+        self._db._connection.commit()
+        self._db._fillFolderPaths()
+        self.assertEqual(self._db._getPath(folderIndex), "Ferrous/Steels/Alloy")
+
+    def testCreatePathQueryCount(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        for index in range(20):
+            self._db._createPath(libraryIndex, "Metal/Group{}".format(index))
+
+        def write(index):
+            # A write into an existing folder, as createModel and createMaterial make
+            self._db._createPath(libraryIndex, "Metal/Group{}".format(index))
+            cursor = self._db._cursor()
+            self._db._updateTimestamp(cursor, libraryIndex)
+            self._db._connection.commit()
+
+        # Our own writes keep the cached tree current, so the folders aren't read again:
+        # a version check, then the update and the new version
+        for index in range(10):
+            self.assertEqual(self._countQueries(write, index), 3)
+
+        # A change by another client is still seen
+        cursor = self._db._cursor()
+        cursor.execute("UPDATE library SET library_version = library_version + 1 WHERE library_id = ?",
+                       libraryIndex)
+        self._db._connection.commit()
+        self.assertEqual(self._countQueries(write, 0), 4)
+
+    def testMigrateTables(self):
+        # A database created before the change log and the library version
+        cursor = self._db._cursor()
+        cursor.execute("DROP TABLE change_log")
+        cursor.commit()
+        self._db.migrateTables()
+        self.assertTrue(self._db._hasIndex("folder_library_path"))
+
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        uuid = "10000000-0000-0000-0000-000000000001"
+        self._insertMaterial(libraryIndex, uuid, "Steel")
+        cursor = self._db._cursor()
+        self._db._logChange(cursor, libraryIndex, uuid, "Material", "Created")
+        self._db._connection.commit()
+        self.assertGreater(self._db.getChangeToken("System"), 0)
+
+    def testFolderTree(self):
+        self._db.createLibrary("System", b"", False)
+        libraryIndex = self._db._findLibrary("System")
+        for index in range(5):
+            uuid = "10000000-0000-0000-0000-00000000000{}".format(index)
+            self._insertMaterial(libraryIndex, uuid, "Material{}".format(index))
+            folderIndex = self._db._createPath(libraryIndex, "Metal/Group{}".format(index))
+            cursor = self._db._cursor()
+            cursor.execute("UPDATE material SET folder_id = ? WHERE material_id = ?", folderIndex, uuid)
+            self._db._connection.commit()
+
+        # Paths come from the cached tree rather than a query per folder. The tree built
+        # while creating the folders is still current
+        self.assertEqual(self._countQueries(self._db.libraryMaterials, "System"), 2)
+        self._db._folderTrees.clear()
+        self.assertEqual(self._countQueries(self._db.libraryMaterials, "System"), 3)
+        self.assertEqual(self._countQueries(self._db.libraryMaterials, "System"), 2)
+        self.assertEqual(sorted(path for _, path, _ in self._db.libraryMaterials("System")),
+                         ["Metal/Group{}".format(index) for index in range(5)])
+
+        # A rename by another client is seen once library_version moves, and the
+        # listing agrees with the paths the materials are loaded with
+        cursor = self._db._cursor()
+        cursor.execute("SELECT library_modified FROM library WHERE library_id = ?", libraryIndex)
+        modified = cursor.fetchone().library_modified
+        other = DatabaseMySQLTest()
+        other.renameFolder("System", "Metal", "Ferrous")
+
+        # Within the same second library_modified doesn't move
+        cursor = other._cursor()
+        cursor.execute("UPDATE library SET library_modified = ? WHERE library_id = ?", modified, libraryIndex)
+        other._connection.commit()
+        listed = {uuid: path for uuid, path, _ in self._db.libraryMaterials("System")}
+        self.assertEqual(sorted(listed.values()), ["Ferrous/Group{}".format(index) for index in range(5)])
+        for uuid, path in listed.items():
+            self.assertEqual(self._db.getMaterial(uuid)[2].Directory, path)
+        self.assertEqual(self._db._getPath(folderIndex, libraryIndex), "Ferrous/Group4")
@@ -0,0 +1,199 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from MaterialWS.Database import DatabaseSQLite
+from MaterialWS.Server.Server import MaterialWSApplication, MaterialWSServer, sqliteFactory
+from MaterialWS.Server.ConnectionPool import ConnectionPool
+from MaterialWS.Server.ResponseCache import ResponseCache, CachedResponse
+from MaterialWS.Server.Records import MaterialRecord
+from MaterialWS.WS.ArrayCodec import pack2D
+
+def _response(size):
+    return CachedResponse(b"x" * size, "application/json", None, '"etag"', None)
+
+def _modelBody(uuid, folder):
+    return {
+        "model_id": uuid,
+        "library": "System",
+        "folder": folder,
+        "model_type": "Physical",
+        "model_name": "Density",
+        "model_url": "",
+        "model_description": "",
+        "model_doi": "",
+        "inherits": [],
+        "properties": [
+            {"model_property_name": "Density",
+             "model_property_display_name": "Density",
+             "model_property_type": "Quantity",
+             "model_property_units": "kg/m^3",
+             "model_property_url": "",
+             "model_property_description": "",
+             "columns": []}
+        ]
+    }
+
+class ServerTests(unittest.TestCase):
+
+    def testCacheValidator(self):
+        cache = ResponseCache()
+        cache.put("library", ("System", 1), _response(10))
+        self.assertIsNotNone(cache.get("library", ("System", 1)))
+
+        # A new library_modified makes the entry stale
+        self.assertIsNone(cache.get("library", ("System", 2)))
+
+    def testCacheBudget(self):
+        cache = ResponseCache(maxBytes=25)
+        for key in ["a", "b", "c"]:
+            cache.put(key, 1, _response(10))
+        self.assertIsNone(cache.get("a", 1))
+        self.assertIsNotNone(cache.get("c", 1))
+        self.assertEqual(cache.stats()["bytes"], 20)
+
+    def testPoolReuse(self):
+        pool = ConnectionPool(object, size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIs(first, second)
+        self.assertEqual(pool.stats()["created"], 1)
+
+    def testMaterialRecord(self):
+        body = {
+            "material_id": "a0b1c2d3-0000-0000-0000-000000000000",
+            "material_name": "Steel",
+            "material_author": "",
+            "material_license": "",
+            "material_parent_uuid": None,
+            "material_description": "",
+            "material_url": "",
+            "material_reference": "",
+            "tags": ["metal"],
+            "physical_models": [],
+            "appearance_models": [],
+            "properties": [
+                {"material_property_name": "Density",
+                 "material_property_type": "Quantity",
+                 "material_property_value": "7900 kg/m^3"},
+                {"material_property_name": "Packed",
+                 "material_property_type": "2DArray",
+                 "material_property_value": pack2D([["20 °C", "1 mm"], ["30 °C", "2 mm"]], 2)},
+                {"material_property_name": "Cells",
+                 "material_property_type": "2DArray",
+                 "material_property_value": {"rows": 1, "columns": 2, "values": [
+                     {"row": 0, "column": 1, "value": "5 mm"}]}},
+                {"material_property_name": "Image",
+                 "material_property_type": "Image",
+                 "material_property_value": {"upload": "1"}},
+            ]
+        }
+        material = MaterialRecord(body, {"1": "uploaded"}.get)
+        self.assertEqual(material.PropertyObjects["Density"].Value.UserString, "7900 kg/m^3")
+        self.assertEqual(material.getPhysicalValue("Packed").Array, [["20 °C", "1 mm"], ["30 °C", "2 mm"]])
+        self.assertEqual(material.getPhysicalValue("Cells").Array, [["", "5 mm"]])
+        self.assertEqual(material.PropertyObjects["Image"].Value, "uploaded")
+
+    def testSameSecondWrites(self):
+        directory = tempfile.mkdtemp()
+        now = DatabaseSQLite._now
+        # MySQL stores library_modified to the second
+        DatabaseSQLite._now = lambda: "2025-01-01 12:00:00"
+        try:
+            application = MaterialWSApplication(ConnectionPool(sqliteFactory(
+                os.path.join(directory, "material.sqlite"))))
+            with application.pool.connection() as database:
+                database.createLibrary("System", b"", False)
+                libraryIndex = database._findLibrary("System")
+
+            etags = []
+            for path in ["Metal", "Plastic"]:
+                with application.pool.connection() as database:
+                    database._createPath(libraryIndex, path)
+                status, headers, _ = application.handle("GET", "/materialws/libraryModels/System/", {}, b"")
+                self.assertEqual(status, 200)
+                etags.append(headers["ETag"])
+            self.assertNotEqual(etags[0], etags[1])
+            application.pool.close()
+        finally:
+            DatabaseSQLite._now = now
+            shutil.rmtree(directory, ignore_errors=True)
+
+class ServerHTTPTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = MaterialWSServer(sqliteFactory(os.path.join(self.directory, "material.sqlite")),
+                                       port=0).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _createModel(self, uuid, folder):
+        response = requests.post(self.server.url + "models/create",
+                                 json={"models": [_modelBody(uuid, folder)]})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def testConditionalGet(self):
+        response = requests.post(self.server.url + "library",
+                                 json={"library_name": "System", "library_icon": "",
+                                       "library_read_only": False})
+        self.assertEqual(response.status_code, 201)
+
+        url = self.server.url + "libraryModels/System/"
+        first = requests.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json(), [])
+        etag = first.headers["ETag"]
+        unchanged = requests.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.headers["ETag"], etag)
+
+        # A write invalidates both the ETag and the cached response
+        uuid = "11111111-0000-0000-0000-000000000001"
+        self.assertEqual(self._createModel(uuid, "Mechanical"), [{"uuid": uuid, "status": "created"}])
+        changed = requests.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertEqual([(entry["model_id"], entry["folder"]) for entry in changed.json()],
+                         [(uuid, "Mechanical")])
+
+        self.assertEqual(self._createModel(uuid, "Mechanical"), [{"uuid": uuid, "status": "exists"}])
+        self.assertEqual(requests.get(self.server.url + "model/" + uuid).status_code, 200)
+
+    def testMissingLibrary(self):
+        self.assertEqual(requests.get(self.server.url + "libraryModels/Missing/").status_code, 404)
+        results = requests.post(self.server.url + "models/create",
+                                json={"models": [_modelBody("11111111-0000-0000-0000-000000000002",
+                                                            "Mechanical")]}).json()["results"]
+        self.assertEqual(results[0]["status"], "error")
@@ -0,0 +1,60 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import unittest
+
+from MaterialWS.WS.ArrayCodec import pack2D, unpack2D, pack3D, unpack3D
+
+class ArrayCodecTests(unittest.TestCase):
+
+    def testNumericColumns(self):
+        rows = [["{} °C".format(20 + index * 5), "{:.2f} GPa".format(210 - index * 0.25), "0.3"]
+                for index in range(100)]
+        packed = pack2D(rows, 3)
+        for column in packed["data"]:
+            self.assertIn("numbers", column)
+        self.assertEqual(packed["data"][0]["unit"], "°C")
+        self.assertEqual(packed["data"][1]["decimals"], 2)
+        self.assertEqual(packed["data"][2]["unit"], "")
+        self.assertEqual(unpack2D(packed), rows)
+
+    def testTextKeptExactly(self):
+        # Mixed units, mixed number formats and text can't be rebuilt from a double
+        rows = [["1 mm", "210.0000 GPa", "Steel"],
+                ["1 m", "200.00 GPa", ""]]
+        packed = pack2D(rows, 3)
+        for column in packed["data"]:
+            self.assertIn("strings", column)
+        self.assertEqual(unpack2D(packed), rows)
+
+    def testEmpty(self):
+        self.assertEqual(unpack2D(pack2D([], 2)), [])
+
+    def test3D(self):
+        depths = [[["1 mm", "2 mm"], ["3 mm", "4 mm"]],
+                  [["5 mm", "6 mm"]],
+                  []]
+        packed = pack3D(depths, ["10 °C", "20 °C", "30 °C"], 2)
+        self.assertEqual(packed["depth_rows"], [2, 1, 0])
+        self.assertEqual(unpack3D(packed), depths)
@@ -0,0 +1,109 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import threading
+import time
+import unittest
+
+from MaterialWS.WS.Events import parseEvents, EventListener
+from MaterialWS.Server.Events import EventHub, StandInPublisher
+
+class EventsTests(unittest.TestCase):
+
+    def testParse(self):
+        # Events split across chunks, with a heartbeat comment and CRLF line endings
+        chunks = [b"id: 1\nevent: change\nda", b"ta: {\"uuid\": \"a\"}\n\n:\n\n",
+                  b"event: reset\r\ndata: {}\r\n\r\n"]
+        events = list(parseEvents(chunks))
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0].id, "1")
+        self.assertEqual(events[0].data, '{"uuid": "a"}')
+        self.assertEqual(events[1].event, "reset")
+
+        # An id without data is still reported, so it can be resumed from
+        events = list(parseEvents([b"id: e-0\n\n"]))
+        self.assertEqual([(event.id, event.event) for event in events], [("e-0", None)])
+
+    def testReplay(self):
+        hub = EventHub()
+        ids = [hub.publish({"uuid": str(index)}) for index in range(6)]
+        _, replay, _ = hub.subscribe(ids[3])
+        self.assertEqual([data["uuid"] for _, data in replay], ["4", "5"])
+
+        # After a restart the same numbers are reused under a new epoch
+        restarted = EventHub()
+        for index in range(8):
+            restarted.publish({"uuid": str(index)})
+        self.assertIsNone(restarted.subscribe(ids[3])[1])
+        self.assertIsNone(restarted.subscribe("5")[1])
+
+    def testListener(self):
+        publisher = StandInPublisher(heartbeat=0.1).start()
+        received = threading.Event()
+        changes = []
+
+        def onChange(change):
+            changes.append(change)
+            received.set()
+
+        listener = EventListener(publisher.url + "events/", onChange, retry=0.1).start()
+        try:
+            self.assertTrue(listener.waitConnected(5))
+            publisher.publish({"object_type": "model", "uuid": "a", "library": "System",
+                               "change": "created"})
+            self.assertTrue(received.wait(5))
+            self.assertEqual(changes[0]["uuid"], "a")
+        finally:
+            listener.stop()
+            publisher.stop()
+
+    def testReconnectBeforeFirstEvent(self):
+        publisher = StandInPublisher(heartbeat=0.1).start()
+        received = threading.Event()
+        resets = []
+
+        def onChange(change):
+            received.set()
+
+        listener = EventListener(publisher.url + "events/", onChange, lambda: resets.append(True),
+                                 retry=1.0).start()
+        try:
+            self.assertTrue(listener.waitConnected(5))
+            # The stream opens with the current id
+            for _ in range(50):
+                if listener._lastEventId is not None:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(listener._lastEventId, publisher.hub.lastEventId)
+
+            # Drop the stream before any event, and publish while the client is away
+            with listener._lock:
+                listener._response.close()
+            publisher.publish({"object_type": "model", "uuid": "a", "library": "System",
+                               "change": "created"})
+            self.assertTrue(received.wait(5))
+            self.assertEqual(resets, [])
+        finally:
+            listener.stop()
+            publisher.stop()
@@ -0,0 +1,69 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import shutil
+import tempfile
+import unittest
+
+from MaterialAPI.MaterialManagerExternal import MaterialLibraryObjectType
+from MaterialWS.WS.Replica import LibraryReplica, LibraryDelta, ObjectChange, \
+    CHANGE_CREATED, CHANGE_UPDATED, CHANGE_DELETED
+
+def _created(uuid, path, name, change=CHANGE_CREATED):
+    return ObjectChange(uuid, change, MaterialLibraryObjectType(uuid, path, name))
+
+class ReplicaTests(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def testApplyDeltas(self):
+        replica = LibraryReplica("System", self._directory)
+        self.assertIsNone(replica.token)
+
+        replica.apply(LibraryDelta("System", "2", True,
+                                   [_created("m1", "Mechanical", "Density"),
+                                    _created("m2", "Mechanical", "Hardness")],
+                                   [_created("s1", "Metal", "Steel")]))
+        replica.apply(LibraryDelta("System", "5", False,
+                                   [ObjectChange("m2", CHANGE_DELETED, None)],
+                                   [_created("s1", "Metal/Steel", "Steel", CHANGE_UPDATED)]))
+
+        self.assertEqual(replica.token, "5")
+        self.assertEqual([model.uuid for model in replica.models()], ["m1"])
+        self.assertEqual(replica.materials()[0].path, "Metal/Steel")
+
+        # The replica continues from the saved token in a new session
+        reloaded = LibraryReplica("System", self._directory)
+        self.assertEqual(reloaded.token, "5")
+        self.assertEqual(reloaded.materials(), replica.materials())
+
+    def testFullDeltaReplaces(self):
+        replica = LibraryReplica("System")
+        replica.apply(LibraryDelta("System", "1", True, [_created("m1", "", "Density")], []))
+        replica.apply(LibraryDelta("System", "9", True, [_created("m3", "", "Strength")], []))
+        self.assertEqual([model.uuid for model in replica.models()], ["m3"])
@@ -0,0 +1,86 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import threading
+import time
+import unittest
+
+from MaterialWS.WS.SingleFlight import SingleFlight
+
+class SingleFlightTests(unittest.TestCase):
+
+    def _concurrent(self, flight, function, count=8):
+        release = threading.Event()
+        results = [None] * count
+
+        def blocked():
+            release.wait()
+            return function()
+
+        def worker(index):
+            try:
+                results[index] = flight.do("model", blocked)
+            except Exception as ex:
+                results[index] = ex
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+
+        # Wait until every caller has either started the call or joined it
+        while sum(flight.stats().values()) < count:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def testCoalesced(self):
+        flight = SingleFlight()
+        calls = []
+
+        def function():
+            calls.append(1)
+            return object()
+
+        results = self._concurrent(flight, function)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.stats(), {"calls": 1, "coalesced": 7})
+
+    def testExceptionShared(self):
+        flight = SingleFlight()
+
+        def function():
+            raise KeyError("missing")
+
+        results = self._concurrent(flight, function)
+        self.assertTrue(all(isinstance(result, KeyError) for result in results))
+        self.assertEqual(flight.stats()["calls"], 1)
+
+    def testSequentialCallsNotCoalesced(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("model", lambda: 1), 1)
+        self.assertEqual(flight.do("model", lambda: 2), 2)
+        self.assertEqual(flight.stats(), {"calls": 2, "coalesced": 0})
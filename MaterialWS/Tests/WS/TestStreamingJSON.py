@@ -0,0 +1,92 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import json
+import unittest
+
+from MaterialWS.WS.StreamingJSON import iterJSONArray, StreamingJSONError
+
+def chunked(data, size):
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+class _CountingDecoder(json.JSONDecoder):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def raw_decode(self, s, idx=0):
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+class StreamingJSONTests(unittest.TestCase):
+
+    def testChunkBoundaries(self):
+        entries = [{"material_id": "{}".format(index), "library": "Bibliothèque", "folder": "a/b"}
+                   for index in range(200)]
+        body = json.dumps(entries, ensure_ascii=False).encode("utf-8")
+
+        # Single byte chunks split both tokens and multi-byte characters
+        for size in [1, 7, 4096, len(body)]:
+            self.assertEqual(list(iterJSONArray(chunked(body, size))), entries)
+
+    def testNumbersAcrossChunks(self):
+        self.assertEqual(list(iterJSONArray([b"[12", b"34, 5", b"6]"])), [1234, 56])
+
+    def testSplitNumbers(self):
+        self.assertEqual(list(iterJSONArray([b"[1.", b"5]"])), [1.5])
+        self.assertEqual(list(iterJSONArray([b"[1e", b"5]"])), [1e5])
+        self.assertEqual(list(iterJSONArray([b"[-", b"2.5E", b"-1, 3", b"]"])), [-0.25, 3])
+        self.assertEqual(list(iterJSONArray([b"[tr", b"ue, nu", b"ll]"])), [True, None])
+
+    def testSplitEscapes(self):
+        entries = ['a\\"b', "\u00e8"]
+        body = json.dumps(entries).encode("utf-8")
+        for size in [1, 2, 3]:
+            self.assertEqual(list(iterJSONArray(chunked(body, size))), entries)
+
+    def testLargeElement(self):
+        # An element over many chunks is scanned once rather than decoded on each chunk
+        entries = [{"values": ["{} GPa".format(index) for index in range(20000)]}, 1]
+        body = json.dumps(entries).encode("utf-8")
+        decoder = _CountingDecoder()
+        self.assertEqual(list(iterJSONArray(chunked(body, 64), decoder)), entries)
+        self.assertLessEqual(decoder.calls, 4)
+
+    def testInvalidElement(self):
+        with self.assertRaises(ValueError):
+            list(iterJSONArray([b'[{"a" ', b'1}]']))
+        with self.assertRaises(ValueError):
+            list(iterJSONArray([b"[1", b"x]"]))
+
+    def testEmpty(self):
+        self.assertEqual(list(iterJSONArray([b" [ ", b"] "])), [])
+
+    def testTruncated(self):
+        with self.assertRaises(ValueError):
+            list(iterJSONArray([b'[{"model_id": "1"}, {"model_']))
+
+    def testNotArray(self):
+        with self.assertRaises(StreamingJSONError):
+            list(iterJSONArray([b'{"model_id": "1"}']))
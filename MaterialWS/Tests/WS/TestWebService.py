@@ -0,0 +1,93 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from MaterialWS.Server.Server import MaterialWSServer, sqliteFactory
+from MaterialWS.Database.DatabaseSQLite import DatabaseSQLite
+from MaterialWS.WS.WS import WebService
+from MaterialWS.WS.Session import WSSession
+from MaterialWS.WS.DiskCache import DiskCache
+from MaterialWS.WS.IconCache import IconCache
+from MaterialWS.WS.Replica import LibraryDelta, ObjectChange, CHANGE_DELETED
+
+class WebServiceTests(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._databasePath = os.path.join(self._directory, "material.sqlite")
+        self._server = MaterialWSServer(sqliteFactory(self._databasePath), port=0).start()
+        self._ws = WebService(session=WSSession(),
+                              diskCache=DiskCache(os.path.join(self._directory, "cache.sqlite")),
+                              offline=True, iconCache=IconCache())
+        self._ws._baseURL = self._server.url
+
+    def tearDown(self):
+        self._ws.close()
+        if self._server is not None:
+            self._server.stop()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _names(self):
+        return sorted(library[0] for library in self._ws.getLibraries())
+
+    def testListingRevalidated(self):
+        self._ws.createLibrary("System", b"", False)
+        self.assertEqual(self._names(), ["System"])
+
+        # Another client changes the libraries. The fresh disk copy mustn't hide it
+        database = DatabaseSQLite(self._databasePath)
+        database.createLibrary("User", b"", False)
+        database._disconnect()
+        self.assertEqual(self._names(), ["System", "User"])
+
+        # The disk copy is still served when the web service can't be reached
+        self._server.stop()
+        self._server = None
+        self.assertEqual(self._names(), ["System", "User"])
+
+    def testSyncInvalidates(self):
+        events = []
+        self._ws.addChangeListener(events.append)
+        cache = self._ws._diskCache
+        cache.put("modelClosure/b/", {"models": []})
+        cache.put("model/a/", {})
+
+        # A sync reporting a change acts like the change event would
+        self._ws._invalidateDelta(LibraryDelta("System", "1", False,
+                                               [ObjectChange("a", CHANGE_DELETED, None)], []))
+        self.assertIsNone(cache.get("modelClosure/b/"))
+        self.assertIsNone(cache.get("model/a/"))
+        self.assertEqual(events, [{"object_type": "model", "uuid": "a", "library": "System",
+                                   "change": CHANGE_DELETED}])
+
+    def testOversizeResponseReplaces(self):
+        cache = DiskCache(os.path.join(self._directory, "small.sqlite"), maxBytes=100)
+        cache.put("library?icons=hash", ["System"])
+        cache.put("library?icons=hash", ["x" * 200])
+        self.assertIsNone(cache.get("library?icons=hash"))
+        cache.close()
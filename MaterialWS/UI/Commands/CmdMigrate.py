@@ -29,7 +29,11 @@ from DraftTools import translate
 
 class CmdMigrate:
     def Activated(self):
-        FreeCADGui.runCommand('Materials_MigrateToExternal', 0)
+        from MaterialWS.manager.MaterialWSManager import migration
+
+        # Objects are sent in batches, and any failures reported together at the end
+        with migration():
+            FreeCADGui.runCommand('Materials_MigrateToExternal', 0)
 
     def IsActive(self):
         return True
@@ -0,0 +1,158 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Compact columnar encoding of 2D and 3D array property values"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import base64
+import sys
+
+from array import array
+
+ENCODING_COLUMNAR = "columnar"
+
+def formatNumber(value: float, decimals: int = None) -> str:
+    """Formats a number with a fixed number of decimals, or as briefly as possible"""
+    if decimals is not None:
+        return "{:.{}f}".format(value, decimals)
+    text = repr(value)
+    if text.endswith(".0"):
+        text = text[:-2]
+    return text
+
+def _joinQuantity(value: float, unit: str, decimals: int = None) -> str:
+    if unit:
+        return "{} {}".format(formatNumber(value, decimals), unit)
+    return formatNumber(value, decimals)
+
+def _decimals(number: str):
+    """Returns the number of fixed decimals written in the number, if any"""
+    if "e" in number or "E" in number:
+        return None
+    _, point, fraction = number.partition(".")
+    if not point:
+        return None
+    return len(fraction)
+
+def _splitQuantity(text, decimals: int = None):
+    """
+    Splits a cell such as '20.00 °C' into its number and unit. Returns None when the cell
+    can't be rebuilt exactly from the two, in which case it is sent as text.
+    """
+    if not isinstance(text, str):
+        return None
+    number, _, unit = text.partition(" ")
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    if _joinQuantity(value, unit, decimals) != text:
+        return None
+    return value, unit
+
+def packColumn(cells: list) -> dict:
+    """
+    Packs a column as little endian doubles sharing one unit and number format when every
+    cell allows it, and as a list of strings otherwise.
+    """
+    decimals = None
+    if cells and isinstance(cells[0], str):
+        decimals = _decimals(cells[0].partition(" ")[0])
+
+    values = array("d")
+    unit = None
+    for cell in cells:
+        split = _splitQuantity(cell, decimals)
+        if split is None or (unit is not None and split[1] != unit):
+            return {"strings": list(cells)}
+        values.append(split[0])
+        unit = split[1]
+
+    if sys.byteorder == "big":
+        values.byteswap()
+    column = {"unit": unit or "", "numbers": base64.b64encode(values.tobytes()).decode("ascii")}
+    if decimals is not None:
+        column["decimals"] = decimals
+    return column
+
+def unpackColumn(column: dict) -> list:
+    if "strings" in column:
+        return column["strings"]
+
+    values = array("d")
+    values.frombytes(base64.b64decode(column["numbers"]))
+    if sys.byteorder == "big":
+        values.byteswap()
+    unit = column["unit"]
+    decimals = column.get("decimals")
+    return [_joinQuantity(value, unit, decimals) for value in values]
+
+def _packRows(rows: list, columns: int) -> list:
+    return [packColumn([row[column] for row in rows]) for column in range(columns)]
+
+def _unpackRows(data: list) -> list:
+    columns = [unpackColumn(column) for column in data]
+    if not columns:
+        return []
+    return [list(row) for row in zip(*columns)]
+
+def pack2D(rows: list, columns: int) -> dict:
+    """Encodes a 2D array given as a list of rows of cell strings"""
+    return {
+        "encoding": ENCODING_COLUMNAR,
+        "rows": len(rows),
+        "columns": columns,
+        "data": _packRows(rows, columns)
+    }
+
+def unpack2D(value: dict) -> list:
+    """Returns the rows of a 2D array encoded by pack2D"""
+    return _unpackRows(value["data"])
+
+def pack3D(depths: list, depthValues: list, columns: int) -> dict:
+    """
+    Encodes a 3D array given as a list of depths, each a list of rows of cell strings.
+    The rows of all depths are packed together and split again using depth_rows.
+    """
+    rows = []
+    depthRows = []
+    for depth in depths:
+        rows.extend(depth)
+        depthRows.append(len(depth))
+    return {
+        "encoding": ENCODING_COLUMNAR,
+        "columns": columns,
+        "depth": len(depths),
+        "depth_values": list(depthValues),
+        "depth_rows": depthRows,
+        "data": _packRows(rows, columns)
+    }
+
+def unpack3D(value: dict) -> list:
+    """Returns the depths of a 3D array encoded by pack3D, each a list of rows"""
+    rows = _unpackRows(value["data"])
+    depths = []
+    start = 0
+    for count in value["depth_rows"]:
+        depths.append(rows[start:start + count])
+        start += count
+    return depths
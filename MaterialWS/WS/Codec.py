@@ -0,0 +1,91 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Content negotiation and decoding of web service responses"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import json
+
+import urllib3.response
+
+# The faster codecs are used when they are installed, falling back to plain JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+
+MIME_JSON = "application/json"
+MIME_MSGPACK = "application/x-msgpack"
+
+def hasZstd() -> bool:
+    """True when urllib3 is able to decode zstd content encoding"""
+    return getattr(urllib3.response, "HAS_ZSTD", False)
+
+def hasMsgpack() -> bool:
+    return msgpack is not None
+
+def acceptEncoding() -> str:
+    encodings = ["gzip", "deflate"]
+    if hasZstd():
+        encodings.insert(0, "zstd")
+    return ", ".join(encodings)
+
+def acceptHeaders(format: str = FORMAT_JSON) -> dict:
+    """Request headers asking for the given body format, with JSON as the fallback"""
+    if format == FORMAT_MSGPACK and hasMsgpack():
+        accept = "{}, {};q=0.5".format(MIME_MSGPACK, MIME_JSON)
+    else:
+        accept = MIME_JSON
+    return {"Accept": accept, "Accept-Encoding": acceptEncoding()}
+
+def loadsJSON(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def decodeBody(content: bytes, contentType: str):
+    """Decodes a response body according to its content type"""
+    mimeType = (contentType or "").split(";")[0].strip().lower()
+    if mimeType == MIME_MSGPACK:
+        if msgpack is None:
+            raise ValueError("Received MessagePack without msgpack installed")
+        return msgpack.unpackb(content, raw=False)
+    return loadsJSON(content)
+
+def decodeResponse(response):
+    return decodeBody(response.content, response.headers.get("Content-Type"))
+
+def encodeBody(body, format: str = FORMAT_JSON):
+    """Returns the encoded body and its content type, as a server would send it"""
+    if format == FORMAT_MSGPACK and hasMsgpack():
+        return msgpack.packb(body, use_bin_type=True), MIME_MSGPACK
+    if orjson is not None:
+        return orjson.dumps(body), MIME_JSON
+    return json.dumps(body, separators=(",", ":")).encode("utf-8"), MIME_JSON
@@ -0,0 +1,105 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for caching validated web service responses"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import hashlib
+import threading
+
+from email.utils import format_datetime
+
+def makeETag(*parts) -> str:
+    """
+    Returns a strong entity tag for a response derived from the given values, typically
+    the library name and its library_modified timestamp
+    """
+    digest = hashlib.sha1("|".join([str(part) for part in parts]).encode("utf-8"))
+    return '"{}"'.format(digest.hexdigest())
+
+def makeLastModified(timestamp) -> str:
+    """Formats a library_modified datetime as an HTTP date"""
+    return format_datetime(timestamp, usegmt=timestamp.tzinfo is not None)
+
+class ConditionalCache:
+    """
+    Keeps the last body received for each path together with its validators so that
+    the next request can be made conditional and a 304 answered from the local copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def headers(self, path: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(path)
+        headers = {}
+        if entry is not None:
+            etag, lastModified, _ = entry
+            if etag:
+                headers["If-None-Match"] = etag
+            if lastModified:
+                headers["If-Modified-Since"] = lastModified
+        return headers
+
+    def get(self, path: str):
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return None
+        return entry[2]
+
+    def store(self, path: str, response, body) -> None:
+        etag = response.headers.get("ETag")
+        lastModified = response.headers.get("Last-Modified")
+        with self._lock:
+            if etag or lastModified:
+                self._entries[path] = (etag, lastModified, body)
+            else:
+                # The server no longer validates this resource
+                self._entries.pop(path, None)
+
+    def seed(self, path: str, etag: str, lastModified: str, body) -> None:
+        """Restores validators saved by a previous session"""
+        if etag or lastModified:
+            with self._lock:
+                self._entries.setdefault(path, (etag, lastModified, body))
+
+    def validators(self, path: str):
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return (None, None)
+        return (entry[0], entry[1])
+
+    def evict(self, path: str = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def evictPrefix(self, prefix: str) -> None:
+        with self._lock:
+            for path in [path for path in self._entries if path.startswith(prefix)]:
+                del self._entries[path]
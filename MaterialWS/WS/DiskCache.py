@@ -0,0 +1,167 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for the persistent web service response cache"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class DiskCache:
+    """
+    A size bounded cache of decoded JSON responses stored in an SQLite database.
+
+    Entries expire after their time to live but are kept until evicted, so they can
+    still be served when the web service is unreachable. When the total size exceeds
+    the budget the least recently used entries are removed first. SQLite locking and
+    write ahead logging make the file safe to share between FreeCAD processes.
+    """
+
+    def __init__(self, path: str, maxBytes: int = 64 * 1024 * 1024, ttl: int = 3600):
+        self._path = path
+        self._maxBytes = maxBytes
+        self._ttl = ttl
+
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Another process may hold the write lock briefly while evicting
+            connection = sqlite3.connect(self._path, timeout=30, check_same_thread=False,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS response ("
+                               " response_key TEXT NOT NULL PRIMARY KEY,"
+                               " response_body TEXT NOT NULL,"
+                               " response_size INTEGER NOT NULL,"
+                               " response_etag TEXT,"
+                               " response_last_modified TEXT,"
+                               " response_expires REAL NOT NULL,"
+                               " response_last_access REAL NOT NULL"
+                               ")")
+            connection.execute("CREATE INDEX IF NOT EXISTS response_last_access_index"
+                               " ON response (response_last_access)")
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str, allowExpired: bool = False):
+        """Returns the cached body, or None if it is missing or has expired"""
+        entry = self.getEntry(key, allowExpired)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def getEntry(self, key: str, allowExpired: bool = False):
+        """Returns a tuple of (body, etag, lastModified, expired) or None when missing"""
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT response_body, response_etag, response_last_modified,"
+                                     " response_expires FROM response WHERE response_key = ?",
+                                     (key,)).fetchone()
+            if row is None:
+                return None
+            expired = row[3] < now
+            if expired and not allowExpired:
+                return None
+            connection.execute("UPDATE response SET response_last_access = ? WHERE response_key = ?",
+                               (now, key))
+        return (json.loads(row[0]), row[1], row[2], expired)
+
+    def put(self, key: str, body, etag: str = None, lastModified: str = None, ttl: int = None) -> None:
+        if ttl is None:
+            ttl = self._ttl
+        text = json.dumps(body, separators=(",", ":"))
+        size = len(text)
+        if size > self._maxBytes:
+            # Too large to keep, and the previous response for the key is out of date
+            self.evict(key)
+            return
+
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("INSERT OR REPLACE INTO response (response_key, response_body,"
+                                   " response_size, response_etag, response_last_modified,"
+                                   " response_expires, response_last_access)"
+                                   " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   (key, text, size, etag, lastModified, now + ttl, now))
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def touch(self, key: str, ttl: int = None) -> None:
+        """Extends the lifetime of an entry that has been revalidated"""
+        if ttl is None:
+            ttl = self._ttl
+        now = time.time()
+        with self._lock:
+            self._connect().execute("UPDATE response SET response_expires = ?, response_last_access = ?"
+                                    " WHERE response_key = ?", (now + ttl, now, key))
+
+    def _evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(response_size), 0) FROM response").fetchone()[0]
+        if total <= self._maxBytes:
+            return
+
+        # Remove the least recently used entries until we are within budget
+        rows = connection.execute("SELECT response_key, response_size FROM response"
+                                  " ORDER BY response_last_access ASC").fetchall()
+        keys = []
+        for key, size in rows:
+            if total <= self._maxBytes:
+                break
+            keys.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM response WHERE response_key = ?", keys)
+
+    def evict(self, key: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM response WHERE response_key = ?", (key,))
+
+    def evictPrefix(self, prefix: str) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM response WHERE substr(response_key, 1, ?) = ?",
+                                    (len(prefix), prefix))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM response")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,183 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Client for the server-sent change events"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import json
+import threading
+
+from collections import namedtuple
+
+import requests
+
+ServerEvent = namedtuple("ServerEvent", "id event data")
+
+EVENT_CHANGE = "change"
+EVENT_RESET = "reset"
+
+def parseEvents(chunks):
+    """
+    Yields a ServerEvent for each event in a text/event-stream delivered as an iterable
+    of byte chunks. Comments, such as heartbeats, are skipped. A block holding only an
+    id is yielded with an event of None, so the id can still be resumed from.
+    """
+    buffer = b""
+    eventId = None
+    idOnly = False
+    event = None
+    data = []
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                break
+            line = buffer[:end].rstrip(b"\r").decode("utf-8")
+            buffer = buffer[end + 1:]
+
+            if not line:
+                if data or event:
+                    yield ServerEvent(eventId, event or "message", "\n".join(data))
+                elif idOnly:
+                    yield ServerEvent(eventId, None, "")
+                idOnly = False
+                event = None
+                data = []
+                continue
+            if line.startswith(":"):
+                continue
+
+            field, _, value = line.partition(":")
+            if value.startswith(" "):
+                value = value[1:]
+            if field == "data":
+                data.append(value)
+            elif field == "event":
+                event = value
+            elif field == "id":
+                eventId = value
+                idOnly = True
+
+class EventListener:
+    """
+    Follows the change event stream in a background thread, passing the data of each
+    change event to onChange. onReset is called when events may have been missed and
+    cached data can no longer be trusted. Lost connections are retried with backoff,
+    resuming after the last event received.
+    """
+
+    def __init__(self, url: str, onChange, onReset=None, retry: float = 1.0,
+                 maxRetry: float = 60.0, readTimeout: float = 45.0):
+        self._url = url
+        self._onChange = onChange
+        self._onReset = onReset
+        self._retry = retry
+        self._maxRetry = maxRetry
+        self._readTimeout = readTimeout
+        self._lastEventId = None
+        self._wasConnected = False
+        self._stopping = threading.Event()
+        self._connected = threading.Event()
+        self._lock = threading.Lock()
+        self._response = None
+        self._thread = None
+
+        # A separate session, so the stream doesn't hold a connection of the pool
+        self._session = requests.Session()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def waitConnected(self, timeout: float = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="MaterialWS events", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        with self._lock:
+            if self._response is not None:
+                # Unblocks the read in the listening thread
+                self._response.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._session.close()
+
+    def _run(self) -> None:
+        retry = self._retry
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+                retry = self._retry
+            except Exception as ex:
+                if not self._stopping.is_set():
+                    print("Change event stream interrupted:", ex)
+            finally:
+                self._connected.clear()
+            if self._stopping.wait(retry):
+                break
+            retry = min(retry * 2, self._maxRetry)
+
+    def _dispatch(self, event: ServerEvent) -> None:
+        try:
+            if event.event == EVENT_RESET:
+                if self._onReset is not None:
+                    self._onReset()
+            elif event.event == EVENT_CHANGE:
+                self._onChange(json.loads(event.data))
+        except Exception as ex:
+            # A failing handler shouldn't end the stream
+            print("Unable to handle change event:", ex)
+
+    def _listen(self) -> None:
+        headers = {"Accept": "text/event-stream"}
+        if self._lastEventId is not None:
+            headers["Last-Event-ID"] = self._lastEventId
+        response = self._session.get(self._url, stream=True, headers=headers,
+                                     timeout=(10, self._readTimeout))
+        with self._lock:
+            self._response = response
+        try:
+            response.raise_for_status()
+            if self._lastEventId is None and self._wasConnected:
+                # Dropped before even the stream's first id arrived, so there is nothing
+                # to resume from and changes may have been missed
+                self._dispatch(ServerEvent(None, EVENT_RESET, "{}"))
+            self._wasConnected = True
+            self._connected.set()
+            for event in parseEvents(response.iter_content(chunk_size=None)):
+                if self._stopping.is_set():
+                    break
+                if event.id:
+                    self._lastEventId = event.id
+                self._dispatch(event)
+        finally:
+            with self._lock:
+                self._response = None
+            response.close()
@@ -0,0 +1,72 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Functions for passing a material filter to the web service or the database"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+def _uuids(value) -> list[str]:
+    return sorted(set(value or []))
+
+def filterArguments(filter=None, options=None) -> dict:
+    """
+    Returns the keyword arguments to DatabaseMySQL.libraryMaterials() selecting only
+    the materials that pass the Materials.MaterialFilter and MaterialFilterOptions.
+
+    Only the model requirements and IncludeLegacy narrow a listing. A legacy material
+    is one with no material_models rows, that is one not declaring any model.
+    IncludeFavorites and IncludeRecent don't select library materials at all; the
+    material editor adds its favorites and recent entries from the user's preferences
+    outside the library tree, so they are deliberately not passed on.
+    """
+    arguments = {}
+    if filter is not None:
+        required = _uuids(getattr(filter, "RequiredModels", None))
+        if required:
+            arguments["requiredModels"] = required
+        complete = _uuids(getattr(filter, "RequiredCompleteModels", None))
+        if complete:
+            arguments["requiredCompleteModels"] = complete
+    if options is not None and not getattr(options, "IncludeLegacy", True):
+        arguments["includeLegacy"] = False
+    return arguments
+
+def toQuery(arguments: dict) -> dict:
+    """The query parameters sending the filter arguments to the web service"""
+    query = {}
+    if arguments.get("requiredModels"):
+        query["models"] = ",".join(arguments["requiredModels"])
+    if arguments.get("requiredCompleteModels"):
+        query["complete"] = ",".join(arguments["requiredCompleteModels"])
+    if not arguments.get("includeLegacy", True):
+        query["legacy"] = "0"
+    return query
+
+def fromQuery(query: dict) -> dict:
+    """The filter arguments sent as query parameters"""
+    arguments = {}
+    if query.get("models"):
+        arguments["requiredModels"] = _uuids(query["models"].split(","))
+    if query.get("complete"):
+        arguments["requiredCompleteModels"] = _uuids(query["complete"].split(","))
+    if query.get("legacy") == "0":
+        arguments["includeLegacy"] = False
+    return arguments
@@ -0,0 +1,87 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for the content addressed library icon cache"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import hashlib
+import os
+import tempfile
+import threading
+
+def iconHash(icon: bytes) -> str:
+    """The content address of an icon, as sent in library listings"""
+    return hashlib.sha256(icon).hexdigest()
+
+class IconCache:
+    """
+    Decoded library icons keyed by the hash of their contents. Icons are kept in memory
+    and, when a directory is given, on disk so they survive between sessions. Since the
+    key is derived from the contents, entries never need to be invalidated.
+    """
+
+    def __init__(self, directory: str = None):
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._icons = {}
+
+    def _path(self, hash: str) -> str:
+        return os.path.join(self._directory, hash)
+
+    def get(self, hash: str):
+        with self._lock:
+            icon = self._icons.get(hash)
+        if icon is not None or self._directory is None:
+            return icon
+
+        try:
+            with open(self._path(hash), "rb") as file:
+                icon = file.read()
+        except OSError:
+            return None
+        if iconHash(icon) != hash:
+            # Damaged or partially written
+            return None
+
+        with self._lock:
+            self._icons[hash] = icon
+        return icon
+
+    def put(self, hash: str, icon: bytes) -> None:
+        if iconHash(icon) != hash:
+            raise ValueError("Icon does not match its hash")
+
+        with self._lock:
+            self._icons[hash] = icon
+        if self._directory is None:
+            return
+
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+
+            # Write then rename so other processes never see a partial icon
+            handle, temporary = tempfile.mkstemp(dir=self._directory)
+            with os.fdopen(handle, "wb") as file:
+                file.write(icon)
+            os.replace(temporary, self._path(hash))
+        except OSError as ex:
+            print("Unable to cache icon:", ex)
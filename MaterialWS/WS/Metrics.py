@@ -0,0 +1,194 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Per endpoint latency and payload statistics for the web service"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import bisect
+import threading
+
+from urllib.parse import urlsplit
+
+# Bucket upper bounds. The last bucket collects everything larger
+_latencyBounds = [0.25 * (2 ** power) for power in range(18)] # 0.25ms to ~9 hours
+_byteBounds = [64 * (4 ** power) for power in range(12)] # 64 bytes to ~268MB
+
+class Histogram:
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.sum / self.count
+
+    def percentile(self, fraction):
+        """Returns the upper bound of the bucket holding the given fraction of values"""
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                if index < len(self._bounds):
+                    return min(self._bounds[index], self.max)
+                return self.max
+        return self.max
+
+    def buckets(self):
+        """Returns a list of (upper bound, count) with None as the final bound"""
+        bounds = self._bounds + [None]
+        return [(bounds[index], count) for index, count in enumerate(self._counts) if count > 0]
+
+    def toDict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean(),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": self.buckets()
+        }
+
+class EndpointMetrics:
+
+    def __init__(self):
+        self.connect = Histogram(_latencyBounds)
+        self.ttfb = Histogram(_latencyBounds)
+        self.total = Histogram(_latencyBounds)
+        self.requestBytes = Histogram(_byteBounds)
+        self.responseBytes = Histogram(_byteBounds)
+        self.status = {}
+        self.connections = 0
+
+    def toDict(self):
+        return {
+            "connect": self.connect.toDict(),
+            "ttfb": self.ttfb.toDict(),
+            "total": self.total.toDict(),
+            "request_bytes": self.requestBytes.toDict(),
+            "response_bytes": self.responseBytes.toDict(),
+            "status": dict(self.status),
+            "connections": self.connections
+        }
+
+def endpointName(method, url):
+    """Collapses a URL to its endpoint so that e.g. every model/{uuid}/ shares one entry"""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if len(parts) > 1 and parts[0] == "materialws":
+        parts = parts[1:]
+    name = parts[0] if parts else "/"
+    return "{} {}".format(method, name)
+
+class WSMetrics:
+    """
+    Collects timings for web service requests. Times are in milliseconds.
+
+    The connect time covers name resolution and connection setup, and is only recorded
+    for requests that opened a new connection. ttfb is the time until the response
+    headers were received.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._counters = {}
+
+    def record(self, method, url, status, connect, ttfb, total, requestBytes, responseBytes):
+        name = endpointName(method, url)
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None:
+                endpoint = EndpointMetrics()
+                self._endpoints[name] = endpoint
+            if connect is not None:
+                endpoint.connect.add(connect)
+                endpoint.connections += 1
+            if ttfb is not None:
+                endpoint.ttfb.add(ttfb)
+            endpoint.total.add(total)
+            endpoint.requestBytes.add(requestBytes)
+            if responseBytes is not None:
+                endpoint.responseBytes.add(responseBytes)
+            endpoint.status[status] = endpoint.status.get(status, 0) + 1
+
+    def increment(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def snapshot(self):
+        """Returns the statistics as plain dictionaries keyed by endpoint"""
+        with self._lock:
+            return {name: endpoint.toDict() for name, endpoint in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._counters.clear()
+
+    def dump(self):
+        """Prints a summary table, e.g. from the FreeCAD Python console"""
+        snapshot = self.snapshot()
+        print("{:32} {:>7} {:>9} {:>9} {:>9} {:>9} {:>11} {:>11}".format(
+            "endpoint", "calls", "connect", "ttfb p50", "p50 ms", "p99 ms", "sent", "received"))
+        for name in sorted(snapshot):
+            endpoint = snapshot[name]
+            print("{:32} {:>7} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f} {:>11.0f} {:>11.0f}".format(
+                name,
+                endpoint["total"]["count"],
+                endpoint["connect"]["mean"],
+                endpoint["ttfb"]["p50"],
+                endpoint["total"]["p50"],
+                endpoint["total"]["p99"],
+                endpoint["request_bytes"]["sum"],
+                endpoint["response_bytes"]["sum"]))
+        for counter, value in sorted(self.counters().items()):
+            print("{:32} {:>7}".format(counter, value))
+
+_metrics = WSMetrics()
+
+def getMetrics():
+    """The metrics shared by all web service sessions in this process"""
+    return _metrics
@@ -0,0 +1,142 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for a local replica of a library kept current by delta sync"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from collections import namedtuple
+
+from MaterialAPI.MaterialManagerExternal import MaterialLibraryObjectType
+
+CHANGE_CREATED = "created"
+CHANGE_UPDATED = "updated"
+CHANGE_DELETED = "deleted"
+
+# object is the MaterialLibraryObjectType, or None for deleted objects
+ObjectChange = namedtuple("ObjectChange", "uuid change object")
+
+# full is True when the delta is a complete listing replacing any earlier state
+LibraryDelta = namedtuple("LibraryDelta", "library token full models materials")
+
+class LibraryReplica:
+    """
+    A local copy of the model and material listings of one library, kept current by
+    applying the deltas returned by WebService.syncLibrary(). When a directory is given
+    the replica is saved there, so the next session only asks for what changed since.
+    """
+
+    def __init__(self, library: str, directory: str = None):
+        self._library = library
+        self._directory = directory
+        self._lock = threading.Lock()
+        self._token = None
+        self._models = {}
+        self._materials = {}
+        self._load()
+
+    @property
+    def library(self) -> str:
+        return self._library
+
+    @property
+    def token(self) -> str:
+        """The token to send on the next sync, or None before the first"""
+        return self._token
+
+    def sync(self, ws) -> LibraryDelta:
+        """Requests the changes since the last sync and applies them"""
+        delta = ws.syncLibrary(self._library, self._token)
+        self.apply(delta)
+        return delta
+
+    def apply(self, delta: LibraryDelta) -> None:
+        with self._lock:
+            if delta.full:
+                self._models = {}
+                self._materials = {}
+            self._applyChanges(self._models, delta.models)
+            self._applyChanges(self._materials, delta.materials)
+            self._token = delta.token
+            self._save()
+
+    def _applyChanges(self, objects: dict, changes: list) -> None:
+        for change in changes:
+            if change.change == CHANGE_DELETED:
+                objects.pop(change.uuid, None)
+            else:
+                objects[change.uuid] = (change.object.path, change.object.name)
+
+    def models(self) -> list[MaterialLibraryObjectType]:
+        with self._lock:
+            return [MaterialLibraryObjectType(uuid, path, name)
+                    for uuid, (path, name) in self._models.items()]
+
+    def materials(self) -> list[MaterialLibraryObjectType]:
+        with self._lock:
+            return [MaterialLibraryObjectType(uuid, path, name)
+                    for uuid, (path, name) in self._materials.items()]
+
+    def _path(self) -> str:
+        name = hashlib.sha1(self._library.encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, name + ".json")
+
+    def _load(self) -> None:
+        if self._directory is None:
+            return
+        try:
+            with open(self._path(), "r", encoding="utf-8") as file:
+                state = json.load(file)
+            if state["library"] != self._library:
+                return
+            self._models = {uuid: tuple(entry) for uuid, entry in state["models"].items()}
+            self._materials = {uuid: tuple(entry) for uuid, entry in state["materials"].items()}
+            self._token = state["token"]
+        except (OSError, ValueError, KeyError):
+            # Start again with a full sync
+            pass
+
+    def _save(self) -> None:
+        if self._directory is None:
+            return
+        state = {
+            "library": self._library,
+            "token": self._token,
+            "models": self._models,
+            "materials": self._materials
+        }
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+
+            # Replace the file in one step so a crash never leaves a partial replica
+            handle, temporary = tempfile.mkstemp(dir=self._directory)
+            with os.fdopen(handle, "w", encoding="utf-8") as file:
+                json.dump(state, file)
+            os.replace(temporary, self._path())
+        except OSError as ex:
+            # The replica is an optimization only
+            print("Unable to save replica:", ex)
@@ -0,0 +1,159 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Conversion of models and materials to the web service JSON bodies"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+from MaterialWS.WS.ArrayCodec import pack2D, pack3D
+
+# The same bodies are sent by the client when creating objects and by the reference
+# server when answering requests, so both sides share these functions
+
+def userString(value):
+    if hasattr(value, "UserString"):
+        return value.UserString
+    return value
+
+def fromModelProperty(property) -> dict:
+    return {
+        "model_property_name": property.Name,
+        "model_property_display_name": property.DisplayName,
+        "model_property_type": property.Type,
+        "model_property_units": property.Units,
+        "model_property_url": property.URL,
+        "model_property_description": property.Description
+    }
+
+def fromModel(libraryName: str, path: str, model, uuid: str = None) -> dict:
+    properties = []
+    for property in model.Properties.values():
+        # Inherited properties are stored with the model that defines them
+        if property.Inherited:
+            continue
+        entry = fromModelProperty(property)
+        entry["columns"] = [fromModelProperty(column) for column in property.Columns]
+        properties.append(entry)
+
+    return {
+        "model_id": uuid or model.UUID,
+        "library": libraryName,
+        "folder": path,
+        "model_type": model.Type,
+        "model_name": model.Name,
+        "model_url": model.URL,
+        "model_description": model.Description,
+        "model_doi": model.DOI,
+        "inherits": list(model.Inherited),
+        "properties": properties
+    }
+
+def fromArray2D(array, columnar: bool = True) -> dict:
+    rows = [[userString(columnValue) for columnValue in rowValue] for rowValue in array.Array]
+    if columnar:
+        return pack2D(rows, array.Columns)
+
+    values = []
+    for row, rowValue in enumerate(rows):
+        for column, columnValue in enumerate(rowValue):
+            values.append({"row": row, "column": column, "value": columnValue})
+    return {"rows": array.Rows, "columns": array.Columns, "values": values}
+
+def fromArray3D(array, columnar: bool = True) -> dict:
+    depthValues = []
+    depths = []
+    for depth, depthValue in enumerate(array.Array):
+        depthValues.append(userString(array.getDepthValue(depth)))
+        depths.append([[userString(columnValue) for columnValue in rowValue]
+                       for rowValue in depthValue])
+    if columnar:
+        return pack3D(depths, depthValues, array.Columns)
+
+    values = []
+    for depth, rows in enumerate(depths):
+        for row, rowValue in enumerate(rows):
+            for column, columnValue in enumerate(rowValue):
+                values.append({"depth": depth, "depth_rows": len(rows),
+                               "row": row, "column": column, "value": columnValue})
+    return {"columns": array.Columns, "depth": array.Depth,
+            "depth_values": depthValues, "values": values}
+
+def fromMaterialProperty(material, property, largeValue=None, columnar: bool = True):
+    """
+    Returns the value to send for a property, or None if there is nothing to store.
+    Image values are passed through largeValue when given.
+    """
+    if property.Type == "2DArray" or \
+       property.Type == "3DArray":
+        if material.hasPhysicalProperty(property.Name):
+            array = material.getPhysicalValue(property.Name)
+        else:
+            array = material.getAppearanceValue(property.Name)
+        if array is None:
+            return None
+        if array.Dimensions == 2:
+            return fromArray2D(array, columnar)
+        return fromArray3D(array, columnar)
+    elif property.Type == "Quantity":
+        if property.Empty:
+            return None
+        return property.Value.UserString
+    elif property.Type == "SVG" or \
+        property.Type == "Image":
+        if largeValue is not None:
+            return largeValue(property.Value)
+    elif property.Type == "ImageList":
+        if property.Value is None:
+            return None
+        if largeValue is not None:
+            return [largeValue(image) for image in property.Value]
+
+    return property.Value
+
+def fromMaterial(libraryName: str, path: str, material, largeValue=None,
+                 columnar: bool = True, uuid: str = None) -> dict:
+    properties = []
+    for property in material.PropertyObjects.values():
+        value = fromMaterialProperty(material, property, largeValue, columnar)
+        if value is None:
+            continue
+        properties.append({
+            "material_property_name": property.Name,
+            "material_property_type": property.Type,
+            "material_property_value": value
+        })
+
+    return {
+        "material_id": uuid or material.UUID,
+        "library": libraryName,
+        "folder": path,
+        "material_name": material.Name,
+        "material_author": material.Author,
+        "material_license": material.License,
+        "material_parent_uuid": material.Parent,
+        "material_description": material.Description,
+        "material_url": material.URL,
+        "material_reference": material.Reference,
+        "tags": list(material.Tags),
+        "physical_models": list(material.PhysicalModels),
+        "appearance_models": list(material.AppearanceModels),
+        "properties": properties
+    }
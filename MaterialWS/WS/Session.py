@@ -0,0 +1,197 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for pooled web service connections"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Connection setup time for the request being made on this thread
+_timing = threading.local()
+
+class _TimedHTTPConnection(HTTPConnection):
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _timing.connect = (time.perf_counter() - start) * 1000.0
+
+class _TimedHTTPSConnection(HTTPSConnection):
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _timing.connect = (time.perf_counter() - start) * 1000.0
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class WSSession:
+    """
+    A keep-alive HTTP session with a bounded connection pool.
+
+    A single instance is shared by all calls made by a WebService object and may be
+    used from several threads at once. When no request has been made for longer than
+    idleTimeout seconds the idle pooled connections are dropped and reopened on the
+    next request. Connections still in use, such as a streamed listing, are kept.
+
+    When a WSMetrics object is given every request is timed and recorded in it.
+    """
+
+    def __init__(self, poolSize=10, keepAlive=True, idleTimeout=60, metrics=None):
+        self._poolSize = max(1, poolSize)
+        self._keepAlive = keepAlive
+        self._idleTimeout = idleTimeout
+        self._metrics = metrics
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._lastUsed = 0.0
+        self._inFlight = 0
+
+    def _createSession(self):
+        session = requests.Session()
+
+        # All requests go to the same host, so a single pool sized for the number of
+        # concurrent callers is sufficient. Blocking keeps us within the pool size.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._poolSize, pool_block=True)
+        if self._metrics is not None:
+            adapter.poolmanager.pool_classes_by_scheme = {
+                "http": _TimedHTTPConnectionPool,
+                "https": _TimedHTTPSConnectionPool
+            }
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        if not self._keepAlive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _dropIdleConnections(self):
+        """Closes the pooled connections not checked out by a request"""
+        for adapter in self._session.adapters.values():
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                idle = []
+                try:
+                    while True:
+                        idle.append(pool.pool.get(block=False))
+                except queue.Empty:
+                    pass
+                for connection in idle:
+                    if connection is not None:
+                        connection.close()
+                    # An empty slot, filled by a new connection when needed
+                    pool.pool.put(None, block=False)
+
+    def _acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._session is None:
+                self._session = self._createSession()
+            elif self._idleTimeout > 0 and self._inFlight == 0 and \
+                    (now - self._lastUsed) > self._idleTimeout:
+                # The server has most likely closed these connections already
+                self._dropIdleConnections()
+            self._inFlight += 1
+            self._lastUsed = now
+            return self._session
+
+    def _release(self):
+        with self._lock:
+            self._inFlight -= 1
+            self._lastUsed = time.monotonic()
+
+    def request(self, method, url, **kwargs):
+        if self._metrics is None:
+            session = self._acquire()
+            try:
+                return session.request(method, url, **kwargs)
+            finally:
+                self._release()
+        return self._timedRequest(method, url, **kwargs)
+
+    def _timedRequest(self, method, url, **kwargs):
+        session = self._acquire()
+        try:
+            return self._timed(session, method, url, **kwargs)
+        finally:
+            self._release()
+
+    def _timed(self, session, method, url, **kwargs):
+        _timing.connect = None
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except Exception:
+            total = (time.perf_counter() - start) * 1000.0
+            self._metrics.record(method, url, "error", _timing.connect, None, total, 0, None)
+            raise
+        total = (time.perf_counter() - start) * 1000.0
+
+        body = response.request.body
+        requestBytes = len(body) if body is not None else 0
+
+        # Streamed bodies haven't been read yet
+        responseBytes = None
+        if not kwargs.get("stream", False):
+            try:
+                responseBytes = response.raw.tell()
+            except Exception:
+                responseBytes = len(response.content)
+
+        self._metrics.record(method, url, response.status_code, _timing.connect,
+                             response.elapsed.total_seconds() * 1000.0, total,
+                             requestBytes, responseBytes)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    @property
+    def poolSize(self):
+        return self._poolSize
+
+    @property
+    def metrics(self):
+        return self._metrics
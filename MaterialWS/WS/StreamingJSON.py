@@ -0,0 +1,205 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Incremental decoding of JSON array responses"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import codecs
+import json
+import re
+
+_whitespace = " \t\n\r"
+
+# A number or literal ends at the first character that can't be part of it
+_delimiters = _whitespace + ",]}"
+
+_structural = re.compile(r'[\[\]{}"]')
+_stringEnd = re.compile(r'["\\]')
+_scalarEnd = re.compile(r'[ \t\n\r,\]}]')
+
+class StreamingJSONError(ValueError):
+
+    def __init__(self, message="Invalid JSON array"):
+        super().__init__(message)
+
+def _skipWhitespace(buffer, index):
+    while index < len(buffer) and buffer[index] in _whitespace:
+        index += 1
+    return index
+
+class _ElementScanner:
+    """
+    Finds the end of an element that continues over several chunks. The nesting and
+    string state is kept between chunks, so each character is scanned only once and
+    the element is decoded once it is complete.
+    """
+
+    def begin(self, buffer, index):
+        """Starts an element at buffer[index] and returns the index to scan from"""
+        first = buffer[index]
+        self.scalar = first not in '[{"'
+        self.inString = first == '"'
+        self.escaped = False
+        self.depth = 1 if first in "[{" else 0
+        return index if self.scalar else index + 1
+
+    def scan(self, buffer, index, final):
+        """Returns the index just past the element, or None when it continues in the next chunk"""
+        length = len(buffer)
+        if self.escaped and index < length:
+            self.escaped = False
+            index += 1
+        while index < length:
+            if self.scalar:
+                match = _scalarEnd.search(buffer, index)
+                if match is None:
+                    break
+                return match.start()
+
+            if self.inString:
+                match = _stringEnd.search(buffer, index)
+                if match is None:
+                    break
+                index = match.end()
+                if match.group() == "\\":
+                    # Skip the escaped character, which may be in the next chunk
+                    if index < length:
+                        index += 1
+                    else:
+                        self.escaped = True
+                    continue
+                self.inString = False
+                if self.depth == 0:
+                    return index
+                continue
+
+            match = _structural.search(buffer, index)
+            if match is None:
+                break
+            index = match.end()
+            character = match.group()
+            if character == '"':
+                self.inString = True
+            elif character in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return index
+
+        if final:
+            if self.scalar:
+                return length
+            raise StreamingJSONError("Unexpected end of JSON array")
+        return None
+
+def iterJSONArray(chunks, decoder=None):
+    """
+    Yields the elements of a top level JSON array as they are decoded from an iterable
+    of byte chunks, such as response.iter_content(). Only the element currently being
+    decoded is held in memory, so the size of the array is unbounded.
+    """
+    if decoder is None:
+        decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    scanner = _ElementScanner()
+
+    # The text of an element continuing over several chunks
+    pending = None
+
+    buffer = ""
+    index = 0
+    started = False
+    expectValue = True
+    finished = False
+    chunks = iter(chunks)
+
+    while not finished:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buffer = text.decode(b"" if final else chunk, final=final)
+        index = 0
+
+        while True:
+            if pending is not None:
+                end = scanner.scan(buffer, index, final)
+                if end is None:
+                    pending.append(buffer[index:])
+                    break
+                pending.append(buffer[index:end])
+                element = "".join(pending)
+                pending = None
+                value, elementEnd = decoder.raw_decode(element)
+                if elementEnd != len(element):
+                    raise StreamingJSONError("Expected ',' or ']'")
+                yield value
+                index = end
+                expectValue = False
+                continue
+
+            index = _skipWhitespace(buffer, index)
+            if index >= len(buffer):
+                break
+
+            if not started:
+                if buffer[index] != "[":
+                    raise StreamingJSONError("Expected a JSON array")
+                started = True
+                index += 1
+                continue
+
+            if buffer[index] == "]":
+                finished = True
+                index += 1
+                break
+
+            if not expectValue:
+                if buffer[index] != ",":
+                    raise StreamingJSONError("Expected ',' or ']'")
+                expectValue = True
+                index += 1
+                continue
+
+            # Most elements are complete in the buffer and decode in a single call
+            try:
+                value, end = decoder.raw_decode(buffer, index)
+                complete = final or not isinstance(value, (int, float, bool, type(None))) or \
+                    (end < len(buffer) and buffer[end] in _delimiters)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                complete = False
+            if complete:
+                yield value
+                index = end
+                expectValue = False
+                continue
+
+            # The element continues in the next chunk
+            pending = [buffer[index:scanner.begin(buffer, index)]]
+            index += len(pending[0])
+
+        if final and not finished:
+            raise StreamingJSONError("Unexpected end of JSON array")
+
+    if _skipWhitespace(buffer, index) < len(buffer):
+        raise StreamingJSONError("Unexpected data after JSON array")
@@ -22,15 +22,35 @@
 __author__ = "David Carter"
 __url__ = "https://www.davesrocketshop.com"
 
+import asyncio
 import base64
 
-import requests
-from requests.exceptions import HTTPError
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlencode
+
+from requests.exceptions import HTTPError, ConnectionError as RequestsConnectionError, Timeout
 
 import Materials
 from MaterialAPI.MaterialManagerExternal import MaterialLibraryType, MaterialLibraryObjectType, \
     ModelObjectType, MaterialObjectType
 
+from MaterialWS.Configuration import getPoolSize, getKeepAlive, getIdleTimeout, getBatchSize, \
+    getCacheEnabled, getCachePath, getCacheSize, getCacheTTL, getOfflineMode, getWireFormat, \
+    getIconCachePath, getInstrumentation, getUploadChunkSize, getReplicaPath
+from MaterialWS.WS.Session import WSSession
+from MaterialWS.WS.ConditionalCache import ConditionalCache
+from MaterialWS.WS.DiskCache import DiskCache
+from MaterialWS.WS.StreamingJSON import iterJSONArray
+from MaterialWS.WS.Codec import acceptHeaders, decodeResponse, FORMAT_JSON
+from MaterialWS.WS.IconCache import IconCache, iconHash
+from MaterialWS.WS.Metrics import getMetrics
+from MaterialWS.WS.SingleFlight import SingleFlight
+from MaterialWS.WS.ArrayCodec import unpack2D, unpack3D, ENCODING_COLUMNAR
+from MaterialWS.WS.Serialize import fromModel, fromMaterial
+from MaterialWS.WS.Filter import filterArguments, toQuery
+from MaterialWS.WS.Replica import LibraryReplica, LibraryDelta, ObjectChange
+from MaterialWS.WS.Events import EventListener
 from MaterialWS.WS.Exceptions import WSLibraryCreationError, \
     WSIconError, WSLibraryNotFound, \
     WSModelCreationError, WSMaterialCreationError, \
@@ -43,91 +63,293 @@ from MaterialWS.WS.Exceptions import WSLibraryCreationError, \
 class WebService:
     pass
 
-    def __init__(self):
+    def __init__(self, session: WSSession = None, batchSize: int = None,
+                 diskCache: DiskCache = None, offline: bool = None, format: str = None,
+                 iconCache: IconCache = None):
         self._baseURL = "http://127.0.0.1:8000/materialws/"
+        if session is None:
+            metrics = getMetrics() if getInstrumentation() else None
+            session = WSSession(getPoolSize(), getKeepAlive(), getIdleTimeout(), metrics)
+        self._session = session
+        if batchSize is None:
+            batchSize = getBatchSize()
+        self._batchSize = max(1, batchSize)
+        self._conditionalCache = ConditionalCache()
+        if diskCache is None and getCacheEnabled():
+            diskCache = DiskCache(getCachePath(), getCacheSize() * 1024 * 1024, getCacheTTL())
+        self._diskCache = diskCache
+        if offline is None:
+            offline = getOfflineMode()
+        self._offline = offline
+        if format is None:
+            format = getWireFormat()
+        self._format = format
+        if iconCache is None:
+            iconCache = IconCache(getIconCachePath() if getCacheEnabled() else None)
+        self._iconCache = iconCache
+        self._flight = SingleFlight("ws", self._session.metrics)
+        self._uploadChunkSize = getUploadChunkSize() * 1024
+        self._listener = None
+        self._changeListeners = []
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        self._session.close()
+        if self._diskCache is not None:
+            self._diskCache.close()
+
+    @property
+    def poolSize(self) -> int:
+        return self._session.poolSize
+
+    @property
+    def metrics(self):
+        """The WSMetrics recording this service's requests, or None when disabled"""
+        return self._session.metrics
+
+    @property
+    def batchSize(self) -> int:
+        return self._batchSize
+
+    def coalescingStats(self) -> dict:
+        return self._flight.stats()
+
+    def _getJSON(self, path: str, conditional: bool = False, format: str = None):
+        # Conditional paths are always revalidated. Their disk copy answers a 304 and
+        # serves as the offline fallback instead.
+        if self._diskCache is not None and not conditional:
+            body = self._diskCache.get(path)
+            if body is not None:
+                return body
 
-    def getLibraries(self) -> list[MaterialLibraryType]:
-        libraries = []
         try:
-            response = requests.get(self._baseURL + "library")
+            return self._fetchJSON(path, conditional, format)
+        except (HTTPError, RequestsConnectionError, Timeout) as ex:
+            body = self._offlineJSON(path, ex)
+            if body is None:
+                raise
+            return body
+
+    def _headers(self, format: str = None) -> dict:
+        if format is None:
+            format = self._format
+        headers = acceptHeaders(format)
+
+        # Ask for array properties in the packed columnar form
+        headers["X-Array-Encoding"] = ENCODING_COLUMNAR
+        return headers
+
+    def _fetchJSON(self, path: str, conditional: bool, format: str = None):
+        if not conditional:
+            response = self._session.get(self._baseURL + path, headers=self._headers(format))
+            response.raise_for_status()
+            body = decodeResponse(response)
+            self._storeJSON(path, body)
+            return body
+
+        # Listings are revalidated against the library_modified derived validators
+        validators = self._conditionalCache.headers(path)
+        if not validators and self._diskCache is not None:
+            entry = self._diskCache.getEntry(path, allowExpired=True)
+            if entry is not None:
+                self._conditionalCache.seed(path, entry[1], entry[2], entry[0])
+                validators = self._conditionalCache.headers(path)
+        headers = self._headers(format)
+        headers.update(validators)
+        response = self._session.get(self._baseURL + path, headers=headers)
+        response.raise_for_status()
+        if response.status_code == 304:
+            body = self._conditionalCache.get(path)
+            if body is not None:
+                if self._diskCache is not None:
+                    self._diskCache.touch(path)
+                return body
+
+            # Evicted since the request was made. Fetch it again in full
+            response = self._session.get(self._baseURL + path, headers=self._headers(format))
             response.raise_for_status()
 
-            list = response.json()
-            for entry in list:
-                print(entry)
-                icon = base64.b64decode(entry["library_icon"])
-                print("icon:")
-                print(icon)
-                libraries.append(MaterialLibraryType(entry["library_name"], icon,
-                                                     entry["library_read_only"]))
-        except HTTPError as http_err:
+        body = decodeResponse(response)
+        self._conditionalCache.store(path, response, body)
+        etag, lastModified = self._conditionalCache.validators(path)
+        self._storeJSON(path, body, etag, lastModified)
+        return body
+
+    def _storeJSON(self, path: str, body, etag: str = None, lastModified: str = None) -> None:
+        if self._diskCache is not None:
+            try:
+                self._diskCache.put(path, body, etag, lastModified)
+            except Exception as ex:
+                # The cache is an optimization only
+                print("Unable to cache response:", ex)
+
+    def _offlineJSON(self, path: str, error):
+        """Returns a possibly stale cached body when the web service can't be reached"""
+        if not self._offline or self._diskCache is None:
+            return None
+        if isinstance(error, HTTPError) and error.response is not None and \
+                error.response.status_code < 500:
+            # The server answered, so the cached copy is not authoritative
+            return None
+        return self._diskCache.get(path, allowExpired=True)
+
+    def _invalidate(self, path: str, prefix: bool = False) -> None:
+        if prefix:
+            self._conditionalCache.evictPrefix(path)
+            if self._diskCache is not None:
+                self._diskCache.evictPrefix(path)
+        else:
+            self._conditionalCache.evict(path)
+            if self._diskCache is not None:
+                self._diskCache.evict(path)
+
+    def _invalidateLibraries(self) -> None:
+        for path in ["library?icons=hash", "modellibrary?icons=hash", "materiallibrary?icons=hash"]:
+            self._invalidate(path)
+
+    def subscribe(self) -> EventListener:
+        """
+        Follows the server's change events, evicting exactly the cache entries affected
+        by each change. This allows long cache lifetimes without serving stale data.
+        """
+        if self._listener is None:
+            self._listener = EventListener(self._baseURL + "events/", self._onChange,
+                                           self._onReset).start()
+        return self._listener
+
+    def addChangeListener(self, callback) -> None:
+        """
+        Calls callback with each change event after the caches have been updated. The
+        event is a dictionary with the object_type, uuid, library and change. On a reset
+        the change is 'reset' and any cached data should be dropped.
+        """
+        self._changeListeners.append(callback)
+
+    def removeChangeListener(self, callback) -> None:
+        if callback in self._changeListeners:
+            self._changeListeners.remove(callback)
+
+    def _notifyChange(self, event: dict) -> None:
+        for callback in list(self._changeListeners):
+            callback(event)
+
+    def _onChange(self, event: dict) -> None:
+        objectType = event.get("object_type")
+        library = event.get("library")
+        uuid = event.get("uuid")
+        if objectType == "model":
+            self._invalidate("model/{}/".format(uuid))
+            self._invalidate("libraryModels/{}/".format(library), prefix=True)
+            # Any closure may include the model
+            self._invalidate("modelClosure/", prefix=True)
+        elif objectType == "material":
+            self._invalidate("material/{}/".format(uuid))
+            self._invalidate("libraryMaterials/{}/".format(library), prefix=True)
+        else:
+            self._invalidate("library/{}/".format(library), prefix=True)
+
+        # Creating or removing an object can change which libraries hold models or materials
+        self._invalidateLibraries()
+        self._notifyChange(event)
+
+    def _onReset(self) -> None:
+        """Events were missed, so nothing cached can be trusted"""
+        self._conditionalCache.evict()
+        if self._diskCache is not None:
+            self._diskCache.clear()
+        self._notifyChange({"change": "reset"})
+
+    def _postJSON(self, path: str, body, format: str = None):
+        response = self._session.post(self._baseURL + path, json=body, headers=self._headers(format))
+        response.raise_for_status()
+        return decodeResponse(response)
+
+    def _chunks(self, uuids: list[str], chunkSize: int):
+        if chunkSize is None:
+            chunkSize = self._batchSize
+        chunkSize = max(1, chunkSize)
+        for start in range(0, len(uuids), chunkSize):
+            yield uuids[start:start + chunkSize]
+
+    def _getIcon(self, hash: str) -> bytes:
+        if not hash:
+            return b""
+        icon = self._iconCache.get(hash)
+        if icon is None:
+            response = self._session.get(self._baseURL + "icon/{}/".format(hash))
+            response.raise_for_status()
+            icon = response.content
+            if iconHash(icon) != hash:
+                raise WSIconError(message="Icon does not match its hash")
+            self._iconCache.put(hash, icon)
+        return icon
+
+    def _getLibrariesJSON(self, path: str):
+        """
+        Listings carry only a hash of each icon. Icons not already cached are fetched
+        here, once, so the conversion doesn't need the network.
+        """
+        body = self._getJSON(path + "?icons=hash", conditional=True)
+        if isinstance(body, dict):
+            entries = [body]
+        else:
+            entries = body
+        for entry in entries:
+            if "library_icon_hash" in entry:
+                self._getIcon(entry["library_icon_hash"])
+        return body
+
+    def _toLibraries(self, list) -> list[MaterialLibraryType]:
+        libraries = []
+        for entry in list:
+            libraries.append(self._toLibrary(entry))
+        return libraries
+
+    def _toLibrary(self, entry) -> MaterialLibraryType:
+        if "library_icon_hash" in entry:
+            icon = self._getIcon(entry["library_icon_hash"])
+        else:
+            # Servers without the icon endpoint send the icon inline
+            icon = base64.b64decode(entry["library_icon"])
+        return MaterialLibraryType(entry["library_name"], icon,
+                                   entry["library_read_only"])
+
+    def getLibraries(self) -> list[MaterialLibraryType]:
+        try:
+            return self._toLibraries(self._getLibrariesJSON("library"))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to get libraries:", ex)
             raise WSLibraryNotFound(error=ex)
 
-        return libraries
-
     def getModelLibraries(self) -> list[MaterialLibraryType]:
-        libraries = []
         try:
-            response = requests.get(self._baseURL + "modellibrary")
-            response.raise_for_status()
-
-            list = response.json()
-            for entry in list:
-                print(entry)
-                icon = base64.b64decode(entry["library_icon"])
-                print("icon:")
-                print(icon)
-                libraries.append(MaterialLibraryType(entry["library_name"], icon,
-                                                     entry["library_read_only"]))
-        except HTTPError as http_err:
+            return self._toLibraries(self._getLibrariesJSON("modellibrary"))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to get libraries:", ex)
             raise WSLibraryNotFound(error=ex)
 
-        return libraries
-
     def getMaterialLibraries(self) -> list[MaterialLibraryType]:
-        libraries = []
         try:
-            response = requests.get(self._baseURL + "materiallibrary")
-            response.raise_for_status()
-
-            list = response.json()
-            for entry in list:
-                print(entry)
-                icon = base64.b64decode(entry["library_icon"])
-                print("icon:")
-                print(icon)
-                libraries.append(MaterialLibraryType(entry["library_name"], icon,
-                                                     entry["library_read_only"]))
-        except HTTPError as http_err:
+            return self._toLibraries(self._getLibrariesJSON("materiallibrary"))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to get libraries:", ex)
             raise WSLibraryNotFound(error=ex)
 
-        return libraries
-
     def getLibrary(self, name: str) -> MaterialLibraryType:
         try:
-            response = requests.get(self._baseURL + "library/{}/".format(name))
-            response.raise_for_status()
-
-            entry = response.json()
-            print(entry)
-            icon = base64.b64decode(entry["library_icon"])
-            print("icon:")
-            print(icon)
-            return MaterialLibraryType(entry["library_name"], icon,
-                                                    entry["library_read_only"])
-        except HTTPError as http_err:
+            return self._toLibrary(self._getLibrariesJSON("library/{}/".format(name)))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
@@ -136,59 +358,254 @@ class WebService:
 
     def createLibrary(self, name: str, icon: bytes, readOnly: bool) -> None:
         try:
+            if isinstance(icon, str):
+                icon = icon.encode("utf-8")
             library = {
                 "library_name": name,
-                "library_icon": icon,
+                "library_icon": base64.b64encode(icon).decode("ascii") if icon else "",
                 "library_read_only": readOnly
             }
-            response = requests.post(self._baseURL + "library", json=library)
+            response = self._session.post(self._baseURL + "library", json=library)
             response.raise_for_status()
-        except HTTPError as http_err:
+            self._invalidateLibraries()
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to create library:", ex)
             raise WSLibraryCreationError(error=ex)
 
-    def libraryModels(self, libraryName: str) -> list[MaterialLibraryObjectType]:
+    def _toLibraryModel(self, entry) -> MaterialLibraryObjectType:
+        return MaterialLibraryObjectType(entry["model_id"], entry["folder"], entry["model_name"])
+
+    def _toLibraryModels(self, list) -> list[MaterialLibraryObjectType]:
         models = []
-        try:
-            response = requests.get(self._baseURL + "libraryModels/{}/".format(libraryName))
-            response.raise_for_status()
+        for entry in list:
+            models.append(self._toLibraryModel(entry))
+        return models
 
-            list = response.json()
-            for entry in list:
-                print(entry)
-                models.append(MaterialLibraryObjectType(entry["model_id"], entry["library"], entry["folder"]))
-        except HTTPError as http_err:
+    def libraryModels(self, libraryName: str) -> list[MaterialLibraryObjectType]:
+        try:
+            return self._toLibraryModels(self._getJSON("libraryModels/{}/".format(libraryName), conditional=True))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to get library:", ex)
             raise WSLibraryNotFound(error=ex)
 
-        return models
+    def _toLibraryMaterial(self, entry) -> MaterialLibraryObjectType:
+        return MaterialLibraryObjectType(entry["material_id"], entry["folder"], entry["material_name"])
+
+    def _toLibraryMaterials(self, list) -> list[MaterialLibraryObjectType]:
+        materials = []
+        for entry in list:
+            materials.append(self._toLibraryMaterial(entry))
+        return materials
 
     def libraryMaterials(self, libraryName: str,
                          filter: Materials.MaterialFilter = None,
                          options: Materials.MaterialFilterOptions = None) -> list[MaterialLibraryObjectType]:
-        models = []
+        """
+        Returns the materials in the library. Only the materials passing the filter
+        are sent, see filterArguments().
+        """
         try:
-            response = requests.get(self._baseURL + "libraryMaterials/{}/".format(libraryName))
+            path = "libraryMaterials/{}/".format(libraryName)
+            query = toQuery(filterArguments(filter, options))
+            if query:
+                path += "?" + urlencode(sorted(query.items()))
+            return self._toLibraryMaterials(self._getJSON(path, conditional=True))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    def _toChanges(self, entries, idField: str, nameField: str) -> list[ObjectChange]:
+        changes = []
+        for entry in entries:
+            object = None
+            if nameField in entry:
+                object = MaterialLibraryObjectType(entry[idField], entry["folder"], entry[nameField])
+            changes.append(ObjectChange(entry[idField], entry["change"], object))
+        return changes
+
+    def syncLibrary(self, name: str, since=None) -> LibraryDelta:
+        """
+        Returns the models and materials created, changed or deleted in the library since
+        a token from an earlier call or a timestamp. Without either the whole listing is
+        returned. The token in the result continues from this call.
+        """
+        try:
+            path = "sync/{}/".format(name)
+            if since is not None:
+                if hasattr(since, "isoformat"):
+                    since = since.isoformat(sep=" ")
+                path += "?" + urlencode({"since": since})
+
+            # Deltas depend on the token, so are never answered from the caches
+            response = self._session.get(self._baseURL + path, headers=self._headers())
+            response.raise_for_status()
+            body = decodeResponse(response)
+
+            delta = LibraryDelta(body["library"], body["token"], body["full"],
+                                 self._toChanges(body["models"], "model_id", "model_name"),
+                                 self._toChanges(body["materials"], "material_id", "material_name"))
+            self._invalidateDelta(delta)
+            return delta
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to sync library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    def _invalidateDelta(self, delta: LibraryDelta) -> None:
+        """
+        Evicts cached copies of the objects a delta reports as changed, and passes each
+        change on to the change listeners as an event would
+        """
+        if not delta.models and not delta.materials:
+            return
+        for change in delta.models:
+            self._invalidate("model/{}/".format(change.uuid))
+        if delta.models:
+            # Any closure may include the models
+            self._invalidate("modelClosure/", prefix=True)
+        for change in delta.materials:
+            self._invalidate("material/{}/".format(change.uuid))
+        self._invalidateLibraries()
+        self._invalidate("libraryModels/{}/".format(delta.library), prefix=True)
+        self._invalidate("libraryMaterials/{}/".format(delta.library), prefix=True)
+
+        for objectType, changes in [("model", delta.models), ("material", delta.materials)]:
+            for change in changes:
+                self._notifyChange({"object_type": objectType, "uuid": change.uuid,
+                                    "library": delta.library, "change": change.change})
+
+    def replica(self, name: str) -> LibraryReplica:
+        """A replica of the library, saved between sessions when caching is enabled"""
+        return LibraryReplica(name, getReplicaPath() if getCacheEnabled() else None)
+
+    def _iterJSON(self, path: str, chunkSize: int):
+        # The incremental decoder only understands JSON
+        with self._session.get(self._baseURL + path, stream=True,
+                               headers=self._headers(FORMAT_JSON)) as response:
             response.raise_for_status()
+            yield from iterJSONArray(response.iter_content(chunk_size=chunkSize))
 
-            list = response.json()
-            for entry in list:
-                print(entry)
-                models.append(MaterialLibraryObjectType(entry["material_id"], entry["library"], entry["folder"]))
-        except HTTPError as http_err:
+    def iterLibraryModels(self, libraryName: str, chunkSize: int = 64 * 1024):
+        """
+        Yields the models in a library as the listing is received. Memory use is bounded
+        by the chunk size rather than the size of the library. Streamed listings bypass
+        the response caches.
+        """
+        try:
+            for entry in self._iterJSON("libraryModels/{}/".format(libraryName), chunkSize):
+                yield self._toLibraryModel(entry)
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to get library:", ex)
             raise WSLibraryNotFound(error=ex)
 
-        return models
+    def iterLibraryMaterials(self, libraryName: str, chunkSize: int = 64 * 1024):
+        """
+        Yields the materials in a library as the listing is received. Memory use is
+        bounded by the chunk size rather than the size of the library. Streamed listings
+        bypass the response caches.
+        """
+        try:
+            for entry in self._iterJSON("libraryMaterials/{}/".format(libraryName), chunkSize):
+                yield self._toLibraryMaterial(entry)
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    def _getPage(self, path: str, limit: int, after: str):
+        query = {"limit": limit}
+        if after:
+            query["after"] = after
+        body = self._getJSON("{}?{}".format(path, urlencode(query)), conditional=True)
+        return body["items"], body.get("next")
+
+    def _iterPages(self, path: str, pageSize: int, convert):
+        """
+        Yields converted entries page by page. While the caller works through one page
+        the next is already being requested in the background.
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(self._getPage, path, pageSize, None)
+            while future is not None:
+                items, cursor = future.result()
+                future = None
+                if cursor:
+                    future = executor.submit(self._getPage, path, pageSize, cursor)
+                for entry in items:
+                    yield convert(entry)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def libraryModelsPage(self, libraryName: str, limit: int, after: str = None):
+        """
+        Returns up to limit models following the cursor after, together with the cursor
+        for the next page. The cursor is None on the last page.
+        """
+        try:
+            items, cursor = self._getPage("libraryModels/{}/".format(libraryName), limit, after)
+            return self._toLibraryModels(items), cursor
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    def libraryMaterialsPage(self, libraryName: str, limit: int, after: str = None):
+        """
+        Returns up to limit materials following the cursor after, together with the
+        cursor for the next page. The cursor is None on the last page.
+        """
+        try:
+            items, cursor = self._getPage("libraryMaterials/{}/".format(libraryName), limit, after)
+            return self._toLibraryMaterials(items), cursor
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    def iterLibraryModelsPaged(self, libraryName: str, pageSize: int = 500):
+        """Yields the models in a library, prefetching the next page in the background"""
+        try:
+            yield from self._iterPages("libraryModels/{}/".format(libraryName), pageSize,
+                                       self._toLibraryModel)
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    def iterLibraryMaterialsPaged(self, libraryName: str, pageSize: int = 500):
+        """Yields the materials in a library, prefetching the next page in the background"""
+        try:
+            yield from self._iterPages("libraryMaterials/{}/".format(libraryName), pageSize,
+                                       self._toLibraryMaterial)
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
 
     def _getModelProperty(self, property):
         prop = Materials.ModelProperty()
@@ -213,35 +630,435 @@ class WebService:
 
         return prop
 
+    def _toModel(self, entry) -> ModelObjectType:
+        model = Materials.Model()
+        model.Type = entry["model_type"]
+        model.Name = entry["model_name"]
+        model.URL = entry["model_url"]
+        model.Description = entry["model_description"]
+        model.DOI = entry["model_doi"]
+        model.Directory = entry["folder"]
+        inherits = entry["inherits"]
+        if len(inherits) > 0:
+            model.addInheritance(inherits[0])
+
+        libraryName = entry["library"]
+
+        properties = entry["properties"]
+        for property in properties:
+            model.addProperty(self._getModelProperty(property))
+
+        return ModelObjectType(libraryName, model)
 
     def getModel(self, uuid: str) -> ModelObjectType:
+        return self._flight.do(("model", uuid), self._getModel, uuid)
+
+    def _getModel(self, uuid: str) -> ModelObjectType:
         try:
-            response = requests.get(self._baseURL + "model/{}/".format(uuid))
-            response.raise_for_status()
+            return self._toModel(self._getJSON("model/{}/".format(uuid)))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get model:", ex)
+            raise WSModelNotFound(error=ex)
 
-            entry = response.json()
-            print(entry)
-            model = Materials.Model()
-            model.Type = entry["model_type"]
-            model.Name = entry["model_name"]
-            model.URL = entry["model_url"]
-            model.Description = entry["model_description"]
-            model.DOI = entry["model_doi"]
-            model.Directory = entry["folder"]
-            inherits = entry["inherits"]
-            if len(inherits) > 0:
-                model.addInheritance(inherits[0])
+    def getModelClosure(self, uuid: str) -> dict:
+        """
+        Fetch a model and every model it inherits from, directly or indirectly, in a
+        single request. The models are also cached individually.
 
-            libraryName = entry["library"]
+        Returns a dictionary of uuid to ModelObjectType, starting with the model
+        requested and followed by its ancestors, nearest first.
+        """
+        try:
+            entries = self._getJSON("modelClosure/{}/".format(uuid))["models"]
+            models = {}
+            for entry in entries:
+                self._storeJSON("model/{}/".format(entry["model_id"]), entry)
+                models[entry["model_id"]] = self._toModel(entry)
+            return models
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get model:", ex)
+            raise WSModelNotFound(error=ex)
+
+    def _getBatchJSON(self, endpoint: str, key: str, idField: str, objectPath: str,
+                      uuids: list[str], chunkSize: int) -> dict:
+        """
+        Returns a dictionary of uuid to JSON entry for the objects found. Objects in the
+        disk cache are not requested again. When a chunk can't be retrieved its objects
+        map to the WSConnectionError instead.
+        """
+        entries = {}
+        missing = []
+        for uuid in uuids:
+            body = None
+            if self._diskCache is not None:
+                body = self._diskCache.get(objectPath.format(uuid))
+            if body is None:
+                missing.append(uuid)
+            else:
+                entries[uuid] = body
+
+        for chunk in self._chunks(missing, chunkSize):
+            try:
+                response = self._postJSON(endpoint, {"uuids": chunk})
+            except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+                print(f"HTTP error occurred: {http_err}")
+                for uuid in chunk:
+                    body = self._offlineJSON(objectPath.format(uuid), http_err)
+                    if body is None:
+                        body = WSConnectionError(error=http_err)
+                    entries[uuid] = body
+                continue
+
+            for entry in response[key]:
+                entries[entry[idField]] = entry
+                self._storeJSON(objectPath.format(entry[idField]), entry)
+
+        return entries
+
+    def getModels(self, uuids: list[str], chunkSize: int = None) -> dict:
+        """
+        Fetch several models using one request per chunk of uuids.
+
+        Returns a dictionary keyed by uuid in the order requested. Each value is either
+        the ModelObjectType or the WSError describing why that model could not be
+        retrieved.
+        """
+        entries = self._getBatchJSON("models/", "models", "model_id", "model/{}/", uuids, chunkSize)
+
+        models = {}
+        for uuid in uuids:
+            entry = entries.get(uuid)
+            if entry is None:
+                models[uuid] = WSModelNotFound()
+            elif isinstance(entry, Exception):
+                models[uuid] = entry
+            else:
+                try:
+                    models[uuid] = self._toModel(entry)
+                except Exception as ex:
+                    print("Unable to get model:", ex)
+                    models[uuid] = WSModelNotFound(error=ex)
+
+        return models
+
+    def _getMaterialArray2D(self, value):
+        array = Materials.Array2D()
+
+        # Columns must be set first so rows can be created
+        array.Columns = value["columns"]
+        array.Rows = value["rows"]
+        if value.get("encoding") == ENCODING_COLUMNAR:
+            for row, rowValue in enumerate(unpack2D(value)):
+                for column, columnValue in enumerate(rowValue):
+                    array.setValue(row, column, columnValue)
+        else:
+            for cell in value["values"]:
+                array.setValue(cell["row"], cell["column"], cell["value"])
+
+        return array
+
+    def _getMaterialArray3D(self, value):
+        array = Materials.Array3D()
 
-            properties = entry["properties"]
-            for property in properties:
-                model.addProperty(self._getModelProperty(property))
+        # Columns must be set first so depth can be created
+        array.Columns = value["columns"]
+        array.Depth = value["depth"]
+        for depth, depthValue in enumerate(value["depth_values"]):
+            array.setDepthValue(depth, depthValue)
+        if value.get("encoding") == ENCODING_COLUMNAR:
+            for depth, depthValue in enumerate(unpack3D(value)):
+                array.setRows(depth, len(depthValue))
+                for row, rowValue in enumerate(depthValue):
+                    for column, columnValue in enumerate(rowValue):
+                        array.setValue(depth, row, column, columnValue)
+            return array
+        for cell in value["values"]:
+            array.setRows(cell["depth"], cell["depth_rows"])
+            array.setValue(cell["depth"], cell["row"], cell["column"], cell["value"])
 
-            return ModelObjectType(libraryName, model)
-        except HTTPError as http_err:
+        return array
+
+    def _getMaterialPropertyValue(self, property):
+        type = property["material_property_type"]
+        value = property["material_property_value"]
+        if type == "2DArray":
+            return self._getMaterialArray2D(value)
+        elif type == "3DArray":
+            return self._getMaterialArray3D(value)
+
+        # Strings and lists are used as is
+        return value
+
+    def _toMaterial(self, entry) -> MaterialObjectType:
+        material = Materials.Material()
+        material.Name = entry["material_name"]
+        material.Author = entry["material_author"]
+        material.License = entry["material_license"]
+        material.Parent = entry["material_parent_uuid"]
+        material.Description = entry["material_description"]
+        material.URL = entry["material_url"]
+        material.Reference = entry["material_reference"]
+        material.Directory = entry["folder"]
+
+        for tag in entry["tags"]:
+            material.addTag(tag)
+
+        for model in entry["physical_models"]:
+            material.addPhysicalModel(model)
+
+        for model in entry["appearance_models"]:
+            material.addAppearanceModel(model)
+
+        # The actual properties are set by the model. We just need to load the values
+        for property in entry["properties"]:
+            material.setValue(property["material_property_name"],
+                              self._getMaterialPropertyValue(property))
+
+        return MaterialObjectType(entry["library"], material)
+
+    def getMaterial(self, uuid: str) -> MaterialObjectType:
+        return self._flight.do(("material", uuid), self._getMaterial, uuid)
+
+    def _getMaterial(self, uuid: str) -> MaterialObjectType:
+        try:
+            return self._toMaterial(self._getJSON("material/{}/".format(uuid)))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get material:", ex)
+            raise WSMaterialNotFound(error=ex)
+
+    def getMaterials(self, uuids: list[str], chunkSize: int = None) -> dict:
+        """
+        Fetch several materials using one request per chunk of uuids.
+
+        Returns a dictionary keyed by uuid in the order requested. Each value is either
+        the MaterialObjectType or the WSError describing why that material could not be
+        retrieved.
+        """
+        entries = self._getBatchJSON("materials/", "materials", "material_id", "material/{}/",
+                                     uuids, chunkSize)
+
+        materials = {}
+        for uuid in uuids:
+            entry = entries.get(uuid)
+            if entry is None:
+                materials[uuid] = WSMaterialNotFound()
+            elif isinstance(entry, Exception):
+                materials[uuid] = entry
+            else:
+                try:
+                    materials[uuid] = self._toMaterial(entry)
+                except Exception as ex:
+                    print("Unable to get material:", ex)
+                    materials[uuid] = WSMaterialNotFound(error=ex)
+
+        return materials
+
+    #
+    # Write methods
+    #
+
+    def _upload(self, value: str):
+        """
+        Sends a large value in pieces of at most the upload chunk size. The returned
+        reference is used in place of the value in the object body.
+        """
+        data = value.encode("utf-8")
+        response = self._postJSON("upload/", {"upload_size": len(data)})
+        uploadId = response["upload_id"]
+        for offset in range(0, len(data), self._uploadChunkSize):
+            chunk = self._session.post(self._baseURL + "upload/{}/".format(uploadId),
+                                       data=data[offset:offset + self._uploadChunkSize],
+                                       headers={"Content-Type": "application/octet-stream",
+                                                "X-Upload-Offset": str(offset)})
+            chunk.raise_for_status()
+        return {"upload": uploadId}
+
+    def _largeValue(self, value):
+        if isinstance(value, str) and len(value) > self._uploadChunkSize:
+            return self._upload(value)
+        return value
+
+    def _createBatch(self, endpoint: str, key: str, idField: str, bodies: list, chunkSize: int,
+                     existsError, creationError) -> dict:
+        """
+        Sends the bodies one chunk per request. Returns a dictionary of uuid to None
+        when the object was created or to the WSError describing the failure.
+        """
+        results = {}
+        for chunk in self._chunks(bodies, chunkSize):
+            uuids = [body[idField] for body in chunk]
+            try:
+                response = self._postJSON(endpoint, {key: chunk})
+            except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+                print(f"HTTP error occurred: {http_err}")
+                for uuid in uuids:
+                    results[uuid] = WSConnectionError(error=http_err)
+                continue
+
+            statuses = {}
+            for result in response["results"]:
+                statuses[result["uuid"]] = result
+            for uuid in uuids:
+                result = statuses.get(uuid)
+                if result is None:
+                    results[uuid] = creationError(message="No result returned")
+                elif result["status"] == "created":
+                    results[uuid] = None
+                elif result["status"] == "exists":
+                    results[uuid] = existsError()
+                else:
+                    results[uuid] = creationError(message=result.get("message", "Unable to create object"))
+        return results
+
+    def createModels(self, models: list, chunkSize: int = None) -> dict:
+        """
+        Creates many models using one request per chunk. models is a list of
+        (libraryName, path, model) tuples. Returns a dictionary of uuid to None, or
+        to a WSModelExistsError or WSModelCreationError for models not created.
+        """
+        bodies = [fromModel(libraryName, path, model) for libraryName, path, model in models]
+        results = self._createBatch("models/create/", "models", "model_id", bodies, chunkSize,
+                                    WSModelExistsError, WSModelCreationError)
+        self._invalidateCreated(bodies, "model_id", "model/{}/", "libraryModels/{}/")
+        self._invalidate("modelClosure/", prefix=True)
+        return results
+
+    def createMaterials(self, materials: list, chunkSize: int = None) -> dict:
+        """
+        Creates many materials using one request per chunk. materials is a list of
+        (libraryName, path, material) tuples. Returns a dictionary of uuid to None, or
+        to a WSMaterialExistsError or WSMaterialCreationError for materials not created.
+        Large image values are uploaded separately in chunks.
+        """
+        try:
+            bodies = [fromMaterial(libraryName, path, material, self._largeValue)
+                      for libraryName, path, material in materials]
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        results = self._createBatch("materials/create/", "materials", "material_id", bodies,
+                                    chunkSize, WSMaterialExistsError, WSMaterialCreationError)
+        self._invalidateCreated(bodies, "material_id", "material/{}/", "libraryMaterials/{}/")
+        return results
+
+    def _invalidateCreated(self, bodies: list, idField: str, objectPath: str, listingPath: str) -> None:
+        libraries = set()
+        for body in bodies:
+            libraries.add(body["library"])
+            self._invalidate(objectPath.format(body[idField]))
+        self._invalidateLibraries()
+        for libraryName in libraries:
+            # Includes any cached pages of the listing
+            self._invalidate(listingPath.format(libraryName), prefix=True)
+
+class AsyncWebService:
+    """
+    Coroutine counterpart to WebService.
+
+    The HTTP round trips run on a thread pool sharing the connection pool of the
+    underlying WebService, while the conversion to Materials objects happens on the
+    event loop thread using the same code as the blocking calls.
+    """
+
+    def __init__(self, ws: WebService = None):
+        if ws is None:
+            ws = WebService()
+        self._ws = ws
+        self._executor = ThreadPoolExecutor(max_workers=ws.poolSize)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    async def _getJSON(self, path: str, conditional: bool = False, format: str = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor,
+                                          partial(self._ws._getJSON, path, conditional, format))
+
+    async def getLibraries(self) -> list[MaterialLibraryType]:
+        try:
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(self._executor, self._ws._getLibrariesJSON, "library")
+            return self._ws._toLibraries(body)
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get libraries:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    async def libraryModels(self, libraryName: str) -> list[MaterialLibraryObjectType]:
+        try:
+            return self._ws._toLibraryModels(await self._getJSON("libraryModels/{}/".format(libraryName), conditional=True))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    async def libraryMaterials(self, libraryName: str) -> list[MaterialLibraryObjectType]:
+        try:
+            return self._ws._toLibraryMaterials(await self._getJSON("libraryMaterials/{}/".format(libraryName), conditional=True))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get library:", ex)
+            raise WSLibraryNotFound(error=ex)
+
+    async def getModel(self, uuid: str) -> ModelObjectType:
+        try:
+            return self._ws._toModel(await self._getJSON("model/{}/".format(uuid)))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
             print(f"HTTP error occurred: {http_err}")
             raise WSConnectionError(error=http_err)
         except Exception as ex:
             print("Unable to get model:", ex)
             raise WSModelNotFound(error=ex)
+
+    async def getMaterial(self, uuid: str) -> MaterialObjectType:
+        try:
+            return self._ws._toMaterial(await self._getJSON("material/{}/".format(uuid)))
+        except (HTTPError, RequestsConnectionError, Timeout) as http_err:
+            print(f"HTTP error occurred: {http_err}")
+            raise WSConnectionError(error=http_err)
+        except Exception as ex:
+            print("Unable to get material:", ex)
+            raise WSMaterialNotFound(error=ex)
+
+    async def _gather(self, fetch, uuids: list[str], concurrency: int, returnExceptions: bool):
+        if concurrency is None:
+            concurrency = self._ws.poolSize
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def bounded(uuid):
+            async with semaphore:
+                return await fetch(uuid)
+
+        return await asyncio.gather(*[bounded(uuid) for uuid in uuids],
+                                    return_exceptions=returnExceptions)
+
+    async def getModels(self, uuids: list[str], concurrency: int = None,
+                        returnExceptions: bool = False) -> list[ModelObjectType]:
+        """
+        Fetch several models with at most concurrency requests in flight, returning
+        them in the order requested. Defaults to the connection pool size.
+        """
+        return await self._gather(self.getModel, uuids, concurrency, returnExceptions)
+
+    async def getMaterials(self, uuids: list[str], concurrency: int = None,
+                           returnExceptions: bool = False) -> list[MaterialObjectType]:
+        """
+        Fetch several materials with at most concurrency requests in flight, returning
+        them in the order requested. Defaults to the connection pool size.
+        """
+        return await self._gather(self.getMaterial, uuids, concurrency, returnExceptions)
@@ -0,0 +1,276 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for using the database directly in place of the web service"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import threading
+
+from MaterialAPI.MaterialManagerExternal import MaterialLibraryType, \
+    ModelObjectType, MaterialObjectType
+
+from MaterialWS.Configuration import getBatchSize
+from MaterialWS.Database.Exceptions import DatabaseConnectionError, \
+    DatabaseLibraryCreationError, DatabaseLibraryNotFound, \
+    DatabaseModelCreationError, DatabaseMaterialCreationError, \
+    DatabaseModelExistsError, DatabaseMaterialExistsError, \
+    DatabaseModelNotFound, DatabaseMaterialNotFound
+from MaterialWS.WS.SingleFlight import SingleFlight
+from MaterialWS.WS.Filter import filterArguments
+from MaterialWS.WS.Replica import CHANGE_CREATED
+from MaterialWS.WS.Exceptions import WSConnectionError, \
+    WSLibraryCreationError, WSLibraryNotFound, \
+    WSModelCreationError, WSMaterialCreationError, \
+    WSModelExistsError, WSMaterialExistsError, \
+    WSModelNotFound, WSMaterialNotFound
+
+# Database errors and the web service errors raised in their place
+_ERRORS = [
+    (DatabaseConnectionError, WSConnectionError),
+    (DatabaseLibraryCreationError, WSLibraryCreationError),
+    (DatabaseLibraryNotFound, WSLibraryNotFound),
+    (DatabaseModelCreationError, WSModelCreationError),
+    (DatabaseMaterialCreationError, WSMaterialCreationError),
+    (DatabaseModelExistsError, WSModelExistsError),
+    (DatabaseMaterialExistsError, WSMaterialExistsError),
+    (DatabaseModelNotFound, WSModelNotFound),
+    (DatabaseMaterialNotFound, WSMaterialNotFound),
+]
+
+def _translate(ex: Exception, default):
+    for databaseError, wsError in _ERRORS:
+        if isinstance(ex, databaseError):
+            return wsError(error=ex)
+    return default(error=ex)
+
+class DatabaseBackend:
+    """
+    Reads and writes the database directly, skipping the HTTP hop and the JSON
+    serialization.
+
+    This provides the methods of WebService used by MaterialWSManager, converting
+    the tuples returned by the database into the MaterialAPI types and its exceptions
+    into the WS exceptions, so the manager can use either backend.
+    """
+
+    def __init__(self, database=None, batchSize: int = None):
+        # The configured database may predate tables used here, such as change_log
+        self._migrate = database is None
+        if database is None:
+            from MaterialWS.Database.DatabaseMySQLCreate import DatabaseMySQLCreate
+
+            database = DatabaseMySQLCreate()
+        self._database = database
+        if batchSize is None:
+            batchSize = getBatchSize()
+        self._batchSize = max(1, batchSize)
+
+        # The database holds a single connection
+        self._lock = threading.RLock()
+        self._flight = SingleFlight("database")
+        self._changeListeners = []
+
+    def close(self) -> None:
+        with self._lock:
+            self._database._disconnect()
+
+    @property
+    def metrics(self):
+        return None
+
+    @property
+    def batchSize(self) -> int:
+        return self._batchSize
+
+    def coalescingStats(self) -> dict:
+        return self._flight.stats()
+
+    def subscribe(self):
+        """
+        There is no event channel to follow. Changes made through this backend are
+        still announced to the change listeners.
+        """
+        return None
+
+    def addChangeListener(self, callback) -> None:
+        self._changeListeners.append(callback)
+
+    def removeChangeListener(self, callback) -> None:
+        if callback in self._changeListeners:
+            self._changeListeners.remove(callback)
+
+    def _notifyChange(self, event: dict) -> None:
+        for callback in list(self._changeListeners):
+            callback(event)
+
+    def _migrateTables(self) -> None:
+        """Brings the tables up to date before the database is first used"""
+        if self._migrate:
+            self._migrate = False
+            try:
+                self._database.migrateTables()
+            except Exception as ex:
+                print("Unable to update the database tables:", ex)
+
+    def _call(self, default, function, *args, **kwargs):
+        with self._lock:
+            self._migrateTables()
+            try:
+                return function(*args, **kwargs)
+            except Exception as ex:
+                raise _translate(ex, default)
+
+    def _toLibrary(self, library) -> MaterialLibraryType:
+        icon = library[1]
+        if isinstance(icon, str):
+            icon = icon.encode("utf-8")
+        return MaterialLibraryType(library[0], icon or b"", bool(library[2]))
+
+    def getLibraries(self) -> list[MaterialLibraryType]:
+        libraries = self._call(WSLibraryNotFound, self._database.getLibraries)
+        return [self._toLibrary(library) for library in libraries]
+
+    def getModelLibraries(self) -> list[MaterialLibraryType]:
+        libraries = self._call(WSLibraryNotFound, self._database.getModelLibraries)
+        return [self._toLibrary(library) for library in libraries]
+
+    def getMaterialLibraries(self) -> list[MaterialLibraryType]:
+        libraries = self._call(WSLibraryNotFound, self._database.getMaterialLibraries)
+        return [self._toLibrary(library) for library in libraries]
+
+    def getLibrary(self, name: str) -> MaterialLibraryType:
+        library = self._call(WSLibraryNotFound, self._database.getLibrary, name)
+        if library is None:
+            raise WSLibraryNotFound()
+        return self._toLibrary(library)
+
+    def createLibrary(self, name: str, icon: bytes, readOnly: bool) -> None:
+        # Icons may be binary images, so they are stored as bytes
+        if isinstance(icon, str):
+            icon = icon.encode("utf-8")
+        self._call(WSLibraryCreationError, self._database.createLibrary, name, icon, readOnly)
+        self._notifyChange({"object_type": "library", "uuid": None, "library": name,
+                            "change": CHANGE_CREATED})
+
+    def libraryModels(self, libraryName: str) -> list:
+        return self._call(WSLibraryNotFound, self._database.libraryModels, libraryName)
+
+    def libraryMaterials(self, libraryName: str, filter=None, options=None) -> list:
+        return self._call(WSLibraryNotFound, self._database.libraryMaterials, libraryName,
+                          **filterArguments(filter, options))
+
+    def getModel(self, uuid: str) -> ModelObjectType:
+        return self._flight.do(("model", uuid), self._getModel, uuid)
+
+    def _getModel(self, uuid: str) -> ModelObjectType:
+        _, library, model = self._call(WSModelNotFound, self._database.getModel, uuid)
+        return ModelObjectType(library[0], model)
+
+    def getModels(self, uuids: list[str], chunkSize: int = None) -> dict:
+        """
+        Returns a dictionary keyed by uuid in the order requested. Each value is either
+        the ModelObjectType or the WSError describing why that model could not be
+        retrieved.
+        """
+        models = {}
+        for uuid, model in self._call(WSModelNotFound, self._database.getModels, uuids).items():
+            if isinstance(model, Exception):
+                models[uuid] = _translate(model, WSModelNotFound)
+            else:
+                models[uuid] = ModelObjectType(model[1][0], model[2])
+        return models
+
+    def getModelClosure(self, uuid: str) -> dict:
+        """
+        Returns a dictionary of uuid to ModelObjectType for the model and every model
+        it inherits from, nearest first
+        """
+        closure = self._call(WSModelNotFound, self._database.getModelClosure, uuid)
+        return {modelUUID: ModelObjectType(library[0], model) for modelUUID, library, model in closure}
+
+    def getMaterial(self, uuid: str) -> MaterialObjectType:
+        return self._flight.do(("material", uuid), self._getMaterial, uuid)
+
+    def _getMaterial(self, uuid: str) -> MaterialObjectType:
+        _, library, material = self._call(WSMaterialNotFound, self._database.getMaterial, uuid)
+        return MaterialObjectType(library[0], material)
+
+    def getMaterials(self, uuids: list[str], chunkSize: int = None) -> dict:
+        """
+        Returns a dictionary keyed by uuid in the order requested. Each value is either
+        the MaterialObjectType or the WSError describing why that material could not be
+        retrieved.
+        """
+        materials = {}
+        with self._lock:
+            self._migrateTables()
+            try:
+                for uuid, material in self._database.getMaterials(uuids, chunkSize or self._batchSize):
+                    if isinstance(material, Exception):
+                        materials[uuid] = _translate(material, WSMaterialNotFound)
+                    else:
+                        materials[uuid] = MaterialObjectType(material[1][0], material[2])
+            except Exception as ex:
+                raise _translate(ex, WSMaterialNotFound)
+        return materials
+
+    def _createBatch(self, objects: list, objectType: str, create, default, chunkSize: int) -> dict:
+        """
+        Creates the objects, holding the database for one chunk at a time so other calls
+        aren't kept waiting for the whole batch
+        """
+        results = {}
+        chunkSize = max(1, chunkSize or self._batchSize)
+        for start in range(0, len(objects), chunkSize):
+            created = []
+            with self._lock:
+                for libraryName, path, object in objects[start:start + chunkSize]:
+                    try:
+                        self._call(default, create, libraryName, path, object)
+                        results[object.UUID] = None
+                        created.append((libraryName, object.UUID))
+                    except WSConnectionError:
+                        raise
+                    except Exception as ex:
+                        results[object.UUID] = ex
+            for libraryName, uuid in created:
+                self._notifyChange({"object_type": objectType, "uuid": uuid,
+                                    "library": libraryName, "change": CHANGE_CREATED})
+        return results
+
+    def createModels(self, models: list, chunkSize: int = None) -> dict:
+        """
+        Creates many models, chunkSize at a time. models is a list of (libraryName, path,
+        model) tuples. Returns a dictionary of uuid to None, or to a WSModelExistsError or
+        WSModelCreationError for models not created.
+        """
+        return self._createBatch(models, "model", self._database.createModel, WSModelCreationError,
+                                 chunkSize)
+
+    def createMaterials(self, materials: list, chunkSize: int = None) -> dict:
+        """
+        Creates many materials, chunkSize at a time. materials is a list of (libraryName,
+        path, material) tuples. Returns a dictionary of uuid to None, or to a
+        WSMaterialExistsError or WSMaterialCreationError for materials not created.
+        """
+        return self._createBatch(materials, "material", self._database.createMaterial,
+                                 WSMaterialCreationError, chunkSize)
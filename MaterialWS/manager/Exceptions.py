@@ -33,3 +33,14 @@ class ManagerDeleteError(Exception):
         if self._error is not None:
             return repr(self._error)
         return repr(self.msg)
+
+class ManagerMigrationError(Exception):
+    """Raised once the pending batches are sent, with the error for each object not migrated"""
+
+    def __init__(self, errors: dict, msg="Unable to migrate objects"):
+        self.errors = errors
+        self.msg = msg
+
+    def __str__(self):
+        return repr("{}: {}".format(self.msg, ", ".join("{} ({})".format(uuid, error)
+                                                         for uuid, error in self.errors.items())))
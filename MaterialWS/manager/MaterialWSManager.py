@@ -22,67 +22,220 @@
 __author__ = "David Carter"
 __url__ = "https://www.davesrocketshop.com"
 
+import weakref
+from contextlib import contextmanager, ExitStack
+
 import Materials
 
 from MaterialAPI.MaterialManagerExternal import MaterialManagerExternal, \
     MaterialLibraryType, MaterialLibraryObjectType, \
     ModelObjectType, MaterialObjectType
 
+from MaterialWS.Configuration import getChangeEvents, getObjectCacheEntries, getObjectCacheSize, \
+    getBackend, BACKEND_DATABASE
 from MaterialWS.WS.WS import WebService
+from MaterialWS.manager.DatabaseBackend import DatabaseBackend
+from MaterialWS.WS.SingleFlight import SingleFlight
+from MaterialWS.manager.ObjectCache import ObjectCache
+from MaterialWS.manager.Exceptions import ManagerMigrationError
+from MaterialWS.WS.Serialize import fromModel, fromMaterial
+from MaterialWS.Server.Records import ModelRecord, MaterialRecord
 from MaterialWS.WS.Exceptions import WSLibraryCreationError, \
     WSModelCreationError, WSMaterialCreationError, \
     WSModelExistsError, WSMaterialExistsError, \
     WSModelNotFound, WSMaterialNotFound
 
-class MaterialWSManager(MaterialManagerExternal):
+# The managers created by FreeCAD, for migration()
+_managers = weakref.WeakSet()
 
-    def __init__(self):
-        self._ws = WebService()
+@contextmanager
+def migration():
+    """Batches the migration made by every manager for the duration of the block"""
+    with ExitStack() as stack:
+        for manager in list(_managers):
+            stack.enter_context(manager.migration())
+        yield
+
+class MaterialWSManager(MaterialManagerExternal):
+    """
+    The external material manager used by FreeCAD, backed by the web service or the
+    database directly.
+
+    Models and materials are cached in process, and every caller receives the same
+    cached object. They must be treated as read only. Changes go through updateModel()
+    and updateMaterial(), which evict the cached copy.
+    """
+
+    def __init__(self, backend=None):
+        if backend is None:
+            if getBackend() == BACKEND_DATABASE:
+                backend = DatabaseBackend()
+            else:
+                backend = WebService()
+        self._backend = backend
+        self._flight = SingleFlight("manager", self._backend.metrics)
+        self._objects = ObjectCache(getObjectCacheEntries(), getObjectCacheSize() * 1024 * 1024)
+
+        # Migrated objects are sent in batches while a migration() is open
+        self._migrating = 0
+        self._pendingModels = []
+        self._pendingMaterials = []
+        self._migrationErrors = {}
+        _managers.add(self)
+
+        # Changes made elsewhere evict the affected objects
+        self._backend.addChangeListener(self._onChange)
+        if getChangeEvents():
+            self._backend.subscribe()
+
+    def coalescingStats(self) -> dict:
+        """Counts of lookups made and of lookups that joined one already in flight"""
+        return {"manager": self._flight.stats(), "backend": self._backend.coalescingStats()}
+
+    def cacheStats(self) -> dict:
+        """Hit and miss counts and the size of the model and material cache"""
+        return self._objects.stats()
+
+    def _onChange(self, event: dict) -> None:
+        objectType = event.get("object_type")
+        if event.get("change") == "reset":
+            self._objects.clear()
+        elif objectType == "model" or objectType == "material":
+            self._objects.invalidate((objectType, event.get("uuid")))
+        else:
+            self._invalidateLibrary(event.get("library"))
+
+    def _invalidateLibrary(self, libraryName: str) -> None:
+        """Evicts every object in a library, after changes to the library or its folders"""
+        self._objects.invalidateWhere(lambda value: value.libraryName == libraryName)
+
+    def _cached(self, kind: str, uuid: str, load):
+        key = (kind, uuid)
+        value = self._objects.get(key)
+        if value is None:
+            generation = self._objects.generation
+            value = self._flight.do(key, load, uuid)
+            self._objects.put(key, value, generation)
+        return value
+
+    def _cachedBatch(self, kind: str, uuids: list[str], load) -> dict:
+        results = {}
+        missing = []
+        for uuid in uuids:
+            value = self._objects.get((kind, uuid))
+            results[uuid] = value
+            if value is None:
+                missing.append(uuid)
+        if missing:
+            generation = self._objects.generation
+            for uuid, value in load(missing).items():
+                results[uuid] = value
+                if not isinstance(value, Exception):
+                    self._objects.put((kind, uuid), value, generation)
+        return results
+
+    @contextmanager
+    def migration(self):
+        """
+        Batches the migrateModel() and migrateMaterial() calls made in the block. What
+        remains is sent when the block exits, and a ManagerMigrationError then lists
+        every object that couldn't be migrated. Outside a block each object is sent
+        when it is migrated.
+        """
+        self._migrating += 1
+        try:
+            yield self
+        finally:
+            self._migrating -= 1
+            if self._migrating == 0:
+                self.flushMigration()
+
+    def flushMigration(self) -> None:
+        """
+        Sends any models and materials still waiting to be migrated. Raises a
+        ManagerMigrationError with the errors of every batch sent since the last flush.
+        """
+        self._flushModels()
+        self._flushMaterials()
+        errors = self._migrationErrors
+        self._migrationErrors = {}
+        if errors:
+            raise ManagerMigrationError(errors)
+
+    def _collectErrors(self, results: dict, ignore) -> None:
+        for uuid, error in results.items():
+            if error is not None and not isinstance(error, ignore):
+                self._migrationErrors[uuid] = error
+
+    def _raiseErrors(self, results: dict, ignore) -> None:
+        for error in results.values():
+            if error is not None and not isinstance(error, ignore):
+                raise error
+
+    def _flushModels(self) -> None:
+        if not self._pendingModels:
+            return
+        pending = self._pendingModels
+        self._pendingModels = []
+
+        # If it exists we just ignore
+        self._collectErrors(self._backend.createModels(pending), WSModelExistsError)
+
+    def _flushMaterials(self) -> None:
+        if not self._pendingMaterials:
+            return
+        pending = self._pendingMaterials
+        self._pendingMaterials = []
+
+        # If it exists we just ignore
+        self._collectErrors(self._backend.createMaterials(pending), WSMaterialExistsError)
 
     def libraries(self) -> list[MaterialLibraryType]:
         # print("libraries()")
-        return self._ws.getLibraries()
+        return self._backend.getLibraries()
 
     def modelLibraries(self) -> list[MaterialLibraryType]:
         # print("modelLibraries()")
-        return self._ws.getModelLibraries()
+        return self._backend.getModelLibraries()
 
     def materialLibraries(self) -> list[MaterialLibraryType]:
         # print("materialLibraries()")
-        return self._ws.getMaterialLibraries()
+        return self._backend.getMaterialLibraries()
 
     def getLibrary(self, name: str) -> MaterialLibraryType:
         print("getLibrary('{}')".format(name))
-        return self._ws.getLibrary(name)
+        return self._backend.getLibrary(name)
 
     def createLibrary(self, name: str, icon: bytes, readOnly: bool) -> None:
         # print("createLibrary('{}', '{}', '{}')".format(name, icon, readOnly))
-        self._ws.createLibrary(name, icon, readOnly)
+        self._backend.createLibrary(name, icon, readOnly)
 
     def renameLibrary(self, oldName: str, newName: str) -> None:
         print("renameLibrary('{}', '{}')".format(oldName, newName))
-        # self._ws.renameLibrary(oldName, newName)
+        self._invalidateLibrary(oldName)
+        # self._backend.renameLibrary(oldName, newName)
 
     def changeIcon(self, name: str, icon: bytes) -> None:
         print("changeIcon('{}', '{}')".format(name, icon))
-        # self._ws.changeIcon(name, icon)
+        # self._backend.changeIcon(name, icon)
 
     def removeLibrary(self, libraryName: str) -> None:
         print("removeLibrary('{}')".format(libraryName))
-        # self._ws.removeLibrary(libraryName)
+        self._invalidateLibrary(libraryName)
+        # self._backend.removeLibrary(libraryName)
 
     def libraryModels(self, libraryName: str) -> list[MaterialLibraryObjectType]:
         print("libraryModels('{}')".format(libraryName))
-        return self._ws.libraryModels(libraryName)
+        return self._backend.libraryModels(libraryName)
 
     def libraryMaterials(self, libraryName: str,
                          filter: Materials.MaterialFilter = None,
                          options: Materials.MaterialFilterOptions = None) -> list[MaterialLibraryObjectType]:
         # print("libraryMaterials('{}')".format(library))
-        return self._ws.libraryMaterials(libraryName)
+        return self._backend.libraryMaterials(libraryName, filter, options)
 
     def libraryFolders(self, libraryName: str) -> list[str]:
-        # return self._ws.libraryFolders(libraryName)
+        # return self._backend.libraryFolders(libraryName)
         print("libraryFolders('{}')".format(libraryName))
 
     #
@@ -91,15 +244,17 @@ class MaterialWSManager(MaterialManagerExternal):
 
     def createFolder(self, libraryName: str, path: str) -> None:
         print("createFolder('{0}', '{1}')".format(libraryName, path))
-        # self._ws.createFolder(libraryName, path)
+        # self._backend.createFolder(libraryName, path)
 
     def renameFolder(self, libraryName: str, oldPath: str, newPath: str) -> None:
         print("renameFolder('{0}', '{1}', '{2}')".format(libraryName, oldPath, newPath))
-        # self._ws.renameFolder(libraryName, oldPath, newPath)
+        self._invalidateLibrary(libraryName)
+        # self._backend.renameFolder(libraryName, oldPath, newPath)
 
     def deleteRecursive(self, libraryName: str, path: str) -> None:
         print("deleteRecursive('{0}', '{1}')".format(libraryName, path))
-        # self._ws.deleteRecursive(libraryName, path)
+        self._invalidateLibrary(libraryName)
+        # self._backend.deleteRecursive(libraryName, path)
 
     #
     # Model methods
@@ -107,35 +262,64 @@ class MaterialWSManager(MaterialManagerExternal):
 
     def getModel(self, uuid: str) -> ModelObjectType:
         print("getModel('{}')".format(uuid))
-        return self._ws.getModel(uuid)
+        return self._cached("model", uuid, self._backend.getModel)
+
+    def getModels(self, uuids: list[str]) -> dict:
+        """
+        Returns a dictionary mapping each uuid to its ModelObjectType, or to the
+        exception raised for that model if it could not be retrieved
+        """
+        return self._cachedBatch("model", uuids, self._backend.getModels)
+
+    def getModelClosure(self, uuid: str) -> dict:
+        """
+        Returns a dictionary of uuid to ModelObjectType for the model and every model
+        it inherits from, nearest first, retrieved in one round trip. Each model is
+        added to the object cache.
+        """
+        generation = self._objects.generation
+        closure = self._backend.getModelClosure(uuid)
+        for modelUUID, value in closure.items():
+            self._objects.put(("model", modelUUID), value, generation)
+        return closure
 
     def addModel(self, libraryName: str, path: str, model: Materials.Model) -> None:
         print("addModel('{}', '{}', '{}')".format(libraryName, path, model.Name))
-        # self._ws.createModel(libraryName, path, model)
+        self._flushModels()
+        self._raiseErrors(self._backend.createModels([(libraryName, path, model)]), ())
+        self._objects.invalidate(("model", model.UUID))
 
     def migrateModel(self, libraryName: str, path: str, model: Materials.Model) -> None:
         print("migrateModel('{}', '{}', '{}')".format(libraryName, path, model.Name))
-        # try:
-        #     self._ws.createModel(libraryName, path, model)
-        # except WSModelExistsError:
-        #     # If it exists we just ignore
-        #     pass
+
+        # Copied now, so later changes to the model aren't migrated
+        self._pendingModels.append((libraryName, path,
+                                    ModelRecord(fromModel(libraryName, path, model))))
+        if not self._migrating:
+            self.flushMigration()
+        elif len(self._pendingModels) >= self._backend.batchSize:
+            self._flushModels()
 
     def updateModel(self, libraryName: str, path: str, model: Materials.Model) -> None:
         print("updateModel('{}', '{}', '{}')".format(libraryName, path, model.Name))
-        # self._ws.updateModel(libraryName, path, model)
+        self._objects.invalidate(("model", model.UUID))
+        # self._backend.updateModel(libraryName, path, model)
 
     def setModelPath(self, libraryName: str, path: str, uuid: str) -> None:
         print("setModelPath('{}', '{}', '{}')".format(libraryName, path, uuid))
+        self._objects.invalidate(("model", uuid))
 
     def renameModel(self, libraryName: str, name: str,uuid: str) -> None:
         print("renameModel('{}', '{}', '{}')".format(libraryName, name, uuid))
+        self._objects.invalidate(("model", uuid))
 
     def moveModel(self, libraryName: str, path: str, uuid: str) -> None:
         print("moveModel('{}', '{}', '{}')".format(libraryName, path, uuid))
+        self._objects.invalidate(("model", uuid))
 
     def removeModel(self, uuid: str) -> None:
         print("removeModel('{}')".format(uuid))
+        self._objects.invalidate(("model", uuid))
 
     #
     # Material methods
@@ -143,33 +327,49 @@ class MaterialWSManager(MaterialManagerExternal):
 
     def getMaterial(self, uuid: str) -> MaterialObjectType:
         print("getMaterial('{}')".format(uuid))
-        # return self._ws.getMaterial(uuid)
-        raise WSMaterialNotFound()
+        return self._cached("material", uuid, self._backend.getMaterial)
+
+    def getMaterials(self, uuids: list[str]) -> dict:
+        """
+        Returns a dictionary mapping each uuid to its MaterialObjectType, or to the
+        exception raised for that material if it could not be retrieved
+        """
+        return self._cachedBatch("material", uuids, self._backend.getMaterials)
 
     def addMaterial(self, libraryName: str, path: str, material: Materials.Material) -> None:
         print("addMaterial('{}', '{}', '{}')".format(libraryName, path, material.Name))
-        # self._ws.createMaterial(libraryName, path, material)
+        self._flushModels()
+        self._raiseErrors(self._backend.createMaterials([(libraryName, path, material)]), ())
+        self._objects.invalidate(("material", material.UUID))
 
     def migrateMaterial(self, libraryName: str, path: str, material: Materials.Material) -> None:
         print("migrateMaterial('{}', '{}', '{}')".format(libraryName, path, material.Name))
-        # try:
-        #     self._ws.createMaterial(libraryName, path, material)
-        # except WSMaterialExistsError:
-        #     # If it exists we just ignore
-        #     print("Ignore WSModelExistsError error")
-        #     pass
+
+        # Materials depend on their models being present
+        self._flushModels()
+        self._pendingMaterials.append((libraryName, path,
+                                       MaterialRecord(fromMaterial(libraryName, path, material))))
+        if not self._migrating:
+            self.flushMigration()
+        elif len(self._pendingMaterials) >= self._backend.batchSize:
+            self._flushMaterials()
 
     def updateMaterial(self, libraryName: str, path: str, material: Materials.Material) -> None:
         print("updateMaterial('{}', '{}', '{}')".format(libraryName, path, material.Name))
+        self._objects.invalidate(("material", material.UUID))
 
     def setMaterialPath(self, libraryName: str, path: str, uuid: str) -> None:
         print("setMaterialPath('{}', '{}', '{}')".format(libraryName, path, uuid))
+        self._objects.invalidate(("material", uuid))
 
     def renameMaterial(self, libraryName: str, name: str, uuid: str) -> None:
         print("renameMaterial('{}', '{}', '{}')".format(libraryName, name, uuid))
+        self._objects.invalidate(("material", uuid))
 
     def moveMaterial(self, libraryName: str, path: str, uuid: str) -> None:
         print("moveMaterial('{}', '{}', '{}')".format(libraryName, path, uuid))
+        self._objects.invalidate(("material", uuid))
 
     def removeMaterial(self, uuid: str) -> None:
         print("removeMaterial('{}')".format(uuid))
+        self._objects.invalidate(("material", uuid))
@@ -0,0 +1,141 @@
+# ***************************************************************************
+# *   Copyright (c) 2025 David Carter <dcarter@davidcarter.ca>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+"""Class for caching resolved models and materials in memory"""
+
+__author__ = "David Carter"
+__url__ = "https://www.davesrocketshop.com"
+
+import threading
+
+from collections import OrderedDict
+
+# Nominal sizes for the parts of an object that don't hold text
+OBJECT_SIZE = 512
+PROPERTY_SIZE = 256
+CELL_SIZE = 32
+
+def _valueSize(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_valueSize(entry) for entry in value)
+    if hasattr(value, "Array"):
+        return sum(_valueSize(entry) for entry in value.Array) or CELL_SIZE
+    return CELL_SIZE
+
+def estimateSize(value) -> int:
+    """
+    A rough size in bytes of a ModelObjectType or MaterialObjectType. The FreeCAD
+    objects don't report their size, so this counts the text they hold, which dominates
+    for materials with images or tables.
+    """
+    object = value[1]
+    size = OBJECT_SIZE
+    if hasattr(object, "PropertyObjects"):
+        for property in object.PropertyObjects.values():
+            size += PROPERTY_SIZE + _valueSize(property.Value)
+    elif hasattr(object, "Properties"):
+        for property in object.Properties.values():
+            size += PROPERTY_SIZE * (1 + len(property.Columns))
+    return size
+
+class ObjectCache:
+    """
+    A least recently used cache of resolved objects bounded both by the number of
+    entries and by their estimated size.
+
+    Every invalidation moves the generation. A value loaded while an invalidation
+    happened may be stale, so put() drops it when given the generation read before
+    loading. Cached values are shared between callers, not copied.
+    """
+
+    def __init__(self, maxEntries: int = 2048, maxBytes: int = 32 * 1024 * 1024, sizeOf=estimateSize):
+        self._maxEntries = max(1, maxEntries)
+        self._maxBytes = maxBytes
+        self._sizeOf = sizeOf
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key, value, generation: int = None) -> None:
+        size = self._sizeOf(value)
+        if size > self._maxBytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # Invalidated while the value was being loaded
+                return
+            self._remove(key)
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self._maxEntries or self._bytes > self._maxBytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._generation += 1
+            self._remove(key)
+
+    def invalidateWhere(self, predicate) -> None:
+        """Removes the entries whose value matches predicate"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, (value, _) in self._entries.items() if predicate(value)]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions,
+                    "entries": len(self._entries), "bytes": self._bytes}
@@ -9,7 +9,8 @@ CREATE TABLE library (
 	library_name VARCHAR(512) NOT NULL UNIQUE,
 	library_icon BLOB,
 	library_read_only TINYINT(1) NOT NULL DEFAULT 0,
-	library_modified DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+	library_modified DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+	library_version INTEGER NOT NULL DEFAULT 0
 );
 
 DROP TABLE IF EXISTS folder;
@@ -18,6 +19,7 @@ CREATE TABLE folder (
 	folder_name VARCHAR(512) NOT NULL,
 	library_id INTEGER NOT NULL,
 	parent_id INTEGER,
+	folder_path VARCHAR(1024),
 	FOREIGN KEY (library_id)
         REFERENCES library(library_id)
 		ON DELETE CASCADE,
@@ -25,6 +27,9 @@ CREATE TABLE folder (
         REFERENCES folder(folder_id)
 );
 
+-- Folders are looked up by path, which is too long to index in full
+CREATE INDEX folder_library_path ON folder (library_id, folder_path(255));
+
 DROP TABLE IF EXISTS model;
 CREATE TABLE model (
     model_id CHAR(36) NOT NULL PRIMARY KEY,
@@ -196,34 +201,29 @@ CREATE TABLE material_property_array_value (
 		ON DELETE CASCADE
 );
 
+DROP TABLE IF EXISTS change_log;
+CREATE TABLE change_log (
+	change_id INTEGER AUTO_INCREMENT NOT NULL PRIMARY KEY,
+	library_id INTEGER NOT NULL,
+	object_id CHAR(36) NOT NULL,
+	object_type ENUM('Model', 'Material') NOT NULL,
+	change_type ENUM('Created', 'Updated', 'Deleted') NOT NULL,
+	change_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+	FOREIGN KEY (library_id)
+        REFERENCES library(library_id)
+		ON DELETE CASCADE
+);
+
 DELIMITER //
 DROP FUNCTION IF EXISTS GetFolder//
 CREATE FUNCTION GetFolder(id INTEGER)
 	RETURNS VARCHAR(1024) DETERMINISTIC
 BEGIN
 	DECLARE folderName VARCHAR(1024);
-    WITH RECURSIVE subordinate AS (
-	 SELECT
-		folder_id,
-		folder_name,
-		parent_id
-	  FROM folder
-	  WHERE folder_id = id
-
-	  UNION ALL
-
-	  SELECT
-		e.folder_id,
-		e.folder_name,
-		e.parent_id
-	  FROM folder e
-	  JOIN subordinate s
-	  ON e.folder_id = s.parent_id
-	)
 	SELECT
-		group_concat(folder_name SEPARATOR '/')
-	FROM subordinate
-	ORDER BY folder_id ASC
+		folder_path
+	FROM folder
+	WHERE folder_id = id
 	INTO folderName;
 	RETURN folderName;
 END//
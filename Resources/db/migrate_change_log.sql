@@ -0,0 +1,15 @@
+USE material;
+
+-- The log of changes followed by clients synchronizing a library
+
+CREATE TABLE IF NOT EXISTS change_log (
+	change_id INTEGER AUTO_INCREMENT NOT NULL PRIMARY KEY,
+	library_id INTEGER NOT NULL,
+	object_id CHAR(36) NOT NULL,
+	object_type ENUM('Model', 'Material') NOT NULL,
+	change_type ENUM('Created', 'Updated', 'Deleted') NOT NULL,
+	change_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+	FOREIGN KEY (library_id)
+        REFERENCES library(library_id)
+		ON DELETE CASCADE
+);
@@ -0,0 +1,6 @@
+USE material;
+
+-- Folders are looked up by path. For databases already migrated with
+-- migrate_folder_path.sql before it created this index
+
+CREATE INDEX folder_library_path ON folder (library_id, folder_path(255));
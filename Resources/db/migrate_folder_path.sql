@@ -0,0 +1,42 @@
+USE material;
+
+-- Materialize the folder paths so listings don't resolve them recursively
+
+ALTER TABLE folder ADD COLUMN folder_path VARCHAR(1024);
+CREATE INDEX folder_library_path ON folder (library_id, folder_path(255));
+
+UPDATE folder f JOIN (
+	WITH RECURSIVE paths AS (
+	  SELECT
+		folder_id,
+		CAST(folder_name AS CHAR(1024)) AS folder_path
+	  FROM folder
+	  WHERE parent_id IS NULL
+
+	  UNION ALL
+
+	  SELECT
+		e.folder_id,
+		CONCAT(p.folder_path, '/', e.folder_name)
+	  FROM folder e
+	  JOIN paths p
+	  ON e.parent_id = p.folder_id
+	)
+	SELECT folder_id, folder_path FROM paths
+) p ON f.folder_id = p.folder_id
+SET f.folder_path = p.folder_path;
+
+DELIMITER //
+DROP FUNCTION IF EXISTS GetFolder//
+CREATE FUNCTION GetFolder(id INTEGER)
+	RETURNS VARCHAR(1024) DETERMINISTIC
+BEGIN
+	DECLARE folderName VARCHAR(1024);
+	SELECT
+		folder_path
+	FROM folder
+	WHERE folder_id = id
+	INTO folderName;
+	RETURN folderName;
+END//
+DELIMITER ;
@@ -0,0 +1,6 @@
+USE material;
+
+-- A counter moved by every change to a library. Unlike library_modified it always
+-- changes, however close together the changes are
+
+ALTER TABLE library ADD COLUMN library_version INTEGER NOT NULL DEFAULT 0;
@@ -25,6 +25,17 @@ __url__ = "https://www.davesrocketshop.com"
 import unittest
 
 from MaterialWS.Tests.MySQL.TestMySQL import MySQLTests
+from MaterialWS.Tests.WS.TestStreamingJSON import StreamingJSONTests
+from MaterialWS.Tests.WS.TestSingleFlight import SingleFlightTests
+from MaterialWS.Tests.WS.TestSession import SessionTests
+from MaterialWS.Tests.WS.TestWebService import WebServiceTests
+from MaterialWS.Tests.WS.TestArrayCodec import ArrayCodecTests
+from MaterialWS.Tests.WS.TestReplica import ReplicaTests
+from MaterialWS.Tests.WS.TestEvents import EventsTests
+from MaterialWS.Tests.Manager.TestObjectCache import ObjectCacheTests
+from MaterialWS.Tests.Manager.TestDatabaseBackend import DatabaseBackendTests
+from MaterialWS.Tests.Manager.TestMigration import MigrationTests
+from MaterialWS.Tests.Server.TestServer import ServerTests, ServerHTTPTests
 
 def runMaterialWSUnitTests():
     suite = unittest.TestSuite()